@@ -0,0 +1,94 @@
+"""
+Compares the cost of rendering the static keyboards from scratch and serving
+them from the KeyboardRegistry.
+
+Usage:
+    python -m benchmarks.keyboards [--languages en,ru,...] [--renders N]
+
+"rebuild" is what every render used to cost: the language names are looked up
+in Babel and all the buttons are created again. "registry" is a lookup of the
+keyboard built on startup.
+"""
+
+import argparse
+import time
+from functools import partial
+from types import SimpleNamespace
+
+from tour_guide_bot.bot.admin.configure import ConfigureCommandHandler
+from tour_guide_bot.helpers.keyboards import KeyboardRegistry
+from tour_guide_bot.helpers.language import LanguageHandler
+from tour_guide_bot.helpers.language_selector import get_language_name
+
+
+def rebuild_language_selector(languages: list[str]) -> None:
+    get_language_name.cache_clear()
+    LanguageHandler.build_language_select_inline_keyboard(languages[-1], languages)
+
+
+def rebuild_menu(languages: list[str]) -> None:
+    mask = (True,) * len(ConfigureCommandHandler.MENU_ITEMS)
+    ConfigureCommandHandler.build_menu_keyboard(languages[-1], mask)
+
+
+def measure(name: str, render, renders: int) -> float:
+    start = time.perf_counter()
+    for _ in range(renders):
+        render()
+
+    per_render = (time.perf_counter() - start) / renders * 1e6
+    print("{0:<28} {1:>10.2f}us".format(name, per_render))
+
+    return per_render
+
+
+def main(languages: list[str], renders: int) -> None:
+    keyboards = KeyboardRegistry(languages)
+    LanguageHandler.register_keyboards(keyboards)
+    ConfigureCommandHandler.register_keyboards(keyboards)
+
+    context = SimpleNamespace(
+        application=SimpleNamespace(keyboards=keyboards, enabled_languages=languages)
+    )
+    language_handler = LanguageHandler(None)
+    configure_handler = ConfigureCommandHandler(None)
+    mask = (True,) * len(ConfigureCommandHandler.MENU_ITEMS)
+
+    print("{0} languages, {1} renders\n".format(len(languages), renders))
+
+    before = measure(
+        "language selector: rebuild",
+        partial(rebuild_language_selector, languages),
+        renders,
+    )
+    after = measure(
+        "language selector: registry",
+        partial(
+            language_handler.get_language_select_inline_keyboard,
+            languages[-1],
+            context,
+        ),
+        renders,
+    )
+    print("{0:<28} {1:>10.0f}x\n".format("speedup", before / after))
+
+    before = measure("admin menu: rebuild", partial(rebuild_menu, languages), renders)
+    after = measure(
+        "admin menu: registry",
+        partial(configure_handler.get_menu_keyboard, languages[-1], mask, context),
+        renders,
+    )
+    print("{0:<28} {1:>10.0f}x".format("speedup", before / after))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--languages",
+        default="en,ru,de,fr,es",
+        type=lambda s: [item.strip() for item in s.split(",")],
+    )
+    parser.add_argument("--renders", type=int, default=10000)
+    args = parser.parse_args()
+
+    main(args.languages, args.renders)
@@ -0,0 +1,149 @@
+"""
+Compares the flush latency and the storage size of the persistence backends.
+
+Usage:
+    python -m benchmarks.persistence [--users N] [--changes N] [--rounds N]
+
+Every backend is filled with the data of N users, and then the data of a few of
+them is changed and persisted several times, the way Application does it every
+update interval. PicklePersistence is measured in its cheapest mode: a single
+dump per run (on_flush=True followed by flush()).
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from os import path
+from statistics import mean
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from telegram.ext import BasePersistence, PicklePersistence
+
+from tour_guide_bot.helpers.journal_persistence import JournalPersistence
+from tour_guide_bot.helpers.sql_persistence import SqlPersistence
+from tour_guide_bot.models import Base
+from tour_guide_bot.models.persistence import PersistenceEntry  # noqa: F401
+
+
+def user_data(user_id: int, revision: int = 0) -> dict:
+    return {
+        "phone_number": "+%d" % (70000000000 + user_id),
+        "tour_id": user_id % 100,
+        "tour_section_id": revision,
+        "language": "en",
+    }
+
+
+async def persist(persistence: BasePersistence, user_ids, revision: int) -> None:
+    await asyncio.gather(
+        *(
+            persistence.update_user_data(user_id, user_data(user_id, revision))
+            for user_id in user_ids
+        ),
+        *(
+            persistence.update_conversation("admin-add-tour", (user_id, user_id), 3)
+            for user_id in user_ids
+        ),
+    )
+
+    if isinstance(persistence, PicklePersistence):
+        await persistence.flush()
+
+
+def files_size(*paths: str) -> int:
+    return sum(path.getsize(p) for p in paths if path.exists(p))
+
+
+async def measure(
+    name: str,
+    persistence: BasePersistence,
+    users: int,
+    changes: int,
+    rounds: int,
+    size,
+) -> None:
+    await persistence.get_user_data()
+    await persistence.get_conversations("admin-add-tour")
+
+    started = time.perf_counter()
+    await persist(persistence, range(users), 0)
+    initial = time.perf_counter() - started
+
+    latencies = []
+    for revision in range(1, rounds + 1):
+        first = revision * changes % users
+        started = time.perf_counter()
+        await persist(persistence, range(first, first + changes), revision)
+        latencies.append(time.perf_counter() - started)
+
+    print(
+        "{0:<10} {1:>10.2f}s {2:>12.2f}ms {3:>12.2f}ms {4:>10.1f}MB".format(
+            name,
+            initial,
+            mean(latencies) * 1000,
+            max(latencies) * 1000,
+            size() / 1024 / 1024,
+        )
+    )
+
+
+async def main(tmp: str, users: int, changes: int, rounds: int) -> None:
+    print(
+        "{0} users, {1} changed per run, {2} runs\n".format(users, changes, rounds)
+        + "{0:<10} {1:>11} {2:>14} {3:>14} {4:>12}".format(
+            "backend", "initial", "mean flush", "max flush", "size"
+        )
+    )
+
+    pickle_path = path.join(tmp, "storage.pickle")
+    await measure(
+        "pickle",
+        PicklePersistence(pickle_path, on_flush=True),
+        users,
+        changes,
+        rounds,
+        lambda: files_size(pickle_path),
+    )
+
+    journal = JournalPersistence(path.join(tmp, "storage"))
+    await measure(
+        "journal",
+        journal,
+        users,
+        changes,
+        rounds,
+        lambda: files_size(journal.snapshot_path, journal.journal_path),
+    )
+    await journal.flush()
+    print(
+        "{0:<10} {1:>51.1f}MB".format(
+            "compacted", files_size(journal.snapshot_path) / 1024 / 1024
+        )
+    )
+
+    db_path = path.join(tmp, "storage.db")
+    engine = create_async_engine("sqlite+aiosqlite:///" + db_path)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await measure(
+        "database",
+        SqlPersistence(engine),
+        users,
+        changes,
+        rounds,
+        lambda: files_size(db_path, db_path + "-journal", db_path + "-wal"),
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main(tmp, args.users, args.changes, args.rounds))
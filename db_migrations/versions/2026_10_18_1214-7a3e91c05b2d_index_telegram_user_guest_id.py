@@ -0,0 +1,25 @@
+"""Index telegram_user.guest_id
+
+Revision ID: 7a3e91c05b2d
+Revises: dbf604473cee
+Create Date: 2026-10-18 12:14:37.412093
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a3e91c05b2d"
+down_revision = "dbf604473cee"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_telegram_user_guest_id"), "telegram_user", ["guest_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_telegram_user_guest_id"), table_name="telegram_user")
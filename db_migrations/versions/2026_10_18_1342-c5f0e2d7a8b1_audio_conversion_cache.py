@@ -0,0 +1,45 @@
+"""Audio conversion cache
+
+Revision ID: c5f0e2d7a8b1
+Revises: 7a3e91c05b2d
+Create Date: 2026-10-18 13:42:05.193857
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5f0e2d7a8b1"
+down_revision = "7a3e91c05b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audio_conversion",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("source_file_unique_id", sa.String(), nullable=False),
+        sa.Column("profile", sa.String(), nullable=False),
+        sa.Column("voice_file_id", sa.String(), nullable=False),
+        sa.Column(
+            "created_ts",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column("updated_ts", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_audio_conversion_source_profile",
+        "audio_conversion",
+        ["source_file_unique_id", "profile"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audio_conversion_source_profile", table_name="audio_conversion")
+    op.drop_table("audio_conversion")
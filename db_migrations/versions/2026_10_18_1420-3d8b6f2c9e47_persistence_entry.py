@@ -0,0 +1,59 @@
+"""Conversation persistence in the database
+
+Revision ID: 3d8b6f2c9e47
+Revises: c5f0e2d7a8b1
+Create Date: 2026-10-18 14:20:11.734520
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d8b6f2c9e47"
+down_revision = "c5f0e2d7a8b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "persistence_entry",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum(
+                "user_data",
+                "chat_data",
+                "bot_data",
+                "callback_data",
+                "conversation",
+                name="persistencekind",
+            ),
+            nullable=False,
+        ),
+        sa.Column("namespace", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "updated_ts",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_persistence_entry_kind_namespace_key",
+        "persistence_entry",
+        ["kind", "namespace", "key"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_persistence_entry_kind_namespace_key", table_name="persistence_entry"
+    )
+    op.drop_table("persistence_entry")
+    sa.Enum(name="persistencekind").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,36 @@
+"""Invoice's telegram_payment_charge_id
+
+Revision ID: 9b4e2a7c1f6d
+Revises: 3d8b6f2c9e47
+Create Date: 2026-10-18 15:30:42.118305
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b4e2a7c1f6d"
+down_revision = "3d8b6f2c9e47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "invoice",
+        sa.Column("telegram_payment_charge_id", sa.String(), nullable=True),
+    )
+    op.create_index(
+        op.f("ix_invoice_telegram_payment_charge_id"),
+        "invoice",
+        ["telegram_payment_charge_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_invoice_telegram_payment_charge_id"), table_name="invoice")
+
+    with op.batch_alter_table("invoice") as batch_op:
+        batch_op.drop_column("telegram_payment_charge_id")
@@ -0,0 +1,28 @@
+"""TourTranslation's content_version
+
+Revision ID: e1c7a4b93f58
+Revises: 9b4e2a7c1f6d
+Create Date: 2026-10-18 16:45:17.402981
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e1c7a4b93f58"
+down_revision = "9b4e2a7c1f6d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tour_translation",
+        sa.Column("content_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tour_translation") as batch_op:
+        batch_op.drop_column("content_version")
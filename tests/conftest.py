@@ -319,6 +319,9 @@ def unitialized_app(
     app = prepare_app(
         bot_token, db_engine, enabled_languages, default_language, str(persistence_path)
     )
+    # The tests change the settings right in the database, so the bot has to
+    # notice the changes at once
+    app.settings_cache.check_interval = 0
 
     yield app
 
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers.audio_converter import AudioConverter
+from tour_guide_bot.models.guide import AudioConversion
+
+
+async def test_lookup_by_source_and_profile(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        assert (
+            await AudioConversion.load(session, "unique", AudioConverter.PROFILE)
+            is None
+        )
+
+        conversion = await AudioConversion.load(
+            session, "unique", AudioConverter.PROFILE, create=True
+        )
+        conversion.voice_file_id = "voice"
+        session.add(conversion)
+        await session.commit()
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        cached = await AudioConversion.load(session, "unique", AudioConverter.PROFILE)
+        assert cached.voice_file_id == "voice"
+
+        # Changing the conversion settings invalidates the cached results
+        assert await AudioConversion.load(session, "unique", "opus-64k") is None
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from tour_guide_bot.helpers.audio_converter import (
+    AudioConverter,
+    ConversionCancelled,
+    ConversionError,
+)
+
+# Mimics ffmpeg's `-progress pipe:N` output: one second of audio every 10ms. The
+# input is echoed back reversed.
+FAKE_FFMPEG = """
+import os, sys, time
+seconds, exit_code, source, progress = sys.argv[1:]
+if source == "pipe:0":
+    data = sys.stdin.buffer.read()
+else:
+    with open(source, "rb") as f:
+        data = f.read()
+progress = os.fdopen(int(progress[len("pipe:"):]), "w")
+for i in range(1, int(seconds) + 1):
+    print("out_time_us=%d" % (i * 1000000), file=progress, flush=True)
+    print("progress=continue", file=progress, flush=True)
+    time.sleep(0.01)
+if exit_code != "0":
+    print("Invalid data found when processing input", file=sys.stderr)
+    print("Option b:a=192000 not found", file=sys.stderr)
+sys.stdout.buffer.write(data[::-1])
+sys.exit(int(exit_code))
+"""
+
+
+class FakeAudioConverter(AudioConverter):
+    PROGRESS_INTERVAL = 0
+
+    def __init__(self, seconds: int = 1, exit_code: int = 0):
+        super().__init__(1)
+        self.seconds = seconds
+        self.exit_code = exit_code
+        self.sources = []
+
+    def get_args(self, source: str, progress_fd: int) -> list[str]:
+        self.sources.append(source)
+
+        return [
+            sys.executable,
+            "-c",
+            FAKE_FFMPEG,
+            str(self.seconds),
+            str(self.exit_code),
+            source,
+            "pipe:%d" % progress_fd,
+        ]
+
+
+async def test_progress():
+    converter = FakeAudioConverter(4)
+    progress = []
+
+    async def on_progress(value):
+        progress.append(value)
+
+    # Bigger than the pipe buffers to make sure nothing gets stuck
+    source = bytearray(range(256)) * 4096
+    assert await converter.convert(1, source, 4, on_progress) == source[::-1]
+
+    assert progress == [0.25, 0.5, 0.75, 1.0]
+    assert not converter.is_active(1)
+    assert converter.sources == ["pipe:0"]
+
+
+async def test_seekable_source():
+    converter = FakeAudioConverter(2)
+    progress = []
+
+    async def on_progress(value):
+        progress.append(value)
+
+    # An m4a file, which might keep its index at the end
+    source = b"\x00\x00\x00\x1cftypM4A " + bytes(range(256)) * 16
+    assert await converter.convert(1, source, 2, on_progress) == source[::-1]
+    assert progress == [0.5, 1.0]
+
+    # The source is passed as a temporary file, which is removed afterwards
+    assert converter.sources[0] != "pipe:0"
+    assert not os.path.exists(converter.sources[0])
+
+
+async def test_failure():
+    converter = FakeAudioConverter(exit_code=1)
+
+    # The error lines are told from the progress even if they contain "="
+    with pytest.raises(ConversionError, match="Invalid data(.|\n)*b:a=192000"):
+        await converter.convert(1, b"audio")
+
+
+async def test_queue_and_cancellation():
+    converter = FakeAudioConverter(1000)
+    queued = asyncio.Event()
+
+    async def on_progress(value):
+        if value is None:
+            queued.set()
+
+    running = asyncio.create_task(converter.convert(1, b"audio"))
+    await asyncio.sleep(0.2)
+    waiting = asyncio.create_task(converter.convert(2, b"audio", 1, on_progress))
+    await queued.wait()
+
+    assert converter.queue_size == 1
+    assert converter.cancel(2)
+    with pytest.raises(ConversionCancelled):
+        await waiting
+
+    assert converter.cancel(1)
+    with pytest.raises(ConversionCancelled):
+        await running
+
+    assert not converter.cancel(1)
+    assert converter.queue_size == 0
@@ -0,0 +1,153 @@
+import re
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.bot.admin.tour.delete import DeleteHandler
+from tour_guide_bot.bot.guide.bot_commands import BotCommandsFactory
+from tour_guide_bot.helpers.bot_commands_cache import BotCommandsCache
+from tour_guide_bot.helpers.product_menu_cache import ProductMenuCache
+from tour_guide_bot.helpers.settings_cache import SettingsCache
+from tour_guide_bot.helpers.tour_content_cache import TourContentCache
+from tour_guide_bot.helpers.tour_titles import TourTitlesCache
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+from tour_guide_bot.models.guide import (
+    PaymentProvider,
+    Product,
+    Tour,
+    TourTranslation,
+)
+from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    async def set_my_commands(self, commands, scope=None, language_code=None):
+        self.calls.append(
+            (
+                "set",
+                [c.command for c in commands],
+                scope and scope.chat_id,
+                language_code,
+            )
+        )
+
+    async def delete_my_commands(self, scope=None, language_code=None):
+        self.calls.append(("delete", scope.chat_id))
+
+
+async def test_commands_are_sent_once(db_engine: AsyncEngine):
+    bot = FakeBot()
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            bot_commands_cache=BotCommandsCache(),
+            settings_cache=SettingsCache(),
+        )
+    )
+
+    def build_update(language_code: str):
+        return SimpleNamespace(
+            get_bot=lambda: bot,
+            effective_user=SimpleNamespace(language_code=language_code),
+        )
+
+    guest = SimpleNamespace(id=1, admin=None)
+    admin = SimpleNamespace(id=2, admin=object())
+
+    async with AsyncSession(db_engine) as session:
+        session.add(Settings(key=SettingsKey.terms_message, language="en", value="t"))
+        await session.commit()
+
+        await BotCommandsFactory.start(
+            build_update("en"), context, guest, "en", session
+        )
+        assert bot.calls == [
+            ("set", ["start", "tours", "language", "terms"], None, "en"),
+            ("delete", 1),
+        ]
+
+        bot.calls.clear()
+        await BotCommandsFactory.start(
+            build_update("en"), context, guest, "en", session
+        )
+        await BotCommandsFactory.start(
+            build_update("en"), context, admin, "en", session
+        )
+        await BotCommandsFactory.start(
+            build_update("en"), context, admin, "en", session
+        )
+        assert bot.calls == [
+            ("set", ["admin", "start", "tours", "language", "terms"], 2, None),
+        ]
+
+        bot.calls.clear()
+        await BotCommandsFactory.start(
+            build_update("en"), context, guest, "ru", session
+        )
+        assert bot.calls == [
+            ("set", ["start", "tours", "language"], None, "ru"),
+            ("set", ["start", "tours", "language"], 1, None),
+        ]
+
+
+async def test_deleted_tour_invalidates_products(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine) as session:
+        session.add_all(
+            [
+                Tour(id=1),
+                TourTranslation(tour_id=1, language="en", title="Tour"),
+                PaymentProvider(id=1, name="test", enabled=True, config={}),
+                Product(
+                    tour_id=1,
+                    payment_provider_id=1,
+                    currency="USD",
+                    price=1000,
+                    duration_days=1,
+                    language="en",
+                    title="Tour",
+                    description="Tour",
+                ),
+                TelegramUser(id=1, language="en"),
+            ]
+        )
+        await session.commit()
+
+    commands_cache = BotCommandsCache()
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            bot_commands_cache=commands_cache,
+            tour_content_cache=TourContentCache(),
+            tour_titles_cache=TourTitlesCache(),
+            product_menu_cache=ProductMenuCache(),
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en"],
+            default_language="en",
+        ),
+        matches=[re.match(r"(\d+)", "1")],
+    )
+
+    async with AsyncSession(db_engine) as session:
+        assert await commands_cache.has_products(session)
+
+    async def answer():
+        pass
+
+    async def edit_message_text(text, **kwargs):
+        pass
+
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=1, language_code="en"),
+        callback_query=SimpleNamespace(
+            answer=answer, edit_message_text=edit_message_text
+        ),
+    )
+
+    handler = DeleteHandler(db_engine)
+    await handler.delete_tour(update, context)
+    await handler.close()
+
+    async with AsyncSession(db_engine) as session:
+        assert not await commands_cache.has_products(session)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from pathlib import Path
+
+import aiohttp
+import pytest
+
+from tour_guide_bot.helpers import currency
+from tour_guide_bot.helpers.currency import Currency, load_snapshot, update_snapshot
+
+
+async def test_snapshot_is_used_offline(monkeypatch):
+    monkeypatch.setattr(Currency, "cache", load_snapshot())
+    monkeypatch.setattr(Currency, "last_cache_update", None)
+
+    assert Currency.is_stale()
+    assert await Currency.price_from_telegram("USD", 1050) == "$10.50"
+    assert await Currency.price_from_telegram("EUR", 100000) == "1 000 €"
+    assert await Currency.price_to_telegram("USD", "1,000.5") == 100050
+    assert not await Currency.is_known_currency("ZZZ")
+
+    # The currencies missing in the snapshot are formatted using CLDR
+    assert await Currency.price_from_telegram("SAR", 1050) == "SAR 10.50"
+
+    # The bundled limits aren't trusted
+    assert await Currency.is_valid("USD", 1)
+    assert not await Currency.is_valid("USD", 0)
+
+
+async def test_limits_of_fetched_catalogue(monkeypatch):
+    monkeypatch.setattr(Currency, "cache", load_snapshot())
+    monkeypatch.setattr(Currency, "refresh_task", None)
+    monkeypatch.setattr(Currency, "last_cache_update", None)
+
+    async def load_currencies_config():
+        cfg = dict(load_snapshot()["USD"], min_amount="100", max_amount="1000000")
+        return {"USD": cfg}
+
+    monkeypatch.setattr(Currency, "load_currencies_config", load_currencies_config)
+
+    assert await Currency.update_cache()
+    assert await Currency.is_valid("USD", 100)
+    assert not await Currency.is_valid("USD", 99)
+    assert not await Currency.is_known_currency("SAR")
+
+
+async def test_single_flight_refresh(monkeypatch):
+    monkeypatch.setattr(Currency, "cache", {})
+    monkeypatch.setattr(Currency, "last_cache_update", None)
+    monkeypatch.setattr(Currency, "refresh_task", None)
+
+    calls = 0
+
+    async def load_currencies_config():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"USD": {"code": "USD"}}
+
+    monkeypatch.setattr(Currency, "load_currencies_config", load_currencies_config)
+
+    assert await asyncio.gather(*[Currency.update_cache() for _ in range(3)]) == [
+        True,
+        True,
+        True,
+    ]
+    assert calls == 1
+    assert not Currency.is_stale()
+
+    await Currency.refresh_if_stale()
+    assert calls == 1
+
+
+async def test_failed_refresh_keeps_stale_data(monkeypatch):
+    cache = load_snapshot()
+    monkeypatch.setattr(Currency, "cache", cache)
+    monkeypatch.setattr(Currency, "last_cache_update", None)
+    monkeypatch.setattr(Currency, "refresh_task", None)
+
+    async def load_currencies_config():
+        raise aiohttp.ClientConnectionError()
+
+    monkeypatch.setattr(Currency, "load_currencies_config", load_currencies_config)
+
+    assert not await Currency.update_cache()
+    assert Currency.cache is cache
+    assert Currency.is_stale()
+
+
+async def test_update_snapshot(monkeypatch, tmp_path: Path):
+    snapshot_path = tmp_path / "currencies.json"
+    snapshot_path.write_text(json.dumps({"USD": {"code": "USD"}}))
+    monkeypatch.setattr(currency, "SNAPSHOT_PATH", str(snapshot_path))
+
+    async def failing_load_currencies_config():
+        raise aiohttp.ClientConnectionError()
+
+    monkeypatch.setattr(
+        Currency, "load_currencies_config", failing_load_currencies_config
+    )
+
+    # A failed fetch leaves the snapshot intact
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await update_snapshot()
+    assert load_snapshot() == {"USD": {"code": "USD"}}
+
+    async def load_currencies_config():
+        return {"EUR": {"code": "EUR"}}
+
+    monkeypatch.setattr(Currency, "load_currencies_config", load_currencies_config)
+
+    await update_snapshot()
+    assert load_snapshot() == {"EUR": {"code": "EUR"}}
+    assert [p.name for p in tmp_path.iterdir()] == ["currencies.json"]
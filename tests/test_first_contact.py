@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers.telegram import BaseHandlerCallback
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+async def test_concurrent_first_contact(db_engine: AsyncEngine):
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en"],
+            default_language="en",
+        )
+    )
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1, language_code="de"))
+
+    async def get_user():
+        handler = BaseHandlerCallback(db_engine)
+        try:
+            return await handler.get_user(update, context)
+        finally:
+            await handler.close()
+
+    users = await asyncio.gather(*[get_user() for _ in range(5)])
+
+    for user in users:
+        assert user.id == 1
+        assert user.language == "en"
+        assert user.admin is None and user.guest is None
+
+    async with AsyncSession(db_engine) as session:
+        assert await session.scalar(select(func.count(TelegramUser.id))) == 1
@@ -181,3 +181,25 @@ async def test_multiple_tours_single_approved(
         % tours_as_dicts[1]["translations"]["en"]["title"]
         in response.message
     )
+
+
+@pytest.mark.approved_tour_ids(1)
+@pytest.mark.usefixtures("guest", "approved_tours")
+async def test_event_driven_notification(
+    conversation: Conversation, tours_as_dicts: list[dict], app: Application
+):
+    ctx = CallbackContext(app)
+    await conversation.send_message("x")
+
+    app.notify_new_subscription(1)
+    assert app.job_queue.get_jobs_by_name("notify-new-subscriptions")
+
+    await app.notify_new_subscriptions(ctx)
+    assert not app.new_subscription_ids
+
+    response: Message = await conversation.get_response()
+    assert (
+        'You have a new tour available — "%s"'
+        % tours_as_dicts[0]["translations"]["en"]["title"]
+        in response.message
+    )
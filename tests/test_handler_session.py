@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from tour_guide_bot.helpers.telegram import BaseHandlerCallback
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+
+
+def build_context(db_engine: AsyncEngine) -> SimpleNamespace:
+    return SimpleNamespace(
+        application=SimpleNamespace(
+            db_engine=db_engine,
+            db_read_engine=db_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en"],
+            default_language="en",
+        )
+    )
+
+
+async def test_session_is_not_created_until_needed(db_engine: AsyncEngine):
+    checkouts = []
+    event.listen(db_engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+
+    async def nop_handler(handler, update, context):
+        return handler
+
+    handler = await BaseHandlerCallback.build_and_run(
+        nop_handler, None, build_context(db_engine)
+    )
+
+    assert handler._db_session is None
+    assert checkouts == []
+
+
+async def test_read_only_handler_creates_user_in_primary(db_engine: AsyncEngine):
+    context = build_context(db_engine)
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1, language_code="en"))
+
+    async def get_user(handler, update, context):
+        assert handler.db_engine is context.application.db_read_engine
+        return await handler.get_user(update, context)
+
+    user = await BaseHandlerCallback.build_and_run(
+        get_user, update, context, read_only=True
+    )
+    assert user.id == 1
+
+    handler = BaseHandlerCallback.build(context, read_only=True)
+    assert (await handler.get_user(update, context)).id == 1
+    await handler.close()
+    assert handler._db_session is None
@@ -0,0 +1,113 @@
+from time import time
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from tour_guide_bot.bot.guide.purchase import PurchaseCommandHandler
+from tour_guide_bot.helpers.invoice_payload import (
+    InvoicePayload,
+    InvoicePayloadSigner,
+    PaidInvoices,
+    get_invoice_id,
+)
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+
+
+def test_sign_and_verify():
+    signer = InvoicePayloadSigner("123:token")
+    payload = signer.sign(42, 1050, "USD")
+
+    assert len(payload) <= 128
+    assert get_invoice_id(payload) == 42
+    assert signer.verify(payload) == InvoicePayload(
+        42, 1050, "USD", signer.verify(payload).expire_ts
+    )
+
+    assert signer.verify(payload.replace(":1050:", ":1:")) is None
+    assert InvoicePayloadSigner("456:token").verify(payload) is None
+    assert signer.verify("i:42") is None
+
+    signer.ttl = -1
+    assert signer.verify(signer.sign(42, 1050, "USD")) is None
+
+
+def test_unsigned_invoice_id():
+    assert get_invoice_id("i:42") == 42
+    assert get_invoice_id("p:42") is None
+    assert get_invoice_id("i:") is None
+
+
+async def test_pre_checkout_without_database(db_engine: AsyncEngine):
+    queries = []
+    event.listen(
+        db_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: queries.append(args[2]),
+    )
+
+    signer = InvoicePayloadSigner("123:token")
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            db_engine=db_engine,
+            invoice_payload_signer=signer,
+            paid_invoices=PaidInvoices(),
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en"],
+            default_language="en",
+        )
+    )
+    answers = []
+
+    async def answer(ok, error_message=None):
+        answers.append(ok)
+
+    def pre_checkout_query(payload: str, total_amount: int = 1050):
+        return SimpleNamespace(
+            effective_user=SimpleNamespace(id=1, language_code="en"),
+            pre_checkout_query=SimpleNamespace(
+                invoice_payload=payload,
+                total_amount=total_amount,
+                currency="USD",
+                answer=answer,
+            ),
+        )
+
+    handler = PurchaseCommandHandler(db_engine, read_only=True)
+    await handler.pre_checkout(
+        pre_checkout_query(signer.sign(42, 1050, "USD")), context
+    )
+    await handler.close()
+
+    assert answers == [True]
+    assert queries == []
+
+    handler = PurchaseCommandHandler(db_engine, read_only=True)
+    await handler.pre_checkout(
+        pre_checkout_query(signer.sign(42, 1050, "USD"), 1), context
+    )
+    await handler.close()
+
+    assert answers[1:] == [False]
+
+    # The paid invoices aren't charged once again
+    context.application.paid_invoices.add(signer.verify(signer.sign(42, 1050, "USD")))
+
+    handler = PurchaseCommandHandler(db_engine, read_only=True)
+    await handler.pre_checkout(
+        pre_checkout_query(signer.sign(42, 1050, "USD")), context
+    )
+    await handler.close()
+
+    assert answers[2:] == [False]
+
+
+def test_paid_invoices_expire():
+    paid_invoices = PaidInvoices()
+    paid_invoices.add(InvoicePayload(1, 100, "USD", int(time()) - 1))
+    assert 1 in paid_invoices
+
+    paid_invoices.add(InvoicePayload(2, 100, "USD", int(time()) + 60))
+    assert 1 not in paid_invoices
+    assert 2 in paid_invoices
+    assert len(paid_invoices) == 1
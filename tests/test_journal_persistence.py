@@ -0,0 +1,98 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from tour_guide_bot.helpers.journal_persistence import JournalPersistence
+
+
+async def test_replay(persistence_path: Path):
+    path = str(persistence_path / "storage")
+
+    persistence = JournalPersistence(path, fsync=False)
+    await asyncio.gather(
+        persistence.update_user_data(1, {"tour_id": 1}),
+        persistence.update_user_data(2, {"tour_id": 2}),
+        persistence.update_conversation("admin-add-tour", (1, 1), 3),
+    )
+    size = os.path.getsize(persistence.journal_path)
+
+    # Unchanged values are not appended again
+    await persistence.update_user_data(1, {"tour_id": 1})
+    assert os.path.getsize(persistence.journal_path) == size
+
+    await asyncio.gather(
+        persistence.update_user_data(1, {"tour_id": 3}),
+        persistence.drop_user_data(2),
+    )
+
+    # The journal is replayed without compaction
+    restored = JournalPersistence(path)
+    assert await restored.get_user_data() == {1: {"tour_id": 3}}
+    assert await restored.get_conversations("admin-add-tour") == {(1, 1): 3}
+    assert await restored.get_conversations("admin-revoke") == {}
+
+
+async def test_compaction(persistence_path: Path):
+    path = str(persistence_path / "storage")
+
+    persistence = JournalPersistence(path, fsync=False)
+    persistence.MIN_COMPACTION_SIZE = 100
+    for i in range(10):
+        await persistence.update_user_data(1, {"counter": i})
+
+    # The journal is compacted in the background, the updates go on meanwhile
+    while persistence._compaction is not None:
+        await asyncio.sleep(0.01)
+
+    assert os.path.exists(persistence.snapshot_path)
+    assert not os.path.exists(persistence.journal_path + ".compacting")
+
+    await persistence.update_conversation("admin-add-tour", (1, 1), 3)
+    await persistence.flush()
+
+    assert not os.path.exists(persistence.journal_path)
+
+    restored = JournalPersistence(path)
+    assert await restored.get_user_data() == {1: {"counter": 9}}
+    assert await restored.get_conversations("admin-add-tour") == {(1, 1): 3}
+
+
+async def test_truncated_journal(persistence_path: Path):
+    path = str(persistence_path / "storage")
+
+    persistence = JournalPersistence(path, fsync=False)
+    await persistence.update_user_data(1, {"tour_id": 1})
+    await persistence.update_user_data(2, {"tour_id": 2})
+
+    with open(persistence.journal_path, "r+b") as f:
+        f.truncate(os.path.getsize(persistence.journal_path) - 3)
+
+    restored = JournalPersistence(path)
+    assert await restored.get_user_data() == {1: {"tour_id": 1}}
+
+
+@pytest.mark.parametrize("cut", [3, 10, 20, 30])
+async def test_appending_after_truncated_record(persistence_path: Path, cut: int):
+    path = str(persistence_path / "storage")
+
+    persistence = JournalPersistence(path, fsync=False)
+    await persistence.update_user_data(1, {"a": 1})
+    await persistence.update_user_data(2, {"b": 2})
+
+    # A torn write of the last record
+    with open(persistence.journal_path, "r+b") as f:
+        f.truncate(os.path.getsize(persistence.journal_path) - cut)
+
+    restarted = JournalPersistence(path, fsync=False)
+    assert await restarted.get_user_data() == {1: {"a": 1}}
+    await restarted.update_user_data(3, {"c": 3})
+
+    restored = JournalPersistence(path)
+    assert await restored.get_user_data() == {1: {"a": 1}, 3: {"c": 3}}
+
+    # The records appended after the repair survive the compaction as well
+    await restarted.flush()
+    restored = JournalPersistence(path)
+    assert await restored.get_user_data() == {1: {"a": 1}, 3: {"c": 3}}
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from tour_guide_bot.bot.admin.tour import TourCommandHandler
+from tour_guide_bot.helpers.keyboards import KeyboardRegistry
+from tour_guide_bot.helpers.language import LanguageHandler
+
+
+def test_keyboards_are_built_once():
+    keyboards = KeyboardRegistry(["en", "ru"])
+    LanguageHandler.register_keyboards(keyboards)
+    TourCommandHandler.register_keyboards(keyboards)
+    assert len(keyboards) == 6
+
+    context = SimpleNamespace(
+        application=SimpleNamespace(keyboards=keyboards, enabled_languages=["en", "ru"])
+    )
+    handler = LanguageHandler(None)
+
+    keyboard = handler.get_language_select_inline_keyboard("en", context)
+    assert keyboard is handler.get_language_select_inline_keyboard("en", context)
+    assert [row[0].callback_data for row in keyboard.inline_keyboard] == [
+        LanguageHandler.get_callback_data("language", "en"),
+        LanguageHandler.get_callback_data("language", "ru"),
+        LanguageHandler.get_callback_data("cancel_language_selection"),
+    ]
+
+    menu = TourCommandHandler(None)
+    keyboard = menu.get_menu_keyboard("ru", (True, False, True), context)
+    assert keyboard is menu.get_menu_keyboard("ru", (True, False, True), context)
+    assert len(keyboards) == 7
+    assert len(keyboard.inline_keyboard) == 3
@@ -0,0 +1,41 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.bot.admin.tour import TourCommandHandler
+from tour_guide_bot.bot.admin.tour.pricing import PricingMenuHandler
+from tour_guide_bot.helpers.menu_counts import MenuCounts
+from tour_guide_bot.models.guide import Tour
+from tour_guide_bot.models.settings import PaymentProvider
+
+
+async def test_menu_is_rendered_with_one_query(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine) as session:
+        session.add(Tour())
+        session.add(PaymentProvider(name="test", config={}, enabled=False))
+        await session.commit()
+
+        assert await MenuCounts.load(session) == MenuCounts(1, 0, 0)
+
+    queries = []
+    event.listen(
+        db_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: queries.append(args[2]),
+    )
+
+    handler = TourCommandHandler(db_engine)
+    counts = await handler.get_menu_counts()
+    await handler.get_menu_counts()
+    assert [item.is_available(counts) for item in TourCommandHandler.MENU_ITEMS] == [
+        True,
+        True,
+        True,
+    ]
+    assert len(queries) == 1
+
+    # No payment providers are enabled yet
+    pricing = PricingMenuHandler(db_engine)
+    assert not await pricing.is_menu_available(None, None)
+    await pricing.close()
+
+    await handler.close()
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from telegram.error import NetworkError
+from telegram.ext import CallbackContext, ExtBot
+
+from tour_guide_bot.bot.app import Application
+from tour_guide_bot.models.guide import Guest, Subscription, Tour, TourTranslation
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+class RecordingBot(ExtBot):
+    # Bot instances are frozen, so the messages are kept by the class
+    chat_ids: list[int] = []
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        RecordingBot.chat_ids.append(chat_id)
+
+
+class FailingBot(RecordingBot):
+    failing_chat_id = 2
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        if chat_id == FailingBot.failing_chat_id:
+            raise NetworkError("Timed out")
+
+        await super().send_message(chat_id, text, *args, **kwargs)
+
+
+async def create_subscriptions(db_engine: AsyncEngine):
+    expire_ts = datetime.now() + timedelta(days=1)
+
+    async with AsyncSession(db_engine) as session:
+        tour = Tour(translations=[TourTranslation(language="en", title="Tour")])
+        guests = [Guest(phone=str(i)) for i in range(3)]
+        session.add_all(
+            [
+                *[
+                    TelegramUser(id=i, language="en", guest=guests[0])
+                    for i in range(1, 4)
+                ],
+                TelegramUser(id=4, language="en", guest=guests[1]),
+                TelegramUser(id=5, language="en", guest=guests[2]),
+                *[
+                    Subscription(guest=guest, tour=tour, expire_ts=expire_ts)
+                    for guest in guests
+                ],
+            ]
+        )
+        await session.commit()
+
+
+def build_app(db_engine: AsyncEngine, bot: ExtBot) -> Application:
+    RecordingBot.chat_ids = []
+    app = Application.builder().bot(bot).build()
+    app.db_engine = db_engine
+    app.default_language = "en"
+    app.NEW_SUBSCRIPTIONS_NOTIFICATION_BATCH_SIZE = 2
+
+    return app
+
+
+async def test_subscription_straddling_batches(db_engine: AsyncEngine):
+    await create_subscriptions(db_engine)
+    app = build_app(db_engine, RecordingBot("123456:test"))
+
+    # The first subscription has more users than a batch
+    await app.send_new_subscription_notifications(CallbackContext(app))
+
+    assert sorted(RecordingBot.chat_ids) == [1, 2, 3, 4, 5]
+
+    async with AsyncSession(db_engine) as session:
+        assert all((await session.scalars(select(Subscription.is_user_notified))).all())
+
+
+async def test_subscription_with_failed_user_is_retried(db_engine: AsyncEngine):
+    await create_subscriptions(db_engine)
+    app = build_app(db_engine, FailingBot("123456:test"))
+
+    # The second user of the first guest can't be notified
+    await app.send_new_subscription_notifications(CallbackContext(app))
+    assert sorted(RecordingBot.chat_ids) == [1, 3, 4, 5]
+
+    async with AsyncSession(db_engine) as session:
+        subscriptions = (
+            await session.scalars(select(Subscription).order_by(Subscription.id))
+        ).all()
+        assert [s.is_user_notified for s in subscriptions] == [False, True, True]
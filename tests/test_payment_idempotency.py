@@ -0,0 +1,129 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.bot.guide.purchase import PurchaseCommandHandler
+from tour_guide_bot.helpers.invoice_payload import InvoicePayloadSigner, PaidInvoices
+from tour_guide_bot.helpers.recent_updates import RecentUpdates
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+from tour_guide_bot.models.guide import (
+    Guest,
+    Invoice,
+    PaymentProvider,
+    Product,
+    Subscription,
+    Tour,
+)
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+def test_recent_updates():
+    recent_updates = RecentUpdates(max_entries=2)
+
+    assert not recent_updates.is_replayed(1)
+    assert recent_updates.is_replayed(1)
+
+    assert not recent_updates.is_replayed(2)
+    assert not recent_updates.is_replayed(3)
+    assert len(recent_updates) == 2
+    assert not recent_updates.is_replayed(1)
+
+
+async def test_charge_is_applied_once(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine) as session:
+        guest = Guest(phone="1")
+        session.add_all(
+            [
+                Tour(id=1),
+                PaymentProvider(id=1, name="test", enabled=True, config={}),
+                Product(
+                    id=1,
+                    tour_id=1,
+                    payment_provider_id=1,
+                    currency="USD",
+                    price=1000,
+                    duration_days=7,
+                    language="en",
+                    title="Tour",
+                    description="Tour",
+                ),
+                TelegramUser(id=1, language="en", guest=guest),
+                Invoice(
+                    id=1,
+                    product_id=1,
+                    tour_id=1,
+                    guest=guest,
+                    payment_provider_id=1,
+                    currency="USD",
+                    price=1000,
+                    duration_days=7,
+                ),
+            ]
+        )
+        await session.commit()
+
+    signer = InvoicePayloadSigner("123:token")
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            db_engine=db_engine,
+            invoice_payload_signer=signer,
+            paid_invoices=PaidInvoices(),
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en"],
+            default_language="en",
+        )
+    )
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    def successful_payment(charge_id: str):
+        return SimpleNamespace(
+            effective_user=SimpleNamespace(id=1, language_code="en"),
+            message=SimpleNamespace(
+                reply_text=reply_text,
+                successful_payment=SimpleNamespace(
+                    invoice_payload=signer.sign(1, 1000, "USD"),
+                    total_amount=1000,
+                    currency="USD",
+                    telegram_payment_charge_id=charge_id,
+                ),
+            ),
+        )
+
+    for charge_id in ("charge-1", "charge-1"):
+        handler = PurchaseCommandHandler(db_engine)
+        await handler.successful_payment(successful_payment(charge_id), context)
+        await handler.close()
+
+    assert len(replies) == 1
+    assert 1 in context.application.paid_invoices
+
+    async with AsyncSession(db_engine) as session:
+        invoice = await session.scalar(select(Invoice).where(Invoice.id == 1))
+        assert invoice.paid
+        assert invoice.telegram_payment_charge_id == "charge-1"
+        subscription = await session.scalar(select(Subscription))
+        expire_ts = subscription.expire_ts
+
+    # The same invoice paid once again is credited as a new one, once
+    for charge_id in ("charge-2", "charge-2"):
+        handler = PurchaseCommandHandler(db_engine)
+        await handler.successful_payment(successful_payment(charge_id), context)
+        await handler.close()
+
+    assert len(replies) == 2
+
+    async with AsyncSession(db_engine) as session:
+        assert await session.scalar(select(func.count(Subscription.id))) == 1
+        subscription = await session.scalar(select(Subscription))
+        assert subscription.expire_ts == expire_ts + timedelta(days=7)
+
+        invoice = await session.scalar(
+            select(Invoice).where(Invoice.telegram_payment_charge_id == "charge-2")
+        )
+        assert invoice.id != 1 and invoice.paid
+        assert subscription.invoice_id == invoice.id
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers.product_menu_cache import ProductMenuCache
+from tour_guide_bot.helpers.product_selector import SelectProductHandler
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+from tour_guide_bot.models.guide import PaymentProvider, Product, Tour
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+class ProductSelector(SelectProductHandler):
+    async def after_product_selected(self, product, update, context, is_single):
+        pass
+
+    async def get_product_selection_message(self, tour_id, language, context):
+        return "Select the product"
+
+
+def product(price: int, language: str = "en") -> Product:
+    return Product(
+        tour_id=1,
+        payment_provider_id=1,
+        currency="USD",
+        price=price,
+        duration_days=1,
+        language=language,
+        title="Tour",
+        description="Tour",
+    )
+
+
+async def test_menu_is_rendered_once(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine) as session:
+        session.add_all(
+            [
+                Tour(id=1),
+                PaymentProvider(id=1, name="test", enabled=True, config={}),
+                TelegramUser(id=1, language="en"),
+                product(1000),
+                product(250),
+                product(300, "ru"),
+            ]
+        )
+        await session.commit()
+
+    queries = []
+    event.listen(
+        db_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: queries.append(args[2]),
+    )
+
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append((text, kwargs["reply_markup"]))
+
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            product_menu_cache=ProductMenuCache(),
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en", "ru"],
+            default_language="en",
+        )
+    )
+    update = SimpleNamespace(
+        callback_query=None,
+        effective_user=SimpleNamespace(id=1, language_code="en"),
+        message=SimpleNamespace(reply_text=reply_text),
+    )
+
+    handler = ProductSelector(db_engine)
+    await handler.send_product_selector(1, "en", update, context)
+    await handler.close()
+
+    text, keyboard = replies[0]
+    assert text == "Select the product"
+    assert [row[0].text for row in keyboard.inline_keyboard] == [
+        "$2.50 for 1 day (for 1 guest)",
+        "$10 for 1 day (for 1 guest)",
+        "Abort",
+    ]
+
+    queries.clear()
+
+    handler = ProductSelector(db_engine)
+    await handler.send_product_selector(1, "en", update, context)
+    await handler.close()
+
+    assert queries == []
+    assert replies[1][1] is keyboard
+
+    context.application.product_menu_cache.invalidate()
+    await handler.send_product_selector(1, "en", update, context)
+    await handler.close()
+
+    assert queries != []
+    assert replies[2][1] is not keyboard
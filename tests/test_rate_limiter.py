@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from tour_guide_bot.helpers.rate_limiter import OutboundRateLimiter, Priority
+
+
+@pytest.fixture
+async def limiter():
+    # One request per 20ms overall, with no practical per-chat limits
+    limiter = OutboundRateLimiter(
+        overall_max_rate=1,
+        overall_time_period=0.02,
+        private_chat_max_rate=100,
+        private_chat_time_period=1,
+        group_max_rate=100,
+        group_time_period=1,
+    )
+    await limiter.initialize()
+
+    yield limiter
+
+    await limiter.shutdown()
+
+
+async def send(
+    limiter: OutboundRateLimiter,
+    log: list,
+    name: str,
+    chat_id: int | None = 1,
+    priority: Priority | None = None,
+    endpoint: str = "sendMessage",
+):
+    async def callback():
+        log.append(name)
+        return True
+
+    return await limiter.process_request(
+        callback, (), {}, endpoint, {"chat_id": chat_id}, priority
+    )
+
+
+async def test_priority_lanes(limiter: OutboundRateLimiter):
+    log = []
+
+    tasks = [
+        asyncio.create_task(send(limiter, log, "bulk-%d" % i, priority=Priority.BULK))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+
+    tasks.append(
+        asyncio.create_task(
+            send(limiter, log, "payment", None, endpoint="answerPreCheckoutQuery")
+        )
+    )
+    tasks.append(asyncio.create_task(send(limiter, log, "reply", 2)))
+
+    await asyncio.gather(*tasks)
+
+    # The first bulk request goes through right away, the rest is reordered
+    assert log == ["bulk-0", "payment", "reply", "bulk-1", "bulk-2"]
+    assert limiter.stats["queue_depth"] == 0
+    assert limiter.stats["queued_requests"] == 4
+    assert limiter.stats["max_queue_depth"] >= 4
+    assert limiter.stats["max_wait_time"] > 0
+
+
+async def test_fair_queuing_across_chats(limiter: OutboundRateLimiter):
+    log = []
+
+    tasks = [
+        asyncio.create_task(send(limiter, log, "a-%d" % i, chat_id=1)) for i in range(4)
+    ]
+    await asyncio.sleep(0)
+    tasks += [
+        asyncio.create_task(send(limiter, log, "b-%d" % i, chat_id=2)) for i in range(2)
+    ]
+
+    await asyncio.gather(*tasks)
+
+    assert log == ["a-0", "a-1", "b-0", "a-2", "b-1", "a-3"]
+
+
+async def test_per_chat_limit():
+    limiter = OutboundRateLimiter(
+        overall_max_rate=100,
+        private_chat_max_rate=1,
+        private_chat_time_period=0.05,
+    )
+    await limiter.initialize()
+
+    try:
+        log = []
+        await asyncio.gather(
+            send(limiter, log, "a-0", chat_id=1),
+            send(limiter, log, "a-1", chat_id=1),
+            send(limiter, log, "b-0", chat_id=2),
+        )
+
+        # The second chat doesn't have to wait for the first one's limit
+        assert log == ["a-0", "b-0", "a-1"]
+    finally:
+        await limiter.shutdown()
+
+
+async def test_retry_after(limiter: OutboundRateLimiter):
+    attempts = 0
+
+    async def callback():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RetryAfter(0)
+
+        return True
+
+    assert await limiter.process_request(
+        callback, (), {}, "sendMessage", {"chat_id": 1}, None
+    )
+    assert attempts == 2
+    assert limiter.retries == 1
+
+    async def always_fail():
+        raise RetryAfter(0)
+
+    limiter.max_retries = 1
+    with pytest.raises(RetryAfter):
+        await limiter.process_request(
+            always_fail, (), {}, "sendMessage", {"chat_id": 1}, None
+        )
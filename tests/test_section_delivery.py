@@ -0,0 +1,170 @@
+from types import SimpleNamespace
+
+from telegram import InlineKeyboardMarkup
+from telegram.constants import ChatAction
+from telegram.ext import CommandHandler, ConversationHandler
+
+from tour_guide_bot.bot.guide.tours import ToursCommandHandler
+
+from tour_guide_bot.helpers.rate_limiter import Priority
+from tour_guide_bot.helpers.section_delivery import (
+    DeliveryPrompt,
+    SectionDelivery,
+    SectionDeliveryRegistry,
+)
+from tour_guide_bot.helpers.tour_content_cache import DeliveryItem
+from tour_guide_bot.models.guide import MessageType, Tour, TourTranslation
+
+
+def get_items() -> tuple[DeliveryItem, ...]:
+    return (
+        DeliveryItem(MessageType.text, ChatAction.TYPING, text="First"),
+        DeliveryItem(MessageType.voice, ChatAction.UPLOAD_VOICE, file_id="voice"),
+    )
+
+
+def test_steps_without_delay():
+    prompt = DeliveryPrompt("Continue?", InlineKeyboardMarkup([]))
+    delivery = SectionDelivery(1, get_items(), 0, prompt)
+
+    assert delivery.steps == [
+        (delivery.items[0], 0),
+        (delivery.items[1], 0),
+        (prompt, 0),
+    ]
+
+
+def test_steps_with_delay():
+    delivery = SectionDelivery(1, get_items(), 2.5)
+
+    assert delivery.steps == [
+        (ChatAction.TYPING, 2.5),
+        (delivery.items[0], 0),
+        (ChatAction.UPLOAD_VOICE, 2.5),
+        (delivery.items[1], 0),
+    ]
+
+
+async def test_run_pauses_via_job_queue(mocker):
+    delivery = SectionDelivery(1, get_items(), 2.5)
+
+    context = mocker.MagicMock()
+    context.bot = mocker.AsyncMock()
+
+    await delivery.run(context)
+    context.bot.send_chat_action.assert_awaited_once_with(
+        chat_id=1, action=ChatAction.TYPING, rate_limit_args=Priority.BULK
+    )
+    context.bot.send_message.assert_not_awaited()
+    context.job_queue.run_once.assert_called_once()
+    assert context.job_queue.run_once.call_args.args[1] == 2.5
+    assert delivery.step == 1
+
+    await delivery.run(context)
+    context.bot.send_message.assert_awaited_once()
+    assert context.bot.send_chat_action.await_count == 2
+    assert context.job_queue.run_once.call_count == 2
+
+    await delivery.run(context)
+    context.bot.send_voice.assert_awaited_once()
+    assert delivery.is_finished
+    assert delivery.job is None
+
+
+async def test_registry_deduplicates_and_cancels(mocker):
+    registry = SectionDeliveryRegistry()
+    job_queue = mocker.MagicMock()
+
+    delivery = SectionDelivery(1, get_items(), 2.5, translation_id=10, position=0)
+    registry.start(job_queue, delivery)
+    job = delivery.job
+
+    assert registry.is_in_progress(1, 10, 0)
+    assert not registry.is_in_progress(1, 10, 1)
+    assert not registry.is_in_progress(2, 10, 0)
+    assert registry.deduplicated == 1
+
+    assert registry.cancel(1)
+    assert delivery.is_finished
+    job.schedule_removal.assert_called_once()
+    assert not registry.cancel(1)
+    assert registry.stats == {"in_flight": 0, "cancelled": 1, "deduplicated": 1}
+
+    # A cancelled delivery doesn't send anything even if its job has already fired
+    context = mocker.MagicMock()
+    context.bot = mocker.AsyncMock()
+    await delivery.run(context)
+    context.bot.send_chat_action.assert_not_awaited()
+
+
+async def test_registry_newer_delivery_wins(mocker):
+    registry = SectionDeliveryRegistry()
+    job_queue = mocker.MagicMock()
+
+    first = SectionDelivery(1, get_items(), translation_id=10, position=0)
+    second = SectionDelivery(1, get_items(), translation_id=10, position=1)
+    registry.start(job_queue, first)
+    registry.start(job_queue, second)
+
+    assert first.is_cancelled
+    assert registry.cancelled == 1
+
+    context = mocker.MagicMock()
+    context.bot = mocker.AsyncMock()
+    await second.run(context)
+    assert second.is_finished
+    assert len(registry) == 0
+
+
+async def test_last_section_is_cancelled_after_conversation_end(mocker):
+    handlers = ToursCommandHandler.get_handlers()
+    assert isinstance(handlers[0], ConversationHandler)
+    assert isinstance(handlers[1], CommandHandler)
+    assert handlers[1].commands == frozenset({"cancel"})
+
+    registry = SectionDeliveryRegistry()
+    delivery = SectionDelivery(1, get_items(), 2.5)
+    registry.start(mocker.MagicMock(), delivery)
+
+    context = SimpleNamespace(application=SimpleNamespace(section_deliveries=registry))
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=1))
+    handler = mocker.MagicMock()
+    handler.cancel_without_conversation = mocker.AsyncMock()
+
+    await ToursCommandHandler.cancel_delivery(handler, update, context)
+    assert delivery.is_cancelled
+    handler.cancel_without_conversation.assert_awaited_once_with(update, context)
+
+    # Nothing to cancel, so the command is left unanswered as before
+    await ToursCommandHandler.cancel_delivery(handler, update, context)
+    handler.cancel_without_conversation.assert_awaited_once()
+
+
+async def test_first_section_uses_selected_tour(mocker):
+    tour = Tour(
+        id=1,
+        translations=[
+            TourTranslation(id=10, language="en", title="Tour", content_version=3)
+        ],
+    )
+
+    section = mocker.MagicMock()
+    context = mocker.MagicMock()
+    context.application.tour_content_cache.get = mocker.AsyncMock(return_value=section)
+    update = mocker.MagicMock()
+    handler = mocker.MagicMock()
+    handler.db_session.scalar = mocker.AsyncMock()
+    handler.get_identity = mocker.AsyncMock(
+        return_value=SimpleNamespace(id=1, language="en")
+    )
+    handler.display_section = mocker.AsyncMock(return_value=1)
+
+    assert (
+        await ToursCommandHandler.display_first_section(handler, tour, update, context)
+        == 1
+    )
+    handler.db_session.scalar.assert_not_awaited()
+    context.application.tour_content_cache.get.assert_awaited_once_with(
+        handler.db_session, 10, 0, 3
+    )
+    handler.display_section.assert_awaited_once_with(section, update, context)
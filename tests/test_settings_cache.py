@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers import settings_cache
+from tour_guide_bot.helpers.settings_cache import SettingsCache
+from tour_guide_bot.models.settings import Settings, SettingsKey
+
+
+async def test_typed_values_and_negative_caching(db_engine: AsyncEngine):
+    queries = []
+    event.listen(
+        db_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: queries.append(args[2]),
+    )
+
+    cache = SettingsCache()
+
+    async with AsyncSession(db_engine) as session:
+        session.add(Settings(key=SettingsKey.delay_between_messages, value="1.5"))
+        session.add(Settings(key=SettingsKey.terms_message, language="en", value="t"))
+        await session.commit()
+
+        queries.clear()
+
+        assert await cache.get(session, SettingsKey.delay_between_messages) == 1.5
+        assert await cache.get(session, SettingsKey.audio_to_voice) is None
+        assert await cache.get(session, SettingsKey.audio_to_voice, default=True)
+        assert await cache.get(session, SettingsKey.terms_message, "ru") is None
+        assert await cache.exists(session, [SettingsKey.terms_message], "en")
+        assert not await cache.exists(
+            session, [SettingsKey.terms_message, SettingsKey.support_message], "en"
+        )
+
+    assert len(queries) == 1
+
+
+async def test_invalidation(db_engine: AsyncEngine):
+    cache = SettingsCache()
+
+    async with AsyncSession(db_engine) as session:
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+
+        session.add(Settings(key=SettingsKey.support_message, language="en", value="s"))
+        await session.commit()
+
+        # The change is not seen until the next version check
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+
+        cache.invalidate()
+        assert await cache.get(session, SettingsKey.support_message, "en") == "s"
+        assert cache.loads == 2
+
+
+async def test_version_check(db_engine: AsyncEngine):
+    cache = SettingsCache(check_interval=0)
+
+    async with AsyncSession(db_engine) as session:
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+        assert cache.loads == 1
+
+        session.add(Settings(key=SettingsKey.support_message, language="en", value="s"))
+        await session.commit()
+
+        assert await cache.get(session, SettingsKey.support_message, "en") == "s"
+        assert cache.loads == 2
+
+
+async def test_stale_until_check_interval(
+    db_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+):
+    now = 1000.0
+    monkeypatch.setattr(settings_cache, "monotonic", lambda: now)
+    cache = SettingsCache(check_interval=5)
+
+    async with AsyncSession(db_engine) as session:
+        session.add(Settings(key=SettingsKey.support_message, language="en", value="s"))
+        await session.commit()
+
+        assert await cache.get(session, SettingsKey.support_message, "en") == "s"
+
+        # Another instance of the bot removes the setting
+        await session.execute(delete(Settings))
+        await session.commit()
+
+        now += 4.9
+        assert await cache.get(session, SettingsKey.support_message, "en") == "s"
+
+        now += 0.1
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+        assert cache.loads == 2
+
+
+async def test_write_through_invalidation(
+    db_engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings_cache, "monotonic", lambda: 1000.0)
+    cache = SettingsCache(check_interval=5)
+
+    async with AsyncSession(db_engine) as session:
+        assert await cache.get(session, SettingsKey.support_message, "en") is None
+
+        # The handler changing the setting invalidates the cache of its instance
+        session.add(Settings(key=SettingsKey.support_message, language="en", value="s"))
+        await session.commit()
+        cache.invalidate()
+
+        assert await cache.get(session, SettingsKey.support_message, "en") == "s"
+        assert cache.loads == 2
+
+
+async def test_exists_language(db_engine: AsyncEngine):
+    cache = SettingsCache()
+
+    async with AsyncSession(db_engine) as session:
+        session.add(Settings(key=SettingsKey.terms_message, language="en", value="t"))
+        session.add(Settings(key=SettingsKey.support_message, language="ru", value="s"))
+        await session.commit()
+
+        keys = [SettingsKey.terms_message, SettingsKey.support_message]
+
+        # The language must match exactly
+        assert not await cache.exists(session, keys, "en")
+        assert not await cache.exists(session, keys, "ru")
+        assert await cache.exists(session, [SettingsKey.support_message], "ru")
+
+        # Without the language any of them counts
+        assert await cache.exists(session, keys)
+        assert not await cache.exists(session, [SettingsKey.audio_to_voice])
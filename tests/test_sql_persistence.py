@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from telegram.ext import PicklePersistence
+
+from tour_guide_bot.helpers.sql_persistence import SqlPersistence
+
+
+def count_statements(engine: AsyncEngine) -> list[str]:
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+async def test_incremental_updates(db_engine: AsyncEngine):
+    persistence = SqlPersistence(db_engine)
+    statements = count_statements(db_engine)
+
+    # Application runs the updates concurrently, they end up in one upsert
+    await asyncio.gather(
+        persistence.update_user_data(1, {"tour_id": 1}),
+        persistence.update_user_data(2, {"tour_id": 2}),
+        persistence.update_conversation("admin-add-tour", (1, 1), 3),
+        persistence.update_bot_data({"version": 1}),
+    )
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+
+    # Unchanged values are not written again
+    statements.clear()
+    await persistence.update_user_data(1, {"tour_id": 1})
+    assert statements == []
+
+    await asyncio.gather(
+        persistence.update_user_data(1, {"tour_id": 3}),
+        persistence.update_conversation("admin-add-tour", (1, 1), None),
+        persistence.drop_user_data(2),
+    )
+    await persistence.flush()
+
+    restored = SqlPersistence(db_engine)
+    assert await restored.get_user_data() == {1: {"tour_id": 3}}
+    assert await restored.get_bot_data() == {"version": 1}
+    assert await restored.get_conversations("admin-add-tour") == {}
+
+
+async def test_conversations_are_loaded_by_name(db_engine: AsyncEngine):
+    persistence = SqlPersistence(db_engine)
+    await asyncio.gather(
+        persistence.update_conversation("admin-add-tour", (1, 1), 3),
+        persistence.update_conversation("admin-revoke", (1, 1), 5),
+    )
+
+    restored = SqlPersistence(db_engine)
+    assert await restored.get_conversations("admin-revoke") == {(1, 1): 5}
+
+
+async def test_import_pickle(db_engine: AsyncEngine, persistence_path: Path):
+    pickle_path = persistence_path / "storage.pickle"
+
+    source = PicklePersistence(pickle_path)
+    await source.get_conversations("admin-add-tour")
+    await source.update_user_data(1, {"phone_number": "+1234"})
+    await source.update_chat_data(-5, {"language": "en"})
+    await source.update_conversation("admin-add-tour", (1, 1), 3)
+
+    persistence = SqlPersistence(db_engine)
+    assert await persistence.import_pickle(str(pickle_path)) == 3
+
+    restored = SqlPersistence(db_engine)
+    assert await restored.get_user_data() == {1: {"phone_number": "+1234"}}
+    assert await restored.get_chat_data() == {-5: {"language": "en"}}
+    assert await restored.get_conversations("admin-add-tour") == {(1, 1): 3}
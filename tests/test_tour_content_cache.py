@@ -0,0 +1,141 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers.tour_content_cache import (
+    TourContentCache,
+    bump_content_version,
+)
+from tour_guide_bot.models.guide import (
+    MessageType,
+    Tour,
+    TourSection,
+    TourSectionContent,
+    TourTranslation,
+)
+
+
+async def create_translation(session: AsyncSession, sections_count: int = 2):
+    tour = Tour()
+    translation = TourTranslation(language="en", tour=tour, title="Test tour")
+    session.add_all([tour, translation])
+
+    for idx in range(sections_count):
+        section = TourSection(
+            tour_translation=translation, title="Section %d" % idx, position=idx
+        )
+        session.add(section)
+        session.add(
+            TourSectionContent(
+                tour_section=section,
+                position=0,
+                message_type=MessageType.text,
+                content={"text": "Text %d" % idx},
+            )
+        )
+
+    await session.commit()
+
+    return translation
+
+
+async def test_read_through(db_engine: AsyncEngine):
+    cache = TourContentCache()
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        translation = await create_translation(session)
+
+        first = await cache.get(session, translation.id, 0)
+        assert first is not None
+        assert first.title == "Section 0"
+        assert first.sections_count == 2
+        assert not first.is_last
+        assert cache.misses == 1 and cache.hits == 0
+
+        # Only the requested section is loaded
+        assert len(cache) == 1
+
+        last = await cache.get(session, translation.id, 1)
+        assert last.items[0].text == "Text 1"
+        assert last.is_last
+
+        assert await cache.get(session, translation.id, 0) is first
+        assert (
+            await cache.get(session, translation.id, 0, first.content_version) is first
+        )
+        assert cache.hits == 2
+
+        assert await cache.get(session, translation.id, 2) is None
+        assert await cache.get(session, -1, 0) is None
+        assert cache.misses == 4
+
+
+async def test_invalidation(db_engine: AsyncEngine):
+    cache = TourContentCache()
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        translation = await create_translation(session)
+        first = await cache.get(session, translation.id, 0)
+        await cache.get(session, translation.id, 1)
+
+        cache.invalidate_section(first.id)
+        assert len(cache) == 0
+
+        first = await cache.get(session, translation.id, 0)
+        cache.invalidate_tour(first.tour_id)
+        assert len(cache) == 0
+        assert cache.size == 0
+
+        first = await cache.get(session, translation.id, 0)
+        await cache.get(session, translation.id, 1)
+        assert await cache.get(session, translation.id, 0, 1) is not first
+        assert len(cache) == 1
+
+
+async def test_lru_eviction(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        translations = [await create_translation(session) for _ in range(3)]
+
+        cache = TourContentCache()
+        first = await cache.get(session, translations[0].id, 0)
+        cache.max_size = first.size * 2
+
+        await cache.get(session, translations[1].id, 0)
+        await cache.get(session, translations[0].id, 0)
+        await cache.get(session, translations[2].id, 0)
+
+        assert cache.evictions == 1
+        assert cache.size <= cache.max_size
+        assert await cache.get(session, translations[0].id, 0) is first
+        assert cache.misses == 3
+
+
+async def test_content_version(db_engine: AsyncEngine):
+    cache = TourContentCache()
+
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        translation = await create_translation(session)
+        last = await cache.get(session, translation.id, 1)
+        assert last.content_version == 0
+        assert last.is_last
+
+        # Another instance of the bot adds a section and its content right away,
+        # both within the same second
+        session.add(
+            TourSection(tour_translation=translation, title="Section 2", position=2)
+        )
+        await session.execute(bump_content_version(translation.id))
+        await session.commit()
+        await session.execute(bump_content_version(translation.id))
+        await session.commit()
+
+        content_version = await session.scalar(
+            select(TourTranslation.content_version).where(
+                TourTranslation.id == translation.id
+            )
+        )
+        assert content_version == 2
+
+        last = await cache.get(session, translation.id, 1, content_version)
+        assert last.content_version == 2
+        assert not last.is_last
+        assert await cache.get(session, translation.id, 1, content_version) is last
@@ -0,0 +1,47 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tour_guide_bot.helpers.tour_titles import (
+    TourTitle,
+    TourTitlesCache,
+    load_tour_titles,
+    select_tour_titles,
+)
+from tour_guide_bot.models.guide import Tour, TourTranslation
+
+
+async def test_title_fallback(db_engine: AsyncEngine):
+    async with AsyncSession(db_engine) as session:
+        session.add_all(
+            [
+                Tour(
+                    id=1,
+                    translations=[
+                        TourTranslation(language="en", title="One"),
+                        TourTranslation(language="ru", title="Один"),
+                    ],
+                ),
+                Tour(id=2, translations=[TourTranslation(language="en", title="Two")]),
+                Tour(id=3, translations=[TourTranslation(language="de", title="Drei")]),
+                Tour(id=4),
+            ]
+        )
+        await session.commit()
+
+        assert await load_tour_titles(session, select_tour_titles("ru", "en")) == [
+            TourTitle(1, "Один"),
+            TourTitle(2, "Two"),
+            TourTitle(3, "Drei"),
+            TourTitle(4, "Unnamed tour #4"),
+        ]
+
+        cache = TourTitlesCache()
+        stmt = select_tour_titles("en", "en").where(Tour.id < 3)
+        titles = await cache.get(session, "all", "en", stmt)
+        assert titles == [TourTitle(1, "One"), TourTitle(2, "Two")]
+
+        session.add(Tour(id=0))
+        await session.commit()
+        assert await cache.get(session, "all", "en", stmt) is titles
+
+        cache.invalidate()
+        assert len(await cache.get(session, "all", "en", stmt)) == 3
@@ -0,0 +1,191 @@
+import pickle
+from itertools import chain
+from pathlib import Path
+from time import time
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from telegram import Update
+from telegram.ext import CallbackContext, ContextTypes, ConversationHandler, TypeHandler
+
+from tour_guide_bot.bot.app import Application
+from tour_guide_bot.cli import prepare_app
+from tour_guide_bot.helpers.user_data import UserData
+
+
+def get_conversations(handlers) -> list[ConversationHandler]:
+    ret = []
+
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            ret.append(handler)
+            ret += get_conversations(
+                chain(handler.entry_points, *handler.states.values(), handler.fallbacks)
+            )
+
+    return ret
+
+
+def test_pickle_keeps_metadata():
+    data = UserData({"tour_id": 1}, last_activity=200, conversations={"tour"})
+
+    restored = pickle.loads(pickle.dumps(data))
+    assert restored == {"tour_id": 1}
+    assert restored.last_activity == 200
+    assert restored.conversations == {"tour"}
+
+
+async def test_conversations_are_tracked():
+    app = (
+        Application.builder()
+        .token("123456:test")
+        .context_types(ContextTypes(user_data=UserData))
+        .build()
+    )
+
+    states = iter([1, None, ConversationHandler.END])
+
+    async def callback(update, context):
+        return next(states)
+
+    handler = ConversationHandler([TypeHandler(Update, callback)], {}, [], name="tour")
+    app.add_handler(handler)
+
+    context = SimpleNamespace(user_data=UserData())
+    tracked = handler.entry_points[0].callback
+
+    assert await tracked(None, context) == 1
+    assert context.user_data.conversations == {"tour"}
+
+    assert await tracked(None, context) is None
+    assert context.user_data.conversations == {"tour"}
+
+    assert await tracked(None, context) == ConversationHandler.END
+    assert context.user_data.conversations == set()
+
+
+async def test_real_conversations_are_tracked(
+    db_engine: AsyncEngine, persistence_path: Path
+):
+    app = prepare_app("123456:test", db_engine, ["en"], "en", str(persistence_path))
+    app.register_handlers()
+
+    conversations = get_conversations(chain(*app.handlers.values()))
+    names = {conversation.name for conversation in conversations}
+    assert {"admin-init", "admin-approve", "admin-tour-audio-convert"} <= names
+    assert {"guest-init", "guest-tour"} <= names
+
+    for conversation in conversations:
+        for handler in chain(
+            conversation.entry_points,
+            *conversation.states.values(),
+            conversation.fallbacks,
+        ):
+            if not isinstance(handler, ConversationHandler):
+                assert handler.callback.__name__ == "tracked"
+
+
+async def test_abandoned_conversations_time_out(
+    db_engine: AsyncEngine, persistence_path: Path
+):
+    app = prepare_app("123456:test", db_engine, ["en"], "en", str(persistence_path))
+    app.register_handlers()
+
+    conversations = {
+        conversation.name: conversation
+        for conversation in get_conversations(chain(*app.handlers.values()))
+    }
+
+    for name, conversation in conversations.items():
+        if name.startswith("admin-") and name != "admin-init":
+            assert conversation.conversation_timeout
+            assert conversation.states[ConversationHandler.TIMEOUT]
+
+    async def trigger_timeout(name: str, user_data: UserData):
+        context = SimpleNamespace(user_data=user_data)
+        for handler in conversations[name].states[ConversationHandler.TIMEOUT]:
+            await handler.callback(None, context)
+
+    user_data = UserData(
+        {"phone_number": "123", "tour_id": 1, "language": "en"},
+        conversations={"admin-approve"},
+    )
+    await trigger_timeout("admin-approve", user_data)
+    assert user_data == {"language": "en"}
+    assert user_data.conversations == set()
+
+    # The audio conversion times out without dropping the tour being added
+    user_data = UserData(
+        {"tour_id": 1, "tour_section_id": 2, "audio_file_id": "a"},
+        conversations={"admin-add-tour", "admin-tour-audio-convert"},
+    )
+    await trigger_timeout("admin-tour-audio-convert", user_data)
+    assert user_data == {"tour_id": 1, "tour_section_id": 2}
+    assert user_data.conversations == {"admin-add-tour"}
+
+    await trigger_timeout("admin-add-tour", user_data)
+    assert user_data == {}
+    assert user_data.conversations == set()
+
+
+async def test_nested_conversation_is_tracked():
+    app = (
+        Application.builder()
+        .token("123456:test")
+        .context_types(ContextTypes(user_data=UserData))
+        .build()
+    )
+
+    async def enter(update, context):
+        return 1
+
+    async def leave(update, context):
+        return 2
+
+    nested = ConversationHandler(
+        [TypeHandler(Update, enter)],
+        {1: [TypeHandler(Update, leave)]},
+        [],
+        name="nested",
+        map_to_parent={2: ConversationHandler.END},
+    )
+    app.add_handler(
+        ConversationHandler([TypeHandler(Update, enter)], {1: [nested]}, [], name="top")
+    )
+
+    context = SimpleNamespace(user_data=UserData())
+    await nested.entry_points[0].callback(None, context)
+    assert context.user_data.conversations == {"nested"}
+
+    await nested.states[1][0].callback(None, context)
+    assert context.user_data.conversations == set()
+
+
+async def test_evict_stale_user_data():
+    app = (
+        Application.builder()
+        .token("123456:test")
+        .context_types(ContextTypes(user_data=UserData))
+        .build()
+    )
+
+    stale = time() - Application.USER_DATA_TTL - 1
+
+    idle = app.user_data[1]
+    idle["tour_id"] = 1
+    idle.last_activity = stale
+
+    # The data written at the start of a conversation is read until its end
+    in_conversation = app.user_data[2]
+    in_conversation["tour_id"] = 2
+    in_conversation.last_activity = stale
+    in_conversation.conversations.add("admin-add-tour")
+
+    active = app.user_data[3]
+    active["tour_id"] = 3
+
+    await app.evict_stale_user_data(CallbackContext(app))
+
+    assert 1 not in app.user_data
+    assert app.user_data[2] == {"tour_id": 2}
+    assert app.user_data[3] == {"tour_id": 3}
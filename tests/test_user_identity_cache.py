@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from tour_guide_bot.helpers.telegram import BaseHandlerCallback
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
+from tour_guide_bot.models.telegram import TelegramUser
+
+
+def test_ttl_and_invalidation():
+    cache = UserIdentityCache(ttl=60, max_entries=2)
+
+    identity = cache.put(TelegramUser(id=1, language="en", guest_id=5))
+    assert cache.get(1) is identity
+    assert not identity.is_admin
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    cache.ttl = -1
+    cache.put(TelegramUser(id=1, language="en"))
+    assert cache.get(1) is None
+
+    cache.put(TelegramUser(id=2, language="en"))
+    cache.put(TelegramUser(id=3, language="en"))
+    assert len(cache) == 2
+    assert cache.stats == {"entries": 2, "hits": 1, "misses": 2}
+
+
+async def test_identity_is_reused_across_updates(db_engine: AsyncEngine):
+    queries = []
+    event.listen(
+        db_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: queries.append(args[2]),
+    )
+
+    context = SimpleNamespace(
+        application=SimpleNamespace(
+            user_identity_cache=UserIdentityCache(),
+            enabled_languages=["en", "ru"],
+            default_language="en",
+        )
+    )
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1, language_code="ru"))
+
+    handler = BaseHandlerCallback(db_engine)
+    assert await handler.get_language(update, context) == "ru"
+    await handler.close()
+
+    queries.clear()
+
+    handler = BaseHandlerCallback(db_engine)
+    assert await handler.get_language(update, context) == "ru"
+    assert handler._db_session is None
+
+    assert queries == []
@@ -28,12 +28,15 @@ class ApproveCommandHandler(AdminProtectedBaseHandlerCallback):
     STATE_TOUR = 1
     STATE_DURATION = 3
 
+    CONTEXT_KEYS = ("phone_number", "tour_id")
+
     @classmethod
     def get_handlers(cls):
         return [
             ConversationHandler(
                 entry_points=[CommandHandler("approve", cls.partial(cls.start))],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_TOUR: [
                         CallbackQueryHandler(
                             cls.partial(cls.tour),
@@ -63,11 +66,12 @@ class ApproveCommandHandler(AdminProtectedBaseHandlerCallback):
                 ],
                 name="admin-approve",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
     def cleanup_context(self, context: ContextTypes.DEFAULT_TYPE):
-        for key in ("phone_number", "tour_id"):
+        for key in self.CONTEXT_KEYS:
             if key in context.user_data:
                 del context.user_data[key]
 
@@ -119,6 +123,8 @@ class ApproveCommandHandler(AdminProtectedBaseHandlerCallback):
         self.db_session.add(purchase)
         await self.db_session.commit()
 
+        context.application.notify_new_subscription(purchase.id)
+
         await update.message.reply_text(
             t(user.language)
             .pgettext(
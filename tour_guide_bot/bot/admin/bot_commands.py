@@ -1,5 +1,8 @@
+from functools import cache
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from telegram import Bot, BotCommand, BotCommandScopeChat
+from telegram import BotCommand, BotCommandScopeChat, Update
+from telegram.ext import ContextTypes
 
 from tour_guide_bot import t
 from tour_guide_bot.models.telegram import TelegramUser
@@ -7,9 +10,8 @@ from tour_guide_bot.models.telegram import TelegramUser
 
 class BotCommandsFactory:
     @staticmethod
-    async def start(
-        bot: Bot, user: TelegramUser, language: str, db_session: AsyncSession
-    ):
+    @cache
+    def get_commands(language: str) -> tuple[BotCommand, ...]:
         commands = []
 
         commands.append(
@@ -58,4 +60,21 @@ class BotCommandsFactory:
             )
         )
 
-        await bot.set_my_commands(commands, BotCommandScopeChat(user.id))
+        return tuple(commands)
+
+    @staticmethod
+    async def start(
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        user: TelegramUser,
+        language: str,
+        db_session: AsyncSession,
+    ):
+        commands_cache = context.application.bot_commands_cache
+        fingerprint = ("admin", language)
+
+        if not commands_cache.is_sent(user.id, fingerprint):
+            await update.get_bot().set_my_commands(
+                BotCommandsFactory.get_commands(language), BotCommandScopeChat(user.id)
+            )
+            commands_cache.remember(user.id, fingerprint)
@@ -34,6 +34,7 @@ class AudioToVoice(SubcommandHandler):
                     ),
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_AUDIO_TO_VOICE: [
                         CallbackQueryHandler(
                             cls.partial(cls.change_audio_to_voice),
@@ -49,6 +50,7 @@ class AudioToVoice(SubcommandHandler):
                 ],
                 name="admin-configure-audio-to-voice",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -125,6 +127,7 @@ class AudioToVoice(SubcommandHandler):
 
         self.db_session.add(audio_to_voice_state)
         await self.db_session.commit()
+        context.application.settings_cache.invalidate()
 
         if context.matches[0].group(1) == "enable":
             await update.callback_query.edit_message_text(
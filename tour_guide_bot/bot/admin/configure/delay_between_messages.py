@@ -31,6 +31,7 @@ class DelayBetweenMessages(SubcommandHandler):
                     )
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_DELAY_BETWEEN_MESSAGES: [
                         MessageHandler(
                             filters.TEXT & ~filters.COMMAND,
@@ -46,6 +47,7 @@ class DelayBetweenMessages(SubcommandHandler):
                 ],
                 name="admin-configure-delay-between-messages",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -99,6 +101,7 @@ class DelayBetweenMessages(SubcommandHandler):
         delay_between_messages_state.value = delay
         self.db_session.add(delay_between_messages_state)
         await self.db_session.commit()
+        context.application.settings_cache.invalidate()
 
         await update.message.reply_text(
             t(language).pgettext(
@@ -21,6 +21,8 @@ from tour_guide_bot.models.settings import Settings, SettingsKey
 class MessagesBase(SubcommandHandler, SelectLanguageHandler):
     STATE_CHANGE_MESSAGE = 1
 
+    CONTEXT_KEYS = ("message_target_language",)
+
     @staticmethod
     @abc.abstractmethod
     def get_message_name(language: str) -> str:
@@ -42,6 +44,7 @@ class MessagesBase(SubcommandHandler, SelectLanguageHandler):
                     )
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_LANGUAGE_SELECTION: cls.get_select_language_handlers(),
                     cls.STATE_CHANGE_MESSAGE: [
                         MessageHandler(
@@ -62,6 +65,7 @@ class MessagesBase(SubcommandHandler, SelectLanguageHandler):
                 ],
                 name="admin-configure-" + cls.__module__ + "." + cls.__name__.lower(),
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -155,6 +159,7 @@ class MessagesBase(SubcommandHandler, SelectLanguageHandler):
 
         self.db_session.add(message)
         await self.db_session.commit()
+        context.application.settings_cache.invalidate()
 
         await update.message.reply_text(
             t(user.language).pgettext(
@@ -15,7 +15,7 @@ from tour_guide_bot.bot.admin.configure.payments.payment_provider.delete import
     DeletePaymentProvider,
 )
 from tour_guide_bot.helpers.telegram import MenuCommandHandler, SubcommandHandler
-from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.settings import SettingsKey
 
 
 class PaymentsSubcommand(MenuCommandHandler, SubcommandHandler):
@@ -42,18 +42,13 @@ class PaymentsSubcommand(MenuCommandHandler, SubcommandHandler):
             ),
         ]
 
-    async def get_extra_buttons(
-        self,
-        update: Update,
-        context: ContextTypes.DEFAULT_TYPE,
-    ) -> list[list[InlineKeyboardButton]]:
+    @classmethod
+    def get_extra_buttons(cls, language: str) -> list[list[InlineKeyboardButton]]:
         return [
             [
                 InlineKeyboardButton(
-                    t(await self.get_language(update, context)).pgettext(
-                        "bot-generic", "« Back"
-                    ),
-                    callback_data=self.get_callback_data("root"),
+                    t(language).pgettext("bot-generic", "« Back"),
+                    callback_data=cls.get_callback_data("root"),
                 )
             ],
         ]
@@ -81,14 +76,12 @@ class PaymentsSubcommand(MenuCommandHandler, SubcommandHandler):
     async def is_menu_available(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> bool:
-        terms_and_support_exists = True
-        # TODO: optimize the query
         for lang in context.application.enabled_languages:
-            terms_and_support_exists = terms_and_support_exists and (
-                await Settings.exists(
-                    self.db_session,
-                    [SettingsKey.terms_message, SettingsKey.support_message],
-                    lang,
-                )
-            )
-        return terms_and_support_exists
+            if not await context.application.settings_cache.exists(
+                self.db_session,
+                [SettingsKey.terms_message, SettingsKey.support_message],
+                lang,
+            ):
+                return False
+
+        return True
@@ -17,6 +17,8 @@ class AddPaymentProvider(SubcommandHandler):
     STATE_WAITING_FOR_NAME = 1
     STATE_WAITING_FOR_TOKEN = 2
 
+    CONTEXT_KEYS = ("provider_name",)
+
     @staticmethod
     def get_name(language: str) -> str:
         return t(language).pgettext("admin-configure", "Add payment token")
@@ -32,6 +34,7 @@ class AddPaymentProvider(SubcommandHandler):
                     )
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_WAITING_FOR_NAME: [
                         MessageHandler(
                             filters.TEXT & ~filters.COMMAND,
@@ -61,6 +64,7 @@ class AddPaymentProvider(SubcommandHandler):
                 ],
                 name="admin-configure-" + cls.__name__.lower(),
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -81,7 +85,7 @@ class AddPaymentProvider(SubcommandHandler):
     ):
         lang = await self.get_language(update, context)
 
-        if not await self.is_available(self.db_session):
+        if not self.is_available(await self.get_menu_counts()):
             await update.callback_query.answer()
             await update.callback_query.edit_message_text(
                 t(lang).pgettext(
@@ -104,7 +108,7 @@ class AddPaymentProvider(SubcommandHandler):
     async def set_name(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         lang = await self.get_language(update, context)
 
-        if not await self.is_available(self.db_session):
+        if not self.is_available(await self.get_menu_counts()):
             await update.message.reply_text(
                 t(lang).pgettext(
                     "bot-generic", "Something went wrong; please try again."
@@ -127,7 +131,7 @@ class AddPaymentProvider(SubcommandHandler):
         lang = await self.get_language(update, context)
 
         if (
-            not await self.is_available(self.db_session)
+            not self.is_available(await self.get_menu_counts())
             or "provider_name" not in context.user_data
         ):
             await update.message.reply_text(
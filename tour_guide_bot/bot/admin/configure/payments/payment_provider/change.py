@@ -1,5 +1,4 @@
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Update
 from telegram.ext import (
     CallbackQueryHandler,
@@ -11,6 +10,7 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.payment_provider_selector import PaymentProviderSelector
 from tour_guide_bot.helpers.telegram import SubcommandHandler
 from tour_guide_bot.models.settings import PaymentProvider
@@ -19,6 +19,8 @@ from tour_guide_bot.models.settings import PaymentProvider
 class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
     STATE_WAITING_FOR_TOKEN = 1
 
+    CONTEXT_KEYS = ("provider_id",)
+
     @classmethod
     def get_handlers(cls):
         return [
@@ -30,6 +32,7 @@ class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
                     )
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_SELECT_PAYMENT_PROVIDER: cls.get_select_payment_provider_handlers(),
                     cls.STATE_WAITING_FOR_TOKEN: [
                         MessageHandler(
@@ -50,6 +53,7 @@ class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
                 ],
                 name="admin-configure-" + cls.__name__.lower(),
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -58,10 +62,8 @@ class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
         return t(language).pgettext("admin-configure", "Change payment token")
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        stmt = select(PaymentProvider).where(PaymentProvider.enabled == True)
-        provider: PaymentProvider | None = await db_session.scalar(stmt)
-        return provider is not None
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.payment_providers > 0
 
     async def incorrect_message(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -89,7 +91,7 @@ class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
     ):
         lang = await self.get_language(update, context)
 
-        if not await self.is_available(self.db_session):
+        if not self.is_available(await self.get_menu_counts()):
             await update.callback_query.answer()
             await update.callback_query.edit_message_text(
                 t(lang).pgettext(
@@ -115,7 +117,7 @@ class ChangePaymentProvider(SubcommandHandler, PaymentProviderSelector):
     async def set_token(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         lang = await self.get_language(update, context)
 
-        if not await self.is_available(self.db_session):
+        if not self.is_available(await self.get_menu_counts()):
             await update.message.reply_text(
                 t(lang).pgettext(
                     "bot-generic", "Something went wrong; please try again."
@@ -1,5 +1,4 @@
 from sqlalchemy import Sequence, select
-from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
     CallbackQueryHandler,
@@ -7,6 +6,7 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.payment_provider_selector import PaymentProviderSelector
 from tour_guide_bot.helpers.telegram import SubcommandHandler
 from tour_guide_bot.models.guide import Product
@@ -39,10 +39,8 @@ class DeletePaymentProvider(SubcommandHandler, PaymentProviderSelector):
         ]
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        stmt = select(PaymentProvider).where(PaymentProvider.enabled == True)
-        provider: PaymentProvider | None = await db_session.scalar(stmt)
-        return provider is not None
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.payment_providers > 0
 
     def get_payment_provider_selection_message(self, language: str) -> str:
         return t(language).pgettext(
@@ -81,6 +79,9 @@ class DeletePaymentProvider(SubcommandHandler, PaymentProviderSelector):
             self.db_session.add(product)
 
         await self.db_session.commit()
+        context.application.bot_commands_cache.invalidate_products()
+        context.application.tour_titles_cache.invalidate()
+        context.application.product_menu_cache.invalidate()
 
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
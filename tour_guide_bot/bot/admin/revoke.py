@@ -27,12 +27,15 @@ class RevokeCommandHandler(AdminProtectedBaseHandlerCallback):
     STATE_PHONE_NUMBER = 2
     STATE_REVOKE = 3
 
+    CONTEXT_KEYS = ("guest_id", "tour_id")
+
     @classmethod
     def get_handlers(cls):
         return [
             ConversationHandler(
                 entry_points=[CommandHandler("revoke", cls.partial(cls.start))],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_TOUR: [
                         CallbackQueryHandler(
                             cls.partial(cls.tour),
@@ -63,11 +66,12 @@ class RevokeCommandHandler(AdminProtectedBaseHandlerCallback):
                 ],
                 name="admin-revoke",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
     def cleanup_context(self, context: ContextTypes.DEFAULT_TYPE):
-        for key in ("phone_number", "tour_id"):
+        for key in self.CONTEXT_KEYS:
             if key in context.user_data:
                 del context.user_data[key]
 
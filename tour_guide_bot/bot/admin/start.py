@@ -113,6 +113,7 @@ class StartCommandHandler(BaseHandlerCallback):
 
         self.db_session.add(user)
         await self.db_session.commit()
+        context.application.user_identity_cache.invalidate(user.id)
 
         if admin:
             await update.message.reply_text(
@@ -124,7 +125,8 @@ class StartCommandHandler(BaseHandlerCallback):
             )
 
             await BotCommandsFactory.start(
-                update.get_bot(),
+                update,
+                context,
                 user,
                 await self.get_language(update, context),
                 self.db_session,
@@ -151,6 +153,7 @@ class StartCommandHandler(BaseHandlerCallback):
             user.admin = admin
             self.db_session.add_all([admin, user])
             await self.db_session.commit()
+            context.application.user_identity_cache.invalidate(user.id)
 
             await update.message.reply_text(
                 t(user.language).pgettext(
@@ -160,7 +163,8 @@ class StartCommandHandler(BaseHandlerCallback):
             )
 
             await BotCommandsFactory.start(
-                update.get_bot(),
+                update,
+                context,
                 user,
                 await self.get_language(update, context),
                 self.db_session,
@@ -185,7 +189,8 @@ class StartCommandHandler(BaseHandlerCallback):
         )
 
         await GuestBotCommandsFactory.start(
-            update.get_bot(),
+            update,
+            context,
             user,
             await self.get_language(update, context),
             self.db_session,
@@ -203,7 +208,8 @@ class StartCommandHandler(BaseHandlerCallback):
             )
 
             await BotCommandsFactory.start(
-                update.get_bot(),
+                update,
+                context,
                 user,
                 await self.get_language(update, context),
                 self.db_session,
@@ -226,6 +232,7 @@ class StartCommandHandler(BaseHandlerCallback):
                 user.admin = admin
                 self.db_session.add(user)
                 await self.db_session.commit()
+                context.application.user_identity_cache.invalidate(user.id)
                 await update.message.reply_text(
                     t(user.language).pgettext(
                         "admin-bot-start", "Welcome to the admin mode!"
@@ -233,7 +240,8 @@ class StartCommandHandler(BaseHandlerCallback):
                 )
 
                 await BotCommandsFactory.start(
-                    update.get_bot(),
+                    update,
+                    context,
                     user,
                     await self.get_language(update, context),
                     self.db_session,
@@ -12,6 +12,7 @@ from tour_guide_bot import t
 from tour_guide_bot.bot.admin.tour.add_content import AddContentCommandHandler
 from tour_guide_bot.helpers.language_selector import SelectLanguageHandler
 from tour_guide_bot.helpers.telegram import SubcommandHandler
+from tour_guide_bot.helpers.tour_content_cache import bump_content_version
 from tour_guide_bot.models.guide import Tour, TourSection, TourTranslation
 
 
@@ -21,6 +22,17 @@ class AddHandler(SubcommandHandler, SelectLanguageHandler, AddContentCommandHand
     STATE_TOUR_ADD_SECTION = 3
     STATE_TOUR_ADD_CONTENT = 4
 
+    CONTEXT_KEYS = (
+        "action",
+        "tour_language",
+        "tour_title",
+        "tour_id",
+        "tour_translation_id",
+        "tour_section_id",
+        "tour_section_position",
+        "tour_section_content_position",
+    ) + AddContentCommandHandler.AUDIO_CONTEXT_KEYS
+
     @classmethod
     def get_handlers(cls):
         return [
@@ -32,6 +44,7 @@ class AddHandler(SubcommandHandler, SelectLanguageHandler, AddContentCommandHand
                     ),
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_TOUR_SAVE_TITLE: [
                         MessageHandler(
                             filters.TEXT & ~filters.COMMAND,
@@ -64,6 +77,7 @@ class AddHandler(SubcommandHandler, SelectLanguageHandler, AddContentCommandHand
                 ],
                 name="admin-add-tour",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -127,6 +141,8 @@ class AddHandler(SubcommandHandler, SelectLanguageHandler, AddContentCommandHand
         self.db_session.add(tour_translation)
 
         await self.db_session.commit()
+        context.application.tour_titles_cache.invalidate()
+        context.application.product_menu_cache.invalidate()
 
         context.user_data["tour_id"] = tour.id
         context.user_data["tour_translation_id"] = tour_translation.id
@@ -157,7 +173,14 @@ class AddHandler(SubcommandHandler, SelectLanguageHandler, AddContentCommandHand
             title=update.message.text,
         )
         self.db_session.add(tour_section)
+        # The previously last section isn't the last one anymore
+        await self.db_session.execute(
+            bump_content_version(context.user_data["tour_translation_id"])
+        )
         await self.db_session.commit()
+        context.application.tour_content_cache.invalidate(
+            context.user_data["tour_translation_id"]
+        )
         context.user_data["tour_section_id"] = tour_section.id
         context.user_data["tour_section_content_position"] = 0
 
@@ -1,10 +1,12 @@
-import os
 from abc import ABC
+from contextlib import suppress
 from typing import ClassVar
 
-import ffmpeg
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import TelegramError
 from telegram.ext import (
     CallbackContext,
     CallbackQueryHandler,
@@ -17,8 +19,15 @@ from telegram.ext import (
 
 from tour_guide_bot import t
 from tour_guide_bot.bot.admin import log
+from tour_guide_bot.helpers.audio_converter import AudioConverter, ConversionCancelled
 from tour_guide_bot.helpers.telegram import AdminProtectedBaseHandlerCallback
-from tour_guide_bot.models.guide import MessageType, TourSectionContent
+from tour_guide_bot.helpers.tour_content_cache import bump_content_version
+from tour_guide_bot.models.guide import (
+    AudioConversion,
+    MessageType,
+    TourSection,
+    TourSectionContent,
+)
 from tour_guide_bot.models.settings import Settings, SettingsKey
 
 
@@ -26,6 +35,16 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
     STATE_TOUR_AUDIO_CONVERT_CONFIRMATION: ClassVar[int] = -30
     STATE_TOUR_AUDIO_CONVERT_VOICE_CHECK: ClassVar[int] = -31
 
+    # The keys of the nested audio conversion conversation
+    AUDIO_CONTEXT_KEYS: ClassVar[tuple[str, ...]] = (
+        "audio_file_id",
+        "audio_file_unique_id",
+        "audio_duration",
+        "audio_caption",
+        "audio_message_id",
+        "voice_file_id",
+    )
+
     @classmethod
     def get_add_content_handlers(cls):
         return [
@@ -49,6 +68,9 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
                     )
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(
+                        cls.AUDIO_CONTEXT_KEYS
+                    ),
                     cls.STATE_TOUR_AUDIO_CONVERT_CONFIRMATION: [
                         CallbackQueryHandler(
                             cls.partial(
@@ -100,6 +122,7 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
                 ],
                 name="admin-tour-audio-convert",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             ),
             MessageHandler(
                 filters.VOICE & ~filters.UpdateType.EDITED,
@@ -131,6 +154,8 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
     async def cancel_audio_conversion(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
+        context.application.audio_converter.cancel(update.effective_user.id)
+
         user = await self.get_user(update, context)
         if update.callback_query:
             await update.callback_query.answer()
@@ -222,7 +247,18 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
                     context.user_data.get("tour_section_content_position", 0) + 1
                 )
 
+            await self.db_session.execute(
+                bump_content_version(
+                    select(TourSection.tour_translation_id)
+                    .where(TourSection.id == context.user_data["tour_section_id"])
+                    .scalar_subquery()
+                )
+            )
+
         await self.db_session.commit()
+        context.application.tour_content_cache.invalidate_section(
+            context.user_data["tour_section_id"]
+        )
 
         return is_first
 
@@ -349,7 +385,7 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
 
         try:
             file = await bot.get_file(context.user_data["audio_file_id"])
-            original_audio_path = await file.download_to_drive()
+            original_audio = await file.download_as_bytearray()
         except Exception:
             log.exception(
                 "Failed to download file %s", context.user_data["audio_file_id"]
@@ -389,25 +425,55 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
             )
             return
 
+        cancel_markup = InlineKeyboardMarkup(
+            [
+                [
+                    InlineKeyboardButton(
+                        t(language).pgettext("bot-generic", "Abort"),
+                        callback_data="cancel",
+                    )
+                ],
+            ]
+        )
+
         await bot.edit_message_text(
             t(language).pgettext("admin-tours", "File downloaded, converting..."),
             chat_id=context.job.data["chat_id"],
             message_id=context.job.data["message_id"],
+            reply_markup=cancel_markup,
         )
 
-        destination_path = "%s.%s" % (original_audio_path, "ogg")
+        async def report_progress(progress: float | None):
+            if progress is None:
+                text = t(language).pgettext(
+                    "admin-tours",
+                    "File downloaded, waiting for other conversions to finish...",
+                )
+            else:
+                text = (
+                    t(language)
+                    .pgettext("admin-tours", "File downloaded, converting... {0}%")
+                    .format(int(progress * 100))
+                )
+
+            with suppress(TelegramError):
+                await bot.edit_message_text(
+                    text,
+                    chat_id=context.job.data["chat_id"],
+                    message_id=context.job.data["message_id"],
+                    reply_markup=cancel_markup,
+                )
+
         try:
-            process = (
-                ffmpeg.input(original_audio_path)
-                .output(destination_path, acodec="libopus", **{"b:a": "192000"})
-                .run_async()
+            voice = await context.application.audio_converter.convert(
+                context.job.data["user_id"],
+                original_audio,
+                context.user_data.get("audio_duration"),
+                report_progress,
             )
-            # TODO: the process is blocked here
-            process.wait()
+        except ConversionCancelled:
+            return
         except Exception:
-            if os.path.isfile(destination_path):
-                os.unlink(destination_path)
-
             log.exception(
                 "Failed to convert file %s", context.user_data["audio_file_id"]
             )
@@ -445,8 +511,9 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
                 ),
             )
             return
-        finally:
-            os.unlink(original_audio_path)
+
+        # Let the original go before uploading the voice
+        del original_audio
 
         await bot.edit_message_text(
             t(language).pgettext("admin-tours", "File converted, uploading..."),
@@ -457,7 +524,7 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
         try:
             message = await bot.send_voice(
                 context.job.data["chat_id"],
-                open(destination_path, "rb"),
+                voice,
                 reply_markup=InlineKeyboardMarkup(
                     [
                         [
@@ -524,8 +591,23 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
                 ),
             )
             return
-        finally:
-            os.unlink(destination_path)
+
+        if context.user_data.get("audio_file_unique_id"):
+            async with AsyncSession(
+                context.application.db_engine, expire_on_commit=False
+            ) as session:
+                conversion = await AudioConversion.load(
+                    session,
+                    context.user_data["audio_file_unique_id"],
+                    AudioConverter.PROFILE,
+                    create=True,
+                )
+                conversion.voice_file_id = context.user_data["voice_file_id"]
+                session.add(conversion)
+
+                # Another admin might have converted the same file in the meantime
+                with suppress(IntegrityError):
+                    await session.commit()
 
         await bot.edit_message_text(
             t(language).pgettext(
@@ -540,6 +622,10 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
     async def translation_section_content_add_audio_convert(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
+        if context.application.audio_converter.is_active(update.effective_user.id):
+            await update.callback_query.answer()
+            return self.STATE_TOUR_AUDIO_CONVERT_VOICE_CHECK
+
         language = await self.get_language(update, context)
         context.job_queue.run_once(
             self.convert_audio,
@@ -600,6 +686,7 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
 
         self.db_session.add(audio_to_voice_state)
         await self.db_session.commit()
+        context.application.settings_cache.invalidate()
 
         await self.translation_section_content_add(
             context.user_data["audio_message_id"],
@@ -653,18 +740,67 @@ class AddContentCommandHandler(AdminProtectedBaseHandlerCallback, ABC):
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
         if not update.message.media_group_id:
-            audio_to_voice_state = await Settings.load(
-                self.db_session, SettingsKey.audio_to_voice, create=True
+            audio_to_voice = await context.application.settings_cache.get(
+                self.db_session, SettingsKey.audio_to_voice, default=True
             )
 
-            if audio_to_voice_state.is_enabled:
+            if audio_to_voice:
                 language = await self.get_language(update, context)
                 context.user_data["audio_file_id"] = update.message.audio.file_id
                 context.user_data["audio_message_id"] = update.message.message_id
+                context.user_data["audio_duration"] = update.message.audio.duration
+                context.user_data["audio_file_unique_id"] = (
+                    update.message.audio.file_unique_id
+                )
                 context.user_data[
                     "audio_caption"
                 ] = update.message.caption_markdown_v2_urled
 
+                conversion = await AudioConversion.load(
+                    self.db_session,
+                    update.message.audio.file_unique_id,
+                    AudioConverter.PROFILE,
+                )
+                if conversion:
+                    context.user_data["voice_file_id"] = conversion.voice_file_id
+
+                    await update.message.reply_voice(
+                        conversion.voice_file_id,
+                        caption=t(language).pgettext(
+                            "admin-tours",
+                            "This audio was already converted to a voice message."
+                            " Please check the quality and decide what do you want"
+                            " to do with it.",
+                        ),
+                        reply_markup=InlineKeyboardMarkup(
+                            [
+                                [
+                                    InlineKeyboardButton(
+                                        t(language).pgettext(
+                                            "bot-generic", "Store the voice message"
+                                        ),
+                                        callback_data="store_voice",
+                                    )
+                                ],
+                                [
+                                    InlineKeyboardButton(
+                                        t(language).pgettext(
+                                            "admin-tours", "Store the original audio"
+                                        ),
+                                        callback_data="store_audio_as_is",
+                                    )
+                                ],
+                                [
+                                    InlineKeyboardButton(
+                                        t(language).pgettext("bot-generic", "Abort"),
+                                        callback_data="cancel",
+                                    )
+                                ],
+                            ]
+                        ),
+                    )
+                    return self.STATE_TOUR_AUDIO_CONVERT_VOICE_CHECK
+
                 await update.message.reply_text(
                     t(language).pgettext(
                         "admin-tours",
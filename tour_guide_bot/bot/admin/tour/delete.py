@@ -1,7 +1,6 @@
 from typing import ClassVar
 
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
@@ -14,6 +13,7 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.telegram import SubcommandHandler, get_tour_title
 from tour_guide_bot.helpers.tours_selector import SelectTourHandler
 from tour_guide_bot.models.guide import Tour
@@ -33,6 +33,7 @@ class DeleteHandler(SubcommandHandler, SelectTourHandler):
                     ),
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_SELECT_TOUR: cls.get_select_tour_handlers(),
                     cls.STATE_AWAITING_CONFIRMATION: [
                         CallbackQueryHandler(
@@ -53,6 +54,7 @@ class DeleteHandler(SubcommandHandler, SelectTourHandler):
                 ],
                 name="admin-delete-tour",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -118,6 +120,10 @@ class DeleteHandler(SubcommandHandler, SelectTourHandler):
 
         await self.db_session.delete(tour)
         await self.db_session.commit()
+        context.application.tour_content_cache.invalidate_tour(tour.id)
+        context.application.bot_commands_cache.invalidate_products()
+        context.application.tour_titles_cache.invalidate()
+        context.application.product_menu_cache.invalidate()
 
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
@@ -133,6 +139,5 @@ class DeleteHandler(SubcommandHandler, SelectTourHandler):
         )
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        tours_count: int = await db_session.scalar(select(func.count(Tour.id)))
-        return tours_count > 0
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.tours > 0
@@ -1,5 +1,3 @@
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Update
 from telegram.ext import (
     BaseHandler,
@@ -11,9 +9,8 @@ from tour_guide_bot import t
 from tour_guide_bot.bot.admin.tour.pricing.add import AddPricingHandler
 from tour_guide_bot.bot.admin.tour.pricing.delete import DeletePricingHandler
 from tour_guide_bot.bot.admin.tour.pricing.edit import EditPricingHandler
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.telegram import MenuCommandHandler, SubcommandHandler
-from tour_guide_bot.models.guide import Tour
-from tour_guide_bot.models.settings import PaymentProvider
 
 
 class PricingMenuHandler(MenuCommandHandler, SubcommandHandler):
@@ -39,18 +36,12 @@ class PricingMenuHandler(MenuCommandHandler, SubcommandHandler):
     async def is_menu_available(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> bool:
-        payment_providers_cnt: int = await self.db_session.scalar(
-            select(func.count(PaymentProvider.id)).where(
-                PaymentProvider.enabled == True  # noqa
-            )
-        )
-
-        return await self.is_available(self.db_session) and payment_providers_cnt > 0
+        counts = await self.get_menu_counts()
+        return self.is_available(counts) and counts.payment_providers > 0
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        tours_count: int = await db_session.scalar(select(func.count(Tour.id)))
-        return tours_count > 0
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.tours > 0
 
     @classmethod
     def get_main_handlers(cls) -> list[BaseHandler]:
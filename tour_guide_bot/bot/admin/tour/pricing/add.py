@@ -1,7 +1,6 @@
 from typing import ClassVar
 
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from telegram import Update
 from telegram.constants import ParseMode
@@ -17,6 +16,7 @@ from telegram.ext import (
 from tour_guide_bot import t
 from tour_guide_bot.helpers.currency import Currency
 from tour_guide_bot.helpers.language_selector import SelectLanguageHandler
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.payment_provider_selector import PaymentProviderSelector
 from tour_guide_bot.helpers.telegram import SubcommandHandler, get_tour_title
 from tour_guide_bot.helpers.tours_selector import SelectTourHandler
@@ -34,6 +34,18 @@ class AddPricingHandler(
     STATE_WAITING_FOR_TITLE: ClassVar[int] = 5
     STATE_WAITING_FOR_DESCRIPTION: ClassVar[int] = 6
 
+    CONTEXT_KEYS = (
+        "tour_id",
+        "language",
+        "provider_id",
+        "guests_count",
+        "currency",
+        "price",
+        "duration",
+        "title",
+        "description",
+    )
+
     @classmethod
     def get_handlers(cls):
         return [
@@ -45,6 +57,7 @@ class AddPricingHandler(
                     ),
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_SELECT_TOUR: cls.get_select_tour_handlers(),
                     cls.STATE_LANGUAGE_SELECTION: cls.get_select_language_handlers(),
                     cls.STATE_SELECT_PAYMENT_PROVIDER: cls.get_select_payment_provider_handlers(),
@@ -94,6 +107,7 @@ class AddPricingHandler(
                 ],
                 name="admin-pricing-add",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -173,14 +187,8 @@ class AddPricingHandler(
         return t(language).pgettext("admin-tour", "Add a new product")
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        tours_count: int = await db_session.scalar(select(func.count(Tour.id)))
-        payment_provider: int = await db_session.scalar(
-            select(func.count(PaymentProvider.id)).where(
-                PaymentProvider.enabled == True  # noqa
-            )
-        )
-        return tours_count > 0 and payment_provider > 0
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.tours > 0 and counts.payment_providers > 0
 
     async def save_guests_count(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -391,6 +399,9 @@ class AddPricingHandler(
 
         product = await self.save_product(tour, context)
         await self.db_session.commit()
+        context.application.bot_commands_cache.invalidate_products()
+        context.application.tour_titles_cache.invalidate()
+        context.application.product_menu_cache.invalidate()
 
         await update.message.reply_text(
             t(language)
@@ -1,5 +1,4 @@
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
@@ -9,6 +8,7 @@ from telegram.ext import (
 
 from tour_guide_bot import t
 from tour_guide_bot.helpers.language_selector import SelectLanguageHandler
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.product_selector import SelectProductHandler
 from tour_guide_bot.helpers.telegram import SubcommandHandler, get_tour_title
 from tour_guide_bot.helpers.tours_selector import SelectTourHandler
@@ -46,11 +46,8 @@ class DeletePricingHandler(
         ]
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        products_count: int = await db_session.scalar(
-            select(func.count(Product.id)).where(Product.available == True)  # noqa
-        )
-        return products_count > 0
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.products > 0
 
     def get_tour_selection_message(self, language: str) -> str:
         return t(language).pgettext(
@@ -173,6 +170,9 @@ class DeletePricingHandler(
         product.available = False
         self.db_session.add(product)
         await self.db_session.commit()
+        context.application.bot_commands_cache.invalidate_products()
+        context.application.tour_titles_cache.invalidate()
+        context.application.product_menu_cache.invalidate()
 
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
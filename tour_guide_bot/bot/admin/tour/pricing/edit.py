@@ -1,5 +1,4 @@
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import (
@@ -13,11 +12,14 @@ from telegram.ext import (
 
 from tour_guide_bot import t
 from tour_guide_bot.bot.admin.tour.pricing.add import AddPricingHandler
+from tour_guide_bot.helpers.menu_counts import MenuCounts
 from tour_guide_bot.helpers.product_selector import SelectProductHandler
 from tour_guide_bot.models.guide import Product, Tour
 
 
 class EditPricingHandler(AddPricingHandler, SelectProductHandler):
+    CONTEXT_KEYS = AddPricingHandler.CONTEXT_KEYS + ("product_id",)
+
     @classmethod
     def get_handlers(cls):
         return [
@@ -29,6 +31,7 @@ class EditPricingHandler(AddPricingHandler, SelectProductHandler):
                     ),
                 ],
                 states={
+                    ConversationHandler.TIMEOUT: cls.get_timeout_handlers(),
                     cls.STATE_SELECT_TOUR: cls.get_select_tour_handlers(),
                     cls.STATE_LANGUAGE_SELECTION: cls.get_select_language_handlers(),
                     cls.STATE_SELECT_PRODUCT: cls.get_select_product_handlers(),
@@ -78,6 +81,7 @@ class EditPricingHandler(AddPricingHandler, SelectProductHandler):
                 ],
                 name="admin-pricing-delete",
                 persistent=True,
+                conversation_timeout=cls.CONVERSATION_TIMEOUT,
             )
         ]
 
@@ -176,8 +180,5 @@ class EditPricingHandler(AddPricingHandler, SelectProductHandler):
         return await super().save_product(tour, context)
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
-        products_count: int = await db_session.scalar(
-            select(func.count(Product.id)).where(Product.available == True)  # noqa
-        )
-        return products_count > 0
+    def is_available(cls, counts: MenuCounts) -> bool:
+        return counts.products > 0
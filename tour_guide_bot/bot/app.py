@@ -1,11 +1,22 @@
-from typing import Sequence
+import asyncio
+from inspect import isabstract
+from time import time
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, select
+from sqlalchemy import update as sql_update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 from telegram import Update
+from telegram.error import Forbidden, TelegramError
 from telegram.ext import Application as BaseApplication
-from telegram.ext import ApplicationBuilder, ContextTypes, TypeHandler
+from telegram.ext import (
+    ApplicationBuilder,
+    ApplicationHandlerStop,
+    BaseHandler,
+    ContextTypes,
+    ConversationHandler,
+    TypeHandler,
+)
 
 from tour_guide_bot import t
 from tour_guide_bot.bot import log
@@ -16,22 +27,80 @@ from tour_guide_bot.bot.guide.help import HelpCommandHandler
 from tour_guide_bot.bot.guide.purchase import PurchaseCommandHandler
 from tour_guide_bot.bot.guide.start import StartCommandHandler
 from tour_guide_bot.bot.guide.tours import ToursCommandHandler
+from tour_guide_bot.helpers.currency import Currency
 from tour_guide_bot.helpers.language import LanguageHandler
-from tour_guide_bot.helpers.telegram import get_tour_title
-from tour_guide_bot.models.guide import Guest, Subscription, Tour
+from tour_guide_bot.helpers.rate_limiter import Priority
+from tour_guide_bot.helpers.recent_updates import RecentUpdates
+from tour_guide_bot.helpers.telegram import BaseHandlerCallback, get_tour_title
+from tour_guide_bot.helpers.user_data import UserData, track_conversation
+from tour_guide_bot.models.guide import Subscription, Tour
 from tour_guide_bot.models.telegram import TelegramUser
 
 
 class Application(BaseApplication):
+    # The sweeper is just a safety net for the notifications missed by the
+    # event-driven path, e.g. due to a restart.
+    NEW_SUBSCRIPTIONS_SWEEP_INTERVAL = 15 * 60
+
+    # A small delay allows to group several approvals into a single run, and skips
+    # the notification if the guest opens the tours by themselves in the meantime.
+    NEW_SUBSCRIPTIONS_NOTIFICATION_DELAY = 5
+
+    NEW_SUBSCRIPTIONS_NOTIFICATION_BATCH_SIZE = 500
+    NEW_SUBSCRIPTIONS_NOTIFICATION_CONCURRENCY = 8
+
+    # The data of the users idle for this long is dropped, unless they are in the
+    # middle of a conversation.
+    USER_DATA_TTL = 24 * 60 * 60
+    USER_DATA_SWEEP_INTERVAL = 60 * 60
+
+    # The catalogue is refreshed once it's older than a day; a failed refresh is
+    # retried on the next check.
+    CURRENCIES_CHECK_INTERVAL = 60 * 60
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.new_subscription_ids: set[int] = set()
+        self.recent_updates = RecentUpdates()
+
     @classmethod
     def builder(cls) -> ApplicationBuilder:
         builder = super().builder()
         builder.application_class(cls)
         return builder
 
+    def add_handler(self, handler: BaseHandler, group: int = 0) -> None:
+        if isinstance(handler, ConversationHandler):
+            track_conversation(handler)
+
+        super().add_handler(handler, group)
+
     async def initialize(self) -> None:
+        self.add_handler(TypeHandler(Update, self.drop_replayed_update), -3)
+        self.add_handler(TypeHandler(Update, self.track_user_activity), -2)
         self.add_handler(TypeHandler(object, self.debug_log_handler), -1)
 
+        self.register_handlers()
+        self.register_keyboards()
+
+        self.job_queue.run_repeating(
+            self.check_new_approved_tours,
+            self.NEW_SUBSCRIPTIONS_SWEEP_INTERVAL,
+            first=60,
+            job_kwargs={"misfire_grace_time": 30},
+        )
+        self.job_queue.run_repeating(
+            self.evict_stale_user_data,
+            self.USER_DATA_SWEEP_INTERVAL,
+            first=self.USER_DATA_SWEEP_INTERVAL,
+        )
+        self.job_queue.run_repeating(
+            self.refresh_currencies, self.CURRENCIES_CHECK_INTERVAL, first=0
+        )
+
+        await super().initialize()
+
+    def register_handlers(self) -> None:
         self.add_handlers(AdminStartCommandHandler.get_handlers())
 
         self.add_handlers(StartCommandHandler.get_handlers())
@@ -40,11 +109,57 @@ class Application(BaseApplication):
         self.add_handlers(LanguageHandler.get_handlers())
         self.add_handlers(HelpCommandHandler.get_handlers())
 
-        self.job_queue.run_repeating(
-            self.check_new_approved_tours, 60, job_kwargs={"misfire_grace_time": 30}
-        )
+    def register_keyboards(self) -> None:
+        pending = [BaseHandlerCallback]
+        handler_classes = set()
 
-        await super().initialize()
+        while pending:
+            for subclass in pending.pop().__subclasses__():
+                if subclass not in handler_classes:
+                    handler_classes.add(subclass)
+                    pending.append(subclass)
+
+        for handler_class in handler_classes:
+            if not isabstract(handler_class):
+                handler_class.register_keyboards(self.keyboards)
+
+    async def track_user_activity(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        if isinstance(context.user_data, UserData):
+            context.user_data.touch()
+
+    async def refresh_currencies(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        await Currency.refresh_if_stale()
+
+    async def evict_stale_user_data(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        idle_since = time() - self.USER_DATA_TTL
+        idle_user_ids = [
+            user_id
+            for user_id, user_data in self.user_data.items()
+            if isinstance(user_data, UserData) and user_data.is_idle(idle_since)
+        ]
+
+        for user_id in idle_user_ids:
+            self.drop_user_data(user_id)
+
+        if idle_user_ids:
+            log.info(
+                t()
+                .pgettext("cli", "Dropped the data of {0} idle users.")
+                .format(len(idle_user_ids))
+            )
+
+    async def drop_replayed_update(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        if self.recent_updates.is_replayed(update.update_id):
+            log.info(
+                t()
+                .pgettext("cli", "Dropping the replayed update {0}.")
+                .format(update.update_id)
+            )
+            raise ApplicationHandlerStop()
 
     async def debug_log_handler(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -55,50 +170,145 @@ class Application(BaseApplication):
             )
         )
 
+    def notify_new_subscription(self, subscription_id: int) -> None:
+        self.new_subscription_ids.add(subscription_id)
+
+        if not self.job_queue.get_jobs_by_name("notify-new-subscriptions"):
+            self.job_queue.run_once(
+                self.notify_new_subscriptions,
+                self.NEW_SUBSCRIPTIONS_NOTIFICATION_DELAY,
+                name="notify-new-subscriptions",
+            )
+
+    async def notify_new_subscriptions(
+        self, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        subscription_ids, self.new_subscription_ids = self.new_subscription_ids, set()
+
+        if subscription_ids:
+            await self.send_new_subscription_notifications(
+                context, Subscription.id.in_(subscription_ids)
+            )
+
     async def check_new_approved_tours(
         self, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        await self.send_new_subscription_notifications(context)
+
+    async def send_new_subscription_notifications(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        condition: ColumnElement[bool] | None = None,
     ) -> None:
         # TODO: Improve the logic
         # Currently this may send an incorrect notification when a guest would have multiple
         # telegram users.
-        stmt = (
-            select(TelegramUser)
-            .join(Guest)
-            .join(Subscription, Guest.id == Subscription.guest_id)
+        semaphore = asyncio.Semaphore(self.NEW_SUBSCRIPTIONS_NOTIFICATION_CONCURRENCY)
+
+        async def notify(
+            telegram_user: TelegramUser, subscription: Subscription
+        ) -> bool:
+            language = telegram_user.language
+
+            async with semaphore:
+                try:
+                    await self.bot.send_message(
+                        telegram_user.id,
+                        t(language)
+                        .pgettext(
+                            "guide-bot-notification",
+                            'Hey! You have a new tour available — "{0}". Send /tours to start the journey!',
+                        )
+                        .format(get_tour_title(subscription.tour, language, context)),
+                        rate_limit_args=Priority.BULK,
+                    )
+                except Forbidden:
+                    # The user has blocked the bot, there is no point in retrying
+                    pass
+                except TelegramError:
+                    log.exception(
+                        t()
+                        .pgettext(
+                            "cli",
+                            "Failed to notify the user {0} about the subscription #{1}.",
+                        )
+                        .format(telegram_user.id, subscription.id)
+                    )
+                    return False
+
+            return True
+
+        # The batches are made of subscriptions, so all the users of a subscription
+        # are notified before it's marked as notified
+        page_stmt = (
+            select(Subscription.id)
             .where(Subscription.is_user_notified == False)  # noqa
+            .order_by(Subscription.id)
+            .limit(self.NEW_SUBSCRIPTIONS_NOTIFICATION_BATCH_SIZE)
         )
+        if condition is not None:
+            page_stmt = page_stmt.where(condition)
+
+        stmt = (
+            select(TelegramUser, Subscription)
+            .join(Subscription, Subscription.guest_id == TelegramUser.guest_id)
+            .options(joinedload(Subscription.tour).joinedload(Tour.translations))
+            .order_by(Subscription.id, TelegramUser.id)
+        )
+
+        last_subscription_id = 0
 
         async with AsyncSession(
             context.application.db_engine, expire_on_commit=False
         ) as session:
-            for telegram_user in await session.scalars(stmt):
-                stmt = (
-                    select(Subscription)
-                    .options(
-                        selectinload(Subscription.tour).selectinload(Tour.translations),
-                        selectinload(Subscription.guest),
+            while True:
+                subscription_ids = (
+                    await session.scalars(
+                        page_stmt.where(Subscription.id > last_subscription_id)
                     )
-                    .where(
-                        (Subscription.guest_id == telegram_user.guest_id)
-                        & (Subscription.is_user_notified == False)  # noqa
-                    )
-                )
-                bought_tours: Sequence[Subscription] = (
-                    await session.scalars(stmt)
                 ).all()
-                for purchase in bought_tours:
-                    language = telegram_user.language
 
-                    await self.bot.send_message(
-                        telegram_user.id,
-                        t(language)
-                        .pgettext(
-                            "guide-bot-notification",
-                            'Hey! You have a new tour available — "{0}". Send /tours to start the journey!',
+                if not subscription_ids:
+                    break
+
+                last_subscription_id = subscription_ids[-1]
+
+                rows = (
+                    (
+                        await session.execute(
+                            stmt.where(Subscription.id.in_(subscription_ids))
                         )
-                        .format(get_tour_title(purchase.tour, language, context)),
                     )
+                    .unique()
+                    .all()
+                )
+
+                notified = await asyncio.gather(
+                    *[
+                        notify(telegram_user, subscription)
+                        for telegram_user, subscription in rows
+                    ]
+                )
+                # A subscription is retried until all of its users are notified
+                failed_ids = {
+                    subscription.id
+                    for (_, subscription), is_notified in zip(rows, notified)
+                    if not is_notified
+                }
+                notified_ids = {
+                    subscription.id for _, subscription in rows
+                } - failed_ids
 
-                    purchase.is_user_notified = True
-                    session.add(purchase)
+                if notified_ids:
+                    await session.execute(
+                        sql_update(Subscription)
+                        .where(Subscription.id.in_(notified_ids))
+                        .values(is_user_notified=True)
+                    )
                     await session.commit()
+
+                if (
+                    len(subscription_ids)
+                    < self.NEW_SUBSCRIPTIONS_NOTIFICATION_BATCH_SIZE
+                ):
+                    break
@@ -1,21 +1,31 @@
-from sqlalchemy import select
+from functools import cache
+from typing import NamedTuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from telegram import Bot, BotCommand, BotCommandScopeChat
+from telegram import BotCommand, BotCommandScopeChat, Update
+from telegram.ext import ContextTypes
 
 from tour_guide_bot import t
-from tour_guide_bot.models.guide import Product
-from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.settings import SettingsKey
 from tour_guide_bot.models.telegram import TelegramUser
 
 
+class CommandsFingerprint(NamedTuple):
+    language: str
+    is_admin: bool
+    has_products: bool
+    has_terms: bool
+    has_support: bool
+
+
 class BotCommandsFactory:
     @staticmethod
-    async def start(
-        bot: Bot, user: TelegramUser, language: str, db_session: AsyncSession
-    ):
+    @cache
+    def get_commands(fingerprint: CommandsFingerprint) -> tuple[BotCommand, ...]:
+        language = fingerprint.language
         commands = []
 
-        if user.admin:
+        if fingerprint.is_admin:
             commands.append(
                 BotCommand(
                     "admin",
@@ -39,9 +49,7 @@ class BotCommandsFactory:
             )
         )
 
-        stmt = select(Product).where(Product.available == True)
-        product: Product | None = await db_session.scalar(stmt)
-        if product is not None:
+        if fingerprint.has_products:
             commands.append(
                 BotCommand(
                     "purchase",
@@ -58,7 +66,7 @@ class BotCommandsFactory:
             )
         )
 
-        if await Settings.exists(db_session, [SettingsKey.terms_message], language):
+        if fingerprint.has_terms:
             commands.append(
                 BotCommand(
                     "terms",
@@ -68,7 +76,7 @@ class BotCommandsFactory:
                 )
             )
 
-        if await Settings.exists(db_session, [SettingsKey.support_message], language):
+        if fingerprint.has_support:
             commands.append(
                 BotCommand(
                     "support",
@@ -78,4 +86,52 @@ class BotCommandsFactory:
                 )
             )
 
-        await bot.set_my_commands(commands, BotCommandScopeChat(user.id))
+        return tuple(commands)
+
+    @staticmethod
+    async def start(
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        user: TelegramUser,
+        language: str,
+        db_session: AsyncSession,
+    ):
+        commands_cache = context.application.bot_commands_cache
+        settings_cache = context.application.settings_cache
+
+        fingerprint = CommandsFingerprint(
+            language,
+            bool(user.admin),
+            await commands_cache.has_products(db_session),
+            await settings_cache.exists(
+                db_session, [SettingsKey.terms_message], language
+            ),
+            await settings_cache.exists(
+                db_session, [SettingsKey.support_message], language
+            ),
+        )
+        bot = update.get_bot()
+
+        # Most of the guests need the same commands as everybody speaking their
+        # language, so those are set once for the whole language
+        default_scope = ("default", language)
+        default_fingerprint = fingerprint._replace(is_admin=False)
+        if not commands_cache.is_sent(default_scope, default_fingerprint):
+            await bot.set_my_commands(
+                BotCommandsFactory.get_commands(default_fingerprint),
+                language_code=language,
+            )
+            commands_cache.remember(default_scope, default_fingerprint)
+
+        client_language = (update.effective_user.language_code or "").split("-")[0]
+
+        if fingerprint == default_fingerprint and client_language == language:
+            if not commands_cache.is_sent(user.id, default_scope):
+                await bot.delete_my_commands(BotCommandScopeChat(user.id))
+                commands_cache.remember(user.id, default_scope)
+        elif not commands_cache.is_sent(user.id, fingerprint):
+            await bot.set_my_commands(
+                BotCommandsFactory.get_commands(fingerprint),
+                BotCommandScopeChat(user.id),
+            )
+            commands_cache.remember(user.id, fingerprint)
@@ -3,16 +3,16 @@ from telegram.ext import CommandHandler, ContextTypes
 
 from tour_guide_bot import t
 from tour_guide_bot.helpers.telegram import BaseHandlerCallback
-from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.settings import SettingsKey
 
 
 class HelpCommandHandler(BaseHandlerCallback):
     @classmethod
     def get_handlers(cls):
         return [
-            CommandHandler("help", cls.partial(cls.help)),
-            CommandHandler("terms", cls.partial(cls.terms)),
-            CommandHandler("support", cls.partial(cls.support)),
+            CommandHandler("help", cls.partial(cls.help, read_only=True)),
+            CommandHandler("terms", cls.partial(cls.terms, read_only=True)),
+            CommandHandler("support", cls.partial(cls.support, read_only=True)),
         ]
 
     async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -32,7 +32,7 @@ class HelpCommandHandler(BaseHandlerCallback):
 
     async def terms(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         language = await self.get_language(update, context)
-        terms = await Settings.load(
+        terms = await context.application.settings_cache.get(
             self.db_session, SettingsKey.terms_message, language
         )
 
@@ -45,12 +45,12 @@ class HelpCommandHandler(BaseHandlerCallback):
             )
             return
 
-        await update.message.reply_markdown_v2(terms.value)
+        await update.message.reply_markdown_v2(terms)
 
     async def support(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         language = await self.get_language(update, context)
 
-        support = await Settings.load(
+        support = await context.application.settings_cache.get(
             self.db_session, SettingsKey.support_message, language
         )
 
@@ -63,4 +63,4 @@ class HelpCommandHandler(BaseHandlerCallback):
             )
             return
 
-        await update.message.reply_markdown_v2(support.value)
+        await update.message.reply_markdown_v2(support)
@@ -3,6 +3,8 @@ from typing import Sequence
 
 from babel.dates import format_datetime
 from sqlalchemy import select
+from sqlalchemy import update as sql_update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from telegram import Update
 from telegram.ext import (
@@ -14,8 +16,11 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.bot.guide import log
+from tour_guide_bot.helpers.invoice_payload import get_invoice_id
 from tour_guide_bot.helpers.product_selector import SelectProductHandler
 from tour_guide_bot.helpers.telegram import get_tour_description
+from tour_guide_bot.helpers.tour_titles import TourTitle, select_tour_titles
 from tour_guide_bot.helpers.tours_selector import SelectTourHandler
 from tour_guide_bot.models.guide import (
     Invoice,
@@ -31,7 +36,7 @@ class PurchaseCommandHandler(SelectTourHandler, SelectProductHandler):
     def get_handlers(cls):
         return [
             CommandHandler("purchase", cls.partial(cls.send_tour_selector)),
-            PreCheckoutQueryHandler(cls.partial(cls.pre_checkout)),
+            PreCheckoutQueryHandler(cls.partial(cls.pre_checkout, read_only=True)),
             MessageHandler(
                 filters.SUCCESSFUL_PAYMENT, cls.partial(cls.successful_payment)
             ),
@@ -42,12 +47,102 @@ class PurchaseCommandHandler(SelectTourHandler, SelectProductHandler):
     async def successful_payment(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
+        payment = update.message.successful_payment
+        charge_id = payment.telegram_payment_charge_id
+
+        # The paid invoices are refused on pre-checkout without the database
+        payload = context.application.invoice_payload_signer.verify(
+            payment.invoice_payload
+        )
+        if payload is not None:
+            context.application.paid_invoices.add(payload)
+
         user = await self.get_user(update, context)
-        invoice_id = int(update.message.successful_payment.invoice_payload[2:])
+        invoice_id = get_invoice_id(payment.invoice_payload)
         invoice: Invoice | None = await self.db_session.scalar(
             select(Invoice).where(Invoice.id == invoice_id)
         )
 
+        if invoice is None:
+            log.error(
+                t()
+                .pgettext("cli", "Got a payment for an unknown invoice: {0}.")
+                .format(payment.invoice_payload)
+            )
+            return
+
+        if (invoice.price, invoice.currency) != (
+            payment.total_amount,
+            payment.currency,
+        ):
+            log.warning(
+                t()
+                .pgettext(
+                    "cli", "The payment for the invoice #{0} doesn't match it: {1} {2}."
+                )
+                .format(invoice_id, payment.total_amount, payment.currency)
+            )
+
+        if await self.db_session.scalar(
+            select(Invoice.id).where(Invoice.telegram_payment_charge_id == charge_id)
+        ):
+            log.info(
+                t()
+                .pgettext("cli", "The charge {0} is already applied.")
+                .format(charge_id)
+            )
+            return
+
+        # The charge is recorded with a conditional update, so the redelivered
+        # payments, even the concurrent ones, don't extend the access again
+        claimed = await self.db_session.execute(
+            sql_update(Invoice)
+            .where(
+                (Invoice.id == invoice_id)
+                & (Invoice.paid == False)  # noqa
+                & (Invoice.telegram_payment_charge_id == None)  # noqa
+            )
+            .values(paid=True, telegram_payment_charge_id=charge_id)
+            .execution_options(synchronize_session=False)
+        )
+
+        if claimed.rowcount != 1:
+            # The invoice was paid once again, e.g. while another instance of the
+            # bot didn't know it's paid already. The guest gets the access they've
+            # paid for, and the charge is recorded as a copy of the invoice.
+            log.warning(
+                t()
+                .pgettext(
+                    "cli",
+                    "The invoice #{0} is already paid, crediting the charge {1} "
+                    "as a new invoice.",
+                )
+                .format(invoice_id, charge_id)
+            )
+
+            invoice = Invoice(
+                product_id=invoice.product_id,
+                tour_id=invoice.tour_id,
+                guest_id=invoice.guest_id,
+                payment_provider_id=invoice.payment_provider_id,
+                currency=payment.currency,
+                price=payment.total_amount,
+                duration_days=invoice.duration_days,
+                guests=invoice.guests,
+                paid=True,
+                telegram_payment_charge_id=charge_id,
+            )
+            self.db_session.add(invoice)
+
+            try:
+                await self.db_session.flush()
+            except IntegrityError:
+                # The same charge is being applied concurrently
+                await self.db_session.rollback()
+                return
+
+            invoice_id = invoice.id
+
         subscription: Subscription = await self.db_session.scalar(
             select(Subscription).where(
                 (Subscription.guest_id == user.guest_id)
@@ -87,32 +182,48 @@ class PurchaseCommandHandler(SelectTourHandler, SelectProductHandler):
         )
 
     async def pre_checkout(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        language = await self.get_language(update, context)
         query = update.pre_checkout_query
-        if not query.invoice_payload[0:2] == "i:":
-            await query.answer(
-                ok=False,
-                error_message=t(language).pgettext(
-                    "bot-generic", "Something went wrong; please try again."
-                ),
+        payload = context.application.invoice_payload_signer.verify(
+            query.invoice_payload
+        )
+
+        if payload is not None:
+            # Telegram waits for the answer for 10 seconds only, so the signed
+            # payloads are validated without the database; the invoice itself is
+            # reconciled on the successful payment.
+            is_payable = (
+                payload.invoice_id not in context.application.paid_invoices
+                and payload.price == query.total_amount
+                and payload.currency == query.currency
             )
+        elif query.invoice_payload.count(":") == 1:
+            # The invoices sent before the payloads were signed
+            is_payable = await self.is_unsigned_invoice_payable(query.invoice_payload)
+        else:
+            is_payable = False
+
+        if is_payable:
+            await query.answer(ok=True)
             return
 
-        invoice_id = int(query.invoice_payload[2:])
+        language = await self.get_language(update, context)
+        await query.answer(
+            ok=False,
+            error_message=t(language).pgettext(
+                "bot-generic", "Something went wrong; please try again."
+            ),
+        )
+
+    async def is_unsigned_invoice_payable(self, invoice_payload: str) -> bool:
+        invoice_id = get_invoice_id(invoice_payload)
+        if invoice_id is None:
+            return False
+
         invoice: Invoice | None = await self.db_session.scalar(
             select(Invoice).where(Invoice.id == invoice_id)
         )
 
-        if not invoice or invoice.paid:
-            await query.answer(
-                ok=False,
-                error_message=t(language).pgettext(
-                    "bot-generic", "Something went wrong; please try again."
-                ),
-            )
-            return
-
-        await query.answer(ok=True)
+        return invoice is not None and not invoice.paid
 
     async def after_product_selected(
         self,
@@ -155,7 +266,9 @@ class PurchaseCommandHandler(SelectTourHandler, SelectProductHandler):
             update.effective_chat.id,
             title=product.title,
             description=product.description,
-            payload="i:" + str(invoice.id),
+            payload=context.application.invoice_payload_signer.sign(
+                invoice.id, invoice.price, invoice.currency
+            ),
             currency=invoice.currency,
             start_parameter="p" + str(invoice.product_id),
             provider_token=product.payment_provider.config["token"],
@@ -215,16 +328,19 @@ class PurchaseCommandHandler(SelectTourHandler, SelectProductHandler):
 
     async def get_acceptable_tours(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
-    ) -> Sequence[Tour]:
-        return (
-            await self.db_session.scalars(
-                select(Tour)
-                .options(
-                    selectinload(Tour.translations),
+    ) -> Sequence[TourTitle]:
+        language = await self.get_language(update, context)
+
+        return await context.application.tour_titles_cache.get(
+            self.db_session,
+            "purchasable",
+            language,
+            select_tour_titles(language, context.application.default_language).where(
+                Tour.id.in_(
+                    select(Product.tour_id).where(Product.available == True)  # noqa
                 )
-                .where(Tour.products.any(available=True))
-            )
-        ).all()
+            ),
+        )
 
     async def handle_no_tours_found(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -16,7 +16,7 @@ from tour_guide_bot.bot.guide.bot_commands import BotCommandsFactory
 from tour_guide_bot.helpers.language import LanguageHandler
 from tour_guide_bot.helpers.telegram import BaseHandlerCallback
 from tour_guide_bot.models.guide import Guest, Subscription
-from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.settings import SettingsKey
 from tour_guide_bot.models.telegram import TelegramUser
 
 
@@ -113,6 +113,7 @@ class StartCommandHandler(BaseHandlerCallback):
         user.guest = guest
         self.db_session.add(user)
         await self.db_session.commit()
+        context.application.user_identity_cache.invalidate(user.id)
 
         await self.process_guest(user, update, context)
         return ConversationHandler.END
@@ -156,17 +157,19 @@ class StartCommandHandler(BaseHandlerCallback):
             )
 
         await BotCommandsFactory.start(
-            update.get_bot(), user, language, self.db_session
+            update,
+            context,
+            user,
+            language,
+            self.db_session,
         )
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = await self.get_user(update, context)
 
-        stmt = select(Settings).where(
-            (Settings.key == SettingsKey.guide_welcome_message)
-            & (Settings.language == user.language)
+        welcome_message: str | None = await context.application.settings_cache.get(
+            self.db_session, SettingsKey.guide_welcome_message, user.language
         )
-        welcome_message: Settings | None = await self.db_session.scalar(stmt)
 
         if not welcome_message:
             await update.message.reply_text(
@@ -177,7 +180,7 @@ class StartCommandHandler(BaseHandlerCallback):
             )
             return ConversationHandler.END
 
-        await update.message.reply_markdown_v2(welcome_message.value)
+        await update.message.reply_markdown_v2(welcome_message)
 
         if user.guest:
             await self.process_guest(user, update, context)
@@ -204,5 +207,6 @@ class StartCommandHandler(BaseHandlerCallback):
                 self.db_session.add_all([guest, user])
 
             await self.db_session.commit()
+            context.application.user_identity_cache.invalidate(user.id)
             await self.process_guest(user, update, context)
             return ConversationHandler.END
@@ -1,18 +1,8 @@
-from asyncio import sleep
 from datetime import datetime
 from typing import Sequence
 
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from telegram import (
-    InlineKeyboardButton,
-    InlineKeyboardMarkup,
-    InputMediaAudio,
-    InputMediaPhoto,
-    InputMediaVideo,
-    Update,
-)
-from telegram.constants import ChatAction, ParseMode
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
     CallbackQueryHandler,
     CommandHandler,
@@ -24,16 +14,21 @@ from telegram.ext import (
 
 from tour_guide_bot import t
 from tour_guide_bot.bot.guide import log
+from tour_guide_bot.helpers.section_delivery import DeliveryPrompt, SectionDelivery
 from tour_guide_bot.helpers.telegram import get_tour_title
+from tour_guide_bot.helpers.tour_content_cache import CachedSection
+from tour_guide_bot.helpers.tour_titles import (
+    TourTitle,
+    load_tour_titles,
+    select_tour_titles,
+)
 from tour_guide_bot.helpers.tours_selector import SelectTourHandler
 from tour_guide_bot.models.guide import (
-    MessageType,
     Subscription,
     Tour,
-    TourSection,
     TourTranslation,
 )
-from tour_guide_bot.models.settings import Settings, SettingsKey
+from tour_guide_bot.models.settings import SettingsKey
 
 
 class ToursCommandHandler(SelectTourHandler):
@@ -50,43 +45,53 @@ class ToursCommandHandler(SelectTourHandler):
                     cls.STATE_SELECT_TOUR: cls.get_select_tour_handlers(),
                     cls.STATE_TOUR_IN_PROGRESS: [
                         CallbackQueryHandler(
-                            cls.partial(cls.tour_change_section),
+                            cls.partial(cls.tour_change_section, read_only=True),
                             r"^tour_change_section:(\d+):(\d+)$",
                         ),
                     ],
                 },
                 fallbacks=[
-                    CommandHandler("cancel", cls.partial(cls.cancel)),
-                    CallbackQueryHandler(cls.partial(cls.cancel), "cancel"),
-                    MessageHandler(filters.ALL, cls.partial(cls.nop_handler)),
+                    CommandHandler("cancel", cls.partial(cls.cancel, read_only=True)),
+                    CallbackQueryHandler(
+                        cls.partial(cls.cancel, read_only=True), "cancel"
+                    ),
+                    MessageHandler(
+                        filters.ALL, cls.partial(cls.nop_handler, read_only=True)
+                    ),
                 ],
                 name="guest-tour",
                 persistent=True,
-            )
+            ),
+            # The conversation ends before the last section is sent, so it's
+            # cancelled outside the conversation
+            CommandHandler("cancel", cls.partial(cls.cancel_delivery, read_only=True)),
         ]
 
-    async def get_tour(self, guest_id: int, tour_id: int) -> Subscription | None:
-        bought_tour: Subscription | None = await self.db_session.scalar(
-            select(Subscription)
-            .options(
-                selectinload(Subscription.tour)
-                .selectinload(Tour.translations)
-                .selectinload(TourTranslation.sections)
-                .selectinload(TourSection.content)
-            )
-            .where(
-                (Subscription.guest_id == guest_id)
-                & (Subscription.tour_id == tour_id)
-                & (Subscription.expire_ts >= datetime.now())
+    async def get_translation_access(
+        self, guest_id: int | None, translation_id: int
+    ) -> tuple[int, bool] | None:
+        row = (
+            await self.db_session.execute(
+                select(TourTranslation.content_version, Subscription.id)
+                .outerjoin(
+                    Subscription,
+                    (Subscription.tour_id == TourTranslation.tour_id)
+                    & (Subscription.guest_id == guest_id)
+                    & (Subscription.expire_ts >= datetime.now()),
+                )
+                .where(TourTranslation.id == translation_id)
+                .limit(1)
             )
-        )
+        ).first()
+
+        if row is None:
+            return None
 
-        return bought_tour
+        return row[0], row[1] is not None
 
     async def display_section(
         self,
-        translation: TourTranslation,
-        position: int,
+        section: CachedSection | None,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
     ):
@@ -94,9 +99,9 @@ class ToursCommandHandler(SelectTourHandler):
             await update.callback_query.answer()
             await update.callback_query.delete_message()
 
-        user = await self.get_user(update, context)
+        user = await self.get_identity(update, context)
 
-        if position < 0 or len(translation.sections) <= position:
+        if section is None:
             await self.edit_or_reply_text(
                 update,
                 context,
@@ -106,178 +111,21 @@ class ToursCommandHandler(SelectTourHandler):
             )
             return
 
-        section = translation.sections[position]
-
-        bot = context.bot
-        chat_id = update.effective_chat.id
-
-        is_last_section = position == len(translation.sections) - 1
-
-        delay_between_messages_state = await Settings.load(
-            self.db_session, SettingsKey.delay_between_messages, create=True
+        delay_between_messages = await context.application.settings_cache.get(
+            self.db_session, SettingsKey.delay_between_messages, default=True
         )
 
-        for content in section.content:
-            chat_action = ChatAction.TYPING
-            match content.message_type:
-                case MessageType.location:
-                    chat_action = (
-                        ChatAction.TYPING
-                    )  # todo change to ChatAction.FIND_LOCATION
-                case MessageType.voice | MessageType.audio:
-                    chat_action = ChatAction.UPLOAD_VOICE
-                case MessageType.video_note:
-                    chat_action = ChatAction.UPLOAD_VIDEO_NOTE
-                case MessageType.video:
-                    chat_action = ChatAction.UPLOAD_VIDEO
-                case MessageType.photo:
-                    chat_action = ChatAction.UPLOAD_PHOTO
-                case MessageType.media_group:
-                    match content.content["files"]:
-                        case MessageType.audio:
-                            chat_action = ChatAction.UPLOAD_VOICE
-                        case MessageType.video:
-                            chat_action = ChatAction.UPLOAD_VIDEO
-                        case MessageType.photo:
-                            chat_action = ChatAction.UPLOAD_PHOTO
-
-            if chat_action and int(delay_between_messages_state.value) > 0:
-                await bot.send_chat_action(chat_id=chat_id, action=chat_action)
-                await sleep(float(delay_between_messages_state.value))
-
-            match content.message_type:
-                case MessageType.text:
-                    await bot.send_message(
-                        chat_id,
-                        content.content["text"],
-                        ParseMode.MARKDOWN_V2,
-                        disable_web_page_preview=True,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.location:
-                    await bot.send_location(
-                        chat_id,
-                        content.content["latitude"],
-                        content.content["longitude"],
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.voice:
-                    await bot.send_voice(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.video_note:
-                    await bot.send_video_note(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.audio:
-                    await bot.send_audio(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.video:
-                    await bot.send_video(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.photo:
-                    await bot.send_photo(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.animation:
-                    await bot.send_animation(
-                        chat_id,
-                        content.content["files"][0]["file_id"],
-                        caption=content.content["files"][0].get("caption"),
-                        parse_mode=ParseMode.MARKDOWN_V2,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-                case MessageType.media_group:
-                    media_group = []
-
-                    for f in content.content["files"]:
-                        match MessageType[f["type"]]:
-                            case MessageType.audio:
-                                media_group.append(
-                                    InputMediaAudio(
-                                        f["file_id"],
-                                        caption=f.get("caption"),
-                                        parse_mode=ParseMode.MARKDOWN_V2,
-                                    )
-                                )
-                            case MessageType.video:
-                                media_group.append(
-                                    InputMediaVideo(
-                                        f["file_id"],
-                                        caption=f.get("caption"),
-                                        parse_mode=ParseMode.MARKDOWN_V2,
-                                    )
-                                )
-                            case MessageType.photo:
-                                media_group.append(
-                                    InputMediaPhoto(
-                                        f["file_id"],
-                                        caption=f.get("caption"),
-                                        parse_mode=ParseMode.MARKDOWN_V2,
-                                    )
-                                )
-
-                    await bot.send_media_group(
-                        chat_id,
-                        media_group,
-                        disable_notification=True,
-                        protect_content=True,
-                    )
-
-        if not is_last_section:
-            if int(delay_between_messages_state.value) > 0:
-                await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-                await sleep(float(delay_between_messages_state.value))
-
-            await self.reply_text(
-                update,
-                context,
+        prompt = None
+        if not section.is_last:
+            prompt = DeliveryPrompt(
                 t(user.language).pgettext("guide-tour", "Are you ready to continue?"),
-                reply_markup=InlineKeyboardMarkup(
+                InlineKeyboardMarkup(
                     [
                         [
                             InlineKeyboardButton(
                                 t(user.language).pgettext("guide-tour", "Next section"),
                                 callback_data="tour_change_section:%d:%d"
-                                % (translation.id, position + 1),
+                                % (section.translation_id, section.position + 1),
                             )
                         ],
                         [
@@ -289,28 +137,40 @@ class ToursCommandHandler(SelectTourHandler):
                     ]
                 ),
             )
+
+        context.application.section_deliveries.start(
+            context.job_queue,
+            SectionDelivery(
+                update.effective_chat.id,
+                section.items,
+                delay_between_messages,
+                prompt,
+                section.translation_id,
+                section.position,
+            ),
+        )
+
+        if prompt:
             return self.STATE_TOUR_IN_PROGRESS
 
         return ConversationHandler.END
 
+    async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        context.application.section_deliveries.cancel(update.effective_chat.id)
+        return await super().cancel(update, context)
+
+    async def cancel_delivery(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if context.application.section_deliveries.cancel(update.effective_chat.id):
+            await self.cancel_without_conversation(update, context)
+
     async def display_first_section(
         self, tour: Tour, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        tour: Tour = await self.db_session.scalar(
-            select(Tour)
-            .options(
-                selectinload(Tour.translations)
-                .selectinload(TourTranslation.sections)
-                .selectinload(TourSection.content)
-            )
-            .where(Tour.id == tour.id)
-        )
-
         translations = {
             translation.language: translation for translation in tour.translations
         }
 
-        user = await self.get_user(update, context)
+        user = await self.get_identity(update, context)
 
         if user.language not in translations:
             log.warning(
@@ -342,21 +202,28 @@ class ToursCommandHandler(SelectTourHandler):
         else:
             translation = translations[user.language]
 
-        return await self.display_section(translation, 0, update, context)
+        section = await context.application.tour_content_cache.get(
+            self.db_session, translation.id, 0, translation.content_version
+        )
+
+        return await self.display_section(section, update, context)
 
     async def tour_change_section(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        user = await self.get_user(update, context)
+        translation_id = int(context.matches[0].group(1))
+        position = int(context.matches[0].group(2))
 
-        translation: TourTranslation | None = await self.db_session.scalar(
-            select(TourTranslation)
-            .options(
-                selectinload(TourTranslation.sections).selectinload(TourSection.content)
-            )
-            .where(TourTranslation.id == int(context.matches[0].group(1)))
-        )
-        if not translation:
+        if context.application.section_deliveries.is_in_progress(
+            update.effective_chat.id, translation_id, position
+        ):
+            await update.callback_query.answer()
+            return
+
+        user = await self.get_identity(update, context)
+
+        access = await self.get_translation_access(user.guest_id, translation_id)
+        if access is None:
             await self.edit_or_reply_text(
                 update,
                 context,
@@ -366,8 +233,8 @@ class ToursCommandHandler(SelectTourHandler):
             )
             return
 
-        bought_tour = await self.get_tour(user.guest_id, translation.tour_id)
-        if not bought_tour:
+        content_version, has_access = access
+        if not has_access:
             await self.edit_or_reply_text(
                 update,
                 context,
@@ -379,10 +246,15 @@ class ToursCommandHandler(SelectTourHandler):
 
             return ConversationHandler.END
 
-        return await self.display_section(
-            translation, int(context.matches[0].group(2)), update, context
+        section = await context.application.tour_content_cache.get(
+            self.db_session,
+            translation_id,
+            position,
+            content_version,
         )
 
+        return await self.display_section(section, update, context)
+
     async def after_tour_selected(
         self,
         tour: Tour,
@@ -446,28 +318,30 @@ class ToursCommandHandler(SelectTourHandler):
 
     async def get_acceptable_tours(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
-    ) -> Sequence[Tour]:
-        user = await self.get_user(update, context)
-        subscriptions = await self.db_session.scalars(
-            select(Subscription)
-            .options(
-                selectinload(Subscription.tour).selectinload(Tour.translations),
-            )
-            .where(
-                (Subscription.guest == user.guest)
-                & (Subscription.expire_ts >= datetime.now())
-            )
+    ) -> Sequence[TourTitle]:
+        user = await self.get_identity(update, context)
+
+        return await load_tour_titles(
+            self.db_session,
+            select_tour_titles(
+                user.language, context.application.default_language
+            ).where(
+                Tour.id.in_(
+                    select(Subscription.tour_id).where(
+                        (Subscription.guest_id == user.guest_id)
+                        & (Subscription.expire_ts >= datetime.now())
+                    )
+                )
+            ),
         )
 
-        return [subscription.tour for subscription in subscriptions]
-
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user = await self.get_user(update, context)
+        user = await self.get_identity(update, context)
 
         bought_tours_without_notifications: Sequence[Subscription] = (
             await self.db_session.scalars(
                 select(Subscription).where(
-                    (Subscription.guest == user.guest)
+                    (Subscription.guest_id == user.guest_id)
                     & (Subscription.is_user_notified == False)
                 )
             )
@@ -2,8 +2,8 @@ import argparse
 import asyncio
 import logging
 import sys
-from os import mkdir, sep
-from os.path import dirname, realpath
+from os import mkdir, rename, sep
+from os.path import dirname, exists, realpath
 from warnings import filterwarnings
 
 import aiohttp_jinja2
@@ -13,13 +13,30 @@ from aiohttp import web
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
 from cryptography import fernet
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
-from telegram.ext import PicklePersistence
+from telegram.ext import ContextTypes
 from telegram.warnings import PTBUserWarning
 
 from tour_guide_bot import log, set_fallback_locale, t
 from tour_guide_bot.bot.app import Application
+from tour_guide_bot.helpers.audio_converter import AudioConverter
+from tour_guide_bot.helpers.bot_commands_cache import BotCommandsCache
+from tour_guide_bot.helpers.invoice_payload import InvoicePayloadSigner, PaidInvoices
+from tour_guide_bot.helpers.journal_persistence import JournalPersistence
+from tour_guide_bot.helpers.keyboards import KeyboardRegistry
+from tour_guide_bot.helpers.product_menu_cache import ProductMenuCache
+from tour_guide_bot.helpers.rate_limiter import OutboundRateLimiter
+from tour_guide_bot.helpers.section_delivery import SectionDeliveryRegistry
+from tour_guide_bot.helpers.settings_cache import SettingsCache
+from tour_guide_bot.helpers.sql_persistence import SqlPersistence
+from tour_guide_bot.helpers.tour_content_cache import TourContentCache
+from tour_guide_bot.helpers.tour_titles import TourTitlesCache
+from tour_guide_bot.helpers.user_data import UserData
+from tour_guide_bot.helpers.user_identity_cache import UserIdentityCache
 from tour_guide_bot.web import routes
 
+PICKLE_PERSISTENCE_FILE = "telegram_guide_bot_storage.pickle"
+JOURNAL_PERSISTENCE_FILE = "telegram_guide_bot_storage"
+
 
 def prepare_app(
     guide_bot_token: str,
@@ -28,24 +45,54 @@ def prepare_app(
     default_language: str,
     persistence_path: str,
     application_class=Application,
+    audio_conversion_workers: int | None = None,
+    persistence: str = "database",
+    read_engine: AsyncEngine | None = None,
 ) -> Application:
     filterwarnings(
         action="ignore", message=r".*CallbackQueryHandler", category=PTBUserWarning
     )
+    # Both the tour adding conversation and the nested audio conversion one time
+    # out on their own, each dropping its own data
+    filterwarnings(
+        action="ignore",
+        message=r"Using `conversation_timeout` with nested conversations",
+        category=PTBUserWarning,
+    )
 
     app = (
         application_class.builder()
         .token(guide_bot_token)
         .concurrent_updates(True)
+        .rate_limiter(OutboundRateLimiter())
+        .context_types(ContextTypes(user_data=UserData))
         .build()
     )
     app.content_add_lock = asyncio.Lock()
     app.db_engine = engine
+    # The read-only handlers don't need a transaction, and could use a replica
+    app.db_read_engine = read_engine or engine.execution_options(
+        isolation_level="AUTOCOMMIT"
+    )
+    app.tour_content_cache = TourContentCache()
+    app.settings_cache = SettingsCache()
+    app.bot_commands_cache = BotCommandsCache()
+    app.keyboards = KeyboardRegistry(enabled_languages)
+    app.tour_titles_cache = TourTitlesCache()
+    app.product_menu_cache = ProductMenuCache()
+    app.invoice_payload_signer = InvoicePayloadSigner(guide_bot_token)
+    app.paid_invoices = PaidInvoices()
+    app.user_identity_cache = UserIdentityCache()
+    app.section_deliveries = SectionDeliveryRegistry()
+    app.audio_converter = AudioConverter(audio_conversion_workers)
     app.enabled_languages = enabled_languages
     app.default_language = default_language
-    app.persistence = PicklePersistence(
-        persistence_path + sep + "telegram_guide_bot_storage.pickle", update_interval=60
-    )
+    if persistence == "journal":
+        app.persistence = JournalPersistence(
+            persistence_path + sep + JOURNAL_PERSISTENCE_FILE
+        )
+    else:
+        app.persistence = SqlPersistence(engine)
 
     return app
 
@@ -89,6 +136,33 @@ def run():
         type=str,
         required=True,
     )
+    parser.add_argument(
+        "--db-read-replica",
+        help=t().pgettext(
+            "cli",
+            "SQLAlchemy engine URL of a read replica, for the handlers which don't change anything.",
+        ),
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--audio-conversion-workers",
+        help=t().pgettext(
+            "cli",
+            "Maximum number of simultaneous audio conversions. Defaults to the number of CPUs.",
+        ),
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--persistence",
+        help=t().pgettext(
+            "cli",
+            "Where to keep the conversations' state: in the database or in a local journal file.",
+        ),
+        choices=["database", "journal"],
+        default="database",
+    )
     parser.add_argument(
         "--enable-http-server",
         help=t().pgettext("cli", "Enable HTTP server."),
@@ -173,8 +247,25 @@ def run():
         args.enabled_languages,
         args.default_language,
         destination_path,
+        audio_conversion_workers=args.audio_conversion_workers,
+        persistence=args.persistence,
+        read_engine=create_async_engine(args.db_read_replica)
+        if args.db_read_replica
+        else None,
     )
 
+    # The conversations used to be stored in a pickle file, which is moved into the
+    # database on the first start
+    pickle_path = destination_path + sep + PICKLE_PERSISTENCE_FILE
+    if args.persistence == "database" and exists(pickle_path):
+        imported = loop.run_until_complete(app.persistence.import_pickle(pickle_path))
+        rename(pickle_path, pickle_path + ".imported")
+        log.info(
+            t()
+            .pgettext("cli", "Imported {0} entries from the pickle persistence.")
+            .format(imported)
+        )
+
     loop.run_until_complete(app.initialize())
     if app.post_init:
         loop.run_until_complete(app.post_init(app))
@@ -0,0 +1,238 @@
+import asyncio
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import monotonic
+from typing import Awaitable, Callable, Hashable
+
+import ffmpeg
+
+ProgressCallback = Callable[[float | None], Awaitable[None]]
+
+
+class ConversionError(Exception):
+    pass
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+class AudioConverter:
+    """
+    Runs the audio-to-voice conversions as ffmpeg subprocesses without blocking
+    the event loop.
+
+    At most `max_workers` conversions run at the same time, the rest wait in a
+    queue. Every conversion is identified by a key (e.g. the admin's user id),
+    which can be used to cancel it either while it is queued or while running.
+    """
+
+    # Identifies the conversion settings, so the cached results could be told apart
+    # when the settings change
+    PROFILE = "opus-192k"
+
+    # How often the progress callback might be called, in seconds
+    PROGRESS_INTERVAL = 5
+
+    CHUNK_SIZE = 64 * 1024
+
+    # The box types an MP4-family file (mp4, m4a, mov) might start with. Such files
+    # might keep their index at the end, which ffmpeg can't reach in a pipe.
+    SEEKABLE_SIGNATURES = (b"ftyp", b"moov", b"mdat", b"free", b"wide")
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._active: dict[Hashable, asyncio.Task] = {}
+        self._processes: dict[Hashable, asyncio.subprocess.Process] = {}
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._active) - len(self._processes)
+
+    def is_active(self, key: Hashable) -> bool:
+        return key in self._active
+
+    def cancel(self, key: Hashable) -> bool:
+        task = self._active.get(key)
+        if task is None:
+            return False
+
+        process = self._processes.get(key)
+        if process is not None and process.returncode is None:
+            process.kill()
+
+        task.cancel()
+
+        return True
+
+    @staticmethod
+    def get_args(source: str, progress_fd: int) -> list[str]:
+        return (
+            ffmpeg.input(source)
+            .output("pipe:1", format="ogg", acodec="libopus", **{"b:a": "192000"})
+            .global_args(
+                "-nostats", "-loglevel", "error", "-progress", "pipe:%d" % progress_fd
+            )
+            .compile()
+        )
+
+    @classmethod
+    def needs_seekable_source(cls, source: bytes | bytearray | memoryview) -> bool:
+        return bytes(source[4:8]) in cls.SEEKABLE_SIGNATURES
+
+    async def convert(
+        self,
+        key: Hashable,
+        source: bytes | bytearray | memoryview,
+        duration: float | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> bytes:
+        """
+        Converts the source audio into an opus-encoded voice message.
+
+        Both the source and the result are kept in memory and streamed through
+        ffmpeg's stdin and stdout, so nothing touches the disk. The only exception
+        are the MP4-family sources, which are written to a temporary file, since
+        ffmpeg has to seek in them.
+
+        The progress callback receives None while the conversion is waiting for a
+        free worker, and then the share of the processed audio (when the duration
+        is known) every `PROGRESS_INTERVAL` seconds.
+        """
+        if key in self._active:
+            raise ConversionError("A conversion for %s is already in progress" % key)
+
+        async def _queue_and_run():
+            if self._semaphore.locked() and on_progress:
+                await on_progress(None)
+
+            async with self._semaphore:
+                return await self._run(key, source, duration, on_progress)
+
+        task = asyncio.ensure_future(_queue_and_run())
+        self._active[key] = task
+
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled():
+                raise ConversionCancelled() from None
+
+            raise
+        finally:
+            del self._active[key]
+
+    async def _run(
+        self,
+        key: Hashable,
+        source: bytes | bytearray | memoryview,
+        duration: float | None,
+        on_progress: ProgressCallback | None,
+    ) -> bytes:
+        if not self.needs_seekable_source(source):
+            return await self._run_process(key, "pipe:0", source, duration, on_progress)
+
+        with TemporaryDirectory(prefix="tour-guide-bot-") as directory:
+            source_path = os.path.join(directory, "source")
+            await asyncio.to_thread(Path(source_path).write_bytes, source)
+
+            return await self._run_process(
+                key, source_path, None, duration, on_progress
+            )
+
+    async def _run_process(
+        self,
+        key: Hashable,
+        source_path: str,
+        source: bytes | bytearray | memoryview | None,
+        duration: float | None,
+        on_progress: ProgressCallback | None,
+    ) -> bytes:
+        # The progress is reported through a pipe of its own, so stderr is left
+        # for the errors only
+        progress_fd, progress_write_fd = os.pipe()
+        progress = asyncio.StreamReader()
+        try:
+            progress_transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(progress),
+                open(progress_fd, "rb", buffering=0),
+            )
+
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self.get_args(source_path, progress_write_fd),
+                    stdin=asyncio.subprocess.PIPE
+                    if source is not None
+                    else asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    pass_fds=(progress_write_fd,),
+                )
+            except BaseException:
+                progress_transport.close()
+                raise
+        finally:
+            # Only ffmpeg keeps the pipe open, so it's closed once ffmpeg exits
+            os.close(progress_write_fd)
+
+        self._processes[key] = process
+
+        async def write_source():
+            if source is None:
+                return
+
+            view = memoryview(source)
+
+            try:
+                # Feeding the data in chunks keeps the pipe's buffer from holding
+                # another copy of the whole file
+                for offset in range(0, len(view), self.CHUNK_SIZE):
+                    process.stdin.write(view[offset : offset + self.CHUNK_SIZE])
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg has exited early, the reason will be in its stderr
+                pass
+            finally:
+                process.stdin.close()
+
+        async def read_progress():
+            last_reported = monotonic()
+
+            async for line in progress:
+                name, _, value = line.decode(errors="replace").strip().partition("=")
+
+                if (
+                    name == "out_time_us"
+                    and on_progress
+                    and duration
+                    and monotonic() - last_reported >= self.PROGRESS_INTERVAL
+                    and value.isdigit()
+                ):
+                    last_reported = monotonic()
+                    await on_progress(min(1.0, int(value) / 1_000_000 / duration))
+
+        try:
+            _, result, errors, _ = await asyncio.gather(
+                write_source(),
+                process.stdout.read(),
+                process.stderr.read(),
+                read_progress(),
+            )
+            await process.wait()
+        finally:
+            del self._processes[key]
+            progress_transport.close()
+
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if process.returncode != 0:
+            raise ConversionError(
+                "ffmpeg exited with code %d: %s"
+                % (process.returncode, errors.decode(errors="replace").strip())
+            )
+
+        return result
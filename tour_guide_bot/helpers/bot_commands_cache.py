@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Hashable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tour_guide_bot.models.guide import Product
+
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_PRODUCTS_TTL = 60
+
+
+class BotCommandsCache:
+    """
+    Remembers the fingerprint of the command set every scope has got, so the Bot
+    API is only called when the commands change. The scopes are identified by
+    the chat id, or by ("default", language) for the per-language defaults.
+
+    The state is kept in memory only, so after a restart every scope gets its
+    commands once again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        products_ttl: float = DEFAULT_PRODUCTS_TTL,
+    ):
+        self.max_entries = max_entries
+        self.products_ttl = products_ttl
+        self._sent: OrderedDict[Hashable, Hashable] = OrderedDict()
+        self._has_products: tuple[bool, float] | None = None
+
+    def __len__(self) -> int:
+        return len(self._sent)
+
+    def is_sent(self, scope: Hashable, fingerprint: Hashable) -> bool:
+        if self._sent.get(scope) != fingerprint:
+            return False
+
+        self._sent.move_to_end(scope)
+        return True
+
+    def remember(self, scope: Hashable, fingerprint: Hashable) -> None:
+        self._sent[scope] = fingerprint
+        self._sent.move_to_end(scope)
+
+        while len(self._sent) > self.max_entries:
+            self._sent.popitem(last=False)
+
+    def forget(self, scope: Hashable) -> None:
+        self._sent.pop(scope, None)
+
+    async def has_products(self, db_session: AsyncSession) -> bool:
+        if self._has_products is None or self._has_products[1] < monotonic():
+            product_id = await db_session.scalar(
+                select(Product.id).where(Product.available == True).limit(1)  # noqa
+            )
+            self._has_products = (
+                product_id is not None,
+                monotonic() + self.products_ttl,
+            )
+
+        return self._has_products[0]
+
+    def invalidate_products(self) -> None:
+        self._has_products = None
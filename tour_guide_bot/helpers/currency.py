@@ -1,50 +1,136 @@
+import asyncio
+import json
+import os
 from datetime import datetime
 
 import aiohttp
+from babel.numbers import get_currency_precision, get_currency_symbol, list_currencies
+
+from tour_guide_bot import log, t
 
 CACHE_TTL = 86400
+CURRENCIES_URL = "https://core.telegram.org/bots/payments/currencies.json"
+SNAPSHOT_PATH = os.path.dirname(os.path.realpath(__file__)) + "/currencies.json"
+
+
+def load_snapshot() -> dict:
+    with open(SNAPSHOT_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fallback_config(currency: str) -> dict | None:
+    """
+    The formatting of a currency missing in the bundled catalogue, from CLDR.
+    """
+    if currency not in list_currencies():
+        return None
+
+    return {
+        "code": currency,
+        "symbol": get_currency_symbol(currency, "en"),
+        "thousands_sep": ",",
+        "decimal_sep": ".",
+        "symbol_left": True,
+        "space_between": True,
+        "exp": get_currency_precision(currency),
+    }
 
 
 class Currency:
-    cache = None
-    last_cache_update = None
+    """
+    The currencies supported by Telegram, with their formatting and the price
+    limits. The catalogue bundled with the bot is used until the first refresh
+    succeeds, so the prices never wait for the network; the refreshes are run
+    in background, and a failed one keeps serving the data at hand.
+
+    Until the catalogue is fetched from Telegram, the price limits are not
+    checked, and the currencies missing in the bundled one are formatted using
+    CLDR.
+    """
+
+    cache: dict = load_snapshot()
+    last_cache_update: datetime | None = None
+    refresh_task: asyncio.Task | None = None
 
     @classmethod
-    async def ensure_cache(cls) -> None:
-        if cls.last_cache_update is not None:
-            cache_lifetime = datetime.now() - cls.last_cache_update
-            force_cache_update = cache_lifetime.total_seconds() > CACHE_TTL
-        else:
-            force_cache_update = True
+    def is_stale(cls) -> bool:
+        if cls.last_cache_update is None:
+            return True
 
-        if force_cache_update:
-            await cls.update_cache()
+        cache_lifetime = datetime.now() - cls.last_cache_update
+        return cache_lifetime.total_seconds() > CACHE_TTL
 
     @staticmethod
     async def load_currencies_config() -> dict:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                "https://core.telegram.org/bots/payments/currencies.json"
-            ) as response:
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as session:
+            async with session.get(CURRENCIES_URL) as response:
+                response.raise_for_status()
                 return await response.json()
 
     @classmethod
-    async def update_cache(cls) -> None:
-        cls.cache = await cls.load_currencies_config()
+    async def update_cache(cls) -> bool:
+        """
+        Fetches the catalogue, with at most one fetch in flight: the concurrent
+        callers wait for the same one. Returns whether the catalogue was updated.
+        """
+        if cls.refresh_task is None or cls.refresh_task.done():
+            cls.refresh_task = asyncio.create_task(cls._update_cache())
+
+        return await asyncio.shield(cls.refresh_task)
+
+    @classmethod
+    async def _update_cache(cls) -> bool:
+        try:
+            cache = await cls.load_currencies_config()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            log.warning(
+                t().pgettext(
+                    "cli", "Unable to update the currencies, using the stale ones."
+                ),
+                exc_info=True,
+            )
+            return False
+
+        if not isinstance(cache, dict) or not cache:
+            log.warning(
+                t().pgettext(
+                    "cli", "Got an empty list of currencies, using the stale ones."
+                )
+            )
+            return False
+
+        cls.cache = cache
         cls.last_cache_update = datetime.now()
+        return True
+
+    @classmethod
+    async def refresh_if_stale(cls) -> None:
+        if cls.is_stale():
+            await cls.update_cache()
+
+    @classmethod
+    def get_config(cls, currency: str) -> dict | None:
+        if currency in cls.cache:
+            return cls.cache[currency]
+
+        if cls.last_cache_update is None:
+            return fallback_config(currency)
+
+        return None
 
     @classmethod
     async def is_known_currency(cls, currency: str) -> bool:
-        await cls.ensure_cache()
-        return currency in cls.cache
+        return cls.get_config(currency) is not None
 
     @classmethod
-    async def ensure_currency(cls, currency: str) -> bool:
-        await cls.ensure_cache()
-        if not await cls.is_known_currency(currency):
+    async def ensure_currency(cls, currency: str) -> dict:
+        cfg = cls.get_config(currency)
+        if cfg is None:
             raise ValueError("Unknown currency")
 
-        return cls.cache[currency]
+        return cfg
 
     @classmethod
     async def price_to_telegram(cls, currency: str, price: str) -> int:
@@ -59,6 +145,12 @@ class Currency:
     @classmethod
     async def is_valid(cls, currency: str, price: int) -> bool:
         cfg = await cls.ensure_currency(currency)
+
+        if cls.last_cache_update is None:
+            # The limits follow the exchange rates, so the bundled ones aren't
+            # trusted; Telegram refuses the invoices with a wrong price anyway
+            return price > 0
+
         return int(cfg["min_amount"]) <= price <= int(cfg["max_amount"])
 
     @classmethod
@@ -99,3 +191,19 @@ class Currency:
                 ret = ret + cfg["symbol"]
 
         return ret
+
+
+async def update_snapshot() -> None:
+    # The snapshot is loaded on import, so it's replaced only once the new one
+    # is fetched and written in full
+    config = await Currency.load_currencies_config()
+
+    with open(SNAPSHOT_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    os.replace(SNAPSHOT_PATH + ".tmp", SNAPSHOT_PATH)
+
+
+if __name__ == "__main__":
+    asyncio.run(update_snapshot())
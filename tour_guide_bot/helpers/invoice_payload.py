@@ -0,0 +1,108 @@
+import hashlib
+import hmac
+from base64 import urlsafe_b64encode
+from time import time
+from typing import NamedTuple
+
+# The payloads may be paid at any time after they're sent; the long-living ones
+# could keep a price which is not offered anymore.
+DEFAULT_TTL = 24 * 60 * 60
+
+PREFIX = "i:"
+SIGNATURE_LENGTH = 16
+
+
+class InvoicePayload(NamedTuple):
+    invoice_id: int
+    price: int
+    currency: str
+    expire_ts: int
+
+
+class InvoicePayloadSigner:
+    """
+    Signs the invoice payloads, so the pre-checkout queries can be validated
+    without the database. The payload is `i:<invoice id>:<price>:<currency>:
+    <expiry>:<signature>`, which fits into Telegram's 128 bytes limit.
+
+    The key is derived from the bot token, so every instance of the bot shares
+    it without any extra configuration, and the payloads are invalidated
+    together with the token.
+    """
+
+    def __init__(self, bot_token: str, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._key = hashlib.sha256(b"invoice-payload:" + bot_token.encode()).digest()
+
+    def _sign(self, message: str) -> str:
+        digest = hmac.new(self._key, message.encode(), hashlib.sha256).digest()
+        return urlsafe_b64encode(digest[:SIGNATURE_LENGTH]).decode().rstrip("=")
+
+    def sign(self, invoice_id: int, price: int, currency: str) -> str:
+        message = "%s%d:%d:%s:%d" % (
+            PREFIX,
+            invoice_id,
+            price,
+            currency,
+            time() + self.ttl,
+        )
+
+        return message + ":" + self._sign(message)
+
+    def verify(self, payload: str) -> InvoicePayload | None:
+        """
+        Returns the signed data, or None if the payload isn't a valid signed one
+        or it has expired.
+        """
+        message, _, signature = payload.rpartition(":")
+        if not message.startswith(PREFIX) or not hmac.compare_digest(
+            signature, self._sign(message)
+        ):
+            return None
+
+        invoice_id, price, currency, expire_ts = message[len(PREFIX) :].split(":")
+        if int(expire_ts) < time():
+            return None
+
+        return InvoicePayload(int(invoice_id), int(price), currency, int(expire_ts))
+
+
+def get_invoice_id(payload: str) -> int | None:
+    """
+    Returns the invoice id of either a signed payload, or one sent before the
+    payloads were signed (`i:<invoice id>`), without verifying it.
+    """
+    if not payload.startswith(PREFIX):
+        return None
+
+    invoice_id = payload[len(PREFIX) :].split(":", 1)[0]
+
+    return int(invoice_id) if invoice_id.isdigit() else None
+
+
+class PaidInvoices:
+    """
+    The ids of the invoices paid by this instance of the bot, kept until their
+    payloads expire, so the pre-checkout refuses to charge them once again.
+    """
+
+    def __init__(self):
+        self._expire_ts: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._expire_ts)
+
+    def __contains__(self, invoice_id: int) -> bool:
+        return invoice_id in self._expire_ts
+
+    def add(self, payload: InvoicePayload) -> None:
+        now = time()
+        # The payloads expire roughly in the order they're paid
+        while self._expire_ts:
+            invoice_id, expire_ts = next(iter(self._expire_ts.items()))
+            if expire_ts >= now:
+                break
+
+            del self._expire_ts[invoice_id]
+
+        self._expire_ts[payload.invoice_id] = payload.expire_ts
@@ -0,0 +1,297 @@
+import asyncio
+import os
+import pickle
+from hashlib import blake2b
+from typing import Any, BinaryIO
+
+from telegram.ext import BasePersistence, PersistenceInput
+from telegram.ext._utils.types import CDCData, ConversationDict, ConversationKey
+
+from tour_guide_bot import log, t
+from tour_guide_bot.helpers.user_data import UserData
+
+# (kind, conversation name or "", key)
+EntryKey = tuple[str, str, Any]
+
+
+def _digest(value: bytes) -> bytes:
+    return blake2b(value, digest_size=16).digest()
+
+
+def _read_snapshot(path: str) -> dict[EntryKey, bytes]:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _replay_journal(
+    path: str, entries: dict[EntryKey, bytes], repair: bool = False
+) -> None:
+    """
+    Applies the journal's records to the entries. A record which can't be read
+    ends the journal, and with `repair` the journal is truncated to the last good
+    record, so the records appended later aren't lost behind it.
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, "r+b" if repair else "rb") as f:
+        good_offset = 0
+
+        while True:
+            try:
+                entry_key, value = pickle.load(f)
+            except EOFError:
+                if f.tell() == good_offset:
+                    break
+            except Exception:
+                pass
+            else:
+                good_offset = f.tell()
+
+                if value is None:
+                    entries.pop(entry_key, None)
+                else:
+                    entries[entry_key] = value
+
+                continue
+
+            # The last record might be incomplete if the bot was killed while
+            # writing it
+            log.warning(
+                t()
+                .pgettext("cli", "Ignoring the truncated tail of journal {0}.")
+                .format(path)
+            )
+
+            if repair:
+                f.truncate(good_offset)
+
+            break
+
+
+class JournalPersistence(BasePersistence[dict, dict, dict]):
+    """
+    Keeps the bot's data in a local append-only journal, for deployments without
+    a database server.
+
+    Every changed entry is appended to the journal as a separate record, so the
+    cost of a run depends on the number of changes, not on the number of users.
+    Once the journal grows bigger than the snapshot, it is rotated and merged
+    into a new snapshot in a background thread. On startup the snapshot is read
+    first, and then the journals written after it are replayed.
+    """
+
+    MIN_COMPACTION_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        store_data: PersistenceInput | None = None,
+        update_interval: float = 5,
+        fsync: bool = True,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.snapshot_path = path + ".snapshot"
+        self.journal_path = path + ".journal"
+        self.fsync = fsync
+
+        self._data: dict[str, dict[Any, Any]] | None = None
+        self._stored: dict[EntryKey, bytes] = {}
+        self._dirty: dict[EntryKey, bytes | None] = {}
+        self._pending_write: asyncio.Task | None = None
+        self._journal: BinaryIO | None = None
+        self._compaction: asyncio.Future | None = None
+        # The journal is written in a thread, one batch at a time
+        self._journal_lock = asyncio.Lock()
+
+    @property
+    def _frozen_journal_path(self) -> str:
+        return self.journal_path + ".compacting"
+
+    def _load(self) -> dict[str, dict[Any, Any]]:
+        if self._data is None:
+            entries = _read_snapshot(self.snapshot_path)
+            # The journal which was being compacted when the bot stopped goes first
+            _replay_journal(self._frozen_journal_path, entries)
+            _replay_journal(self.journal_path, entries, repair=True)
+
+            self._data = {}
+            for entry_key, value in entries.items():
+                kind, namespace, key = entry_key
+                self._stored[entry_key] = _digest(value)
+                self._data.setdefault(kind + ":" + namespace, {})[key] = pickle.loads(
+                    value
+                )
+
+        return self._data
+
+    def _pop(self, kind: str, namespace: str = "") -> dict[Any, Any]:
+        # The loaded data is handed over to the application and is not kept here
+        return self._load().pop(kind + ":" + namespace, {})
+
+    async def _update(self, entry_key: EntryKey, data: Any) -> None:
+        if data is None:
+            if entry_key not in self._stored and entry_key not in self._dirty:
+                return
+
+            self._dirty[entry_key] = None
+        else:
+            value = pickle.dumps(data)
+            if self._stored.get(entry_key) == _digest(value):
+                self._dirty.pop(entry_key, None)
+                return
+
+            self._dirty[entry_key] = value
+
+        # Application runs all the updates concurrently, so they are collected and
+        # appended to the journal at once
+        if self._pending_write is None:
+            self._pending_write = asyncio.ensure_future(self._write_dirty())
+
+        await asyncio.shield(self._pending_write)
+
+    async def _write_dirty(self) -> None:
+        # Let the rest of the concurrent updates add their entries
+        await asyncio.sleep(0)
+
+        dirty, self._dirty = self._dirty, {}
+        self._pending_write = None
+
+        if not dirty:
+            return
+
+        async with self._journal_lock:
+            await asyncio.to_thread(self._append, dirty)
+
+        for entry_key, value in dirty.items():
+            if value is None:
+                self._stored.pop(entry_key, None)
+            else:
+                self._stored[entry_key] = _digest(value)
+
+        if self._compaction is None and self._needs_compaction():
+            self._compaction = asyncio.ensure_future(self._compact())
+
+    def _append(self, records: dict[EntryKey, bytes | None]) -> None:
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+
+        for entry_key, value in records.items():
+            pickle.dump((entry_key, value), self._journal)
+
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _needs_compaction(self) -> bool:
+        if self._journal is None:
+            return False
+
+        snapshot_size = (
+            os.path.getsize(self.snapshot_path)
+            if os.path.exists(self.snapshot_path)
+            else 0
+        )
+
+        return self._journal.tell() > max(self.MIN_COMPACTION_SIZE, snapshot_size)
+
+    def _merge(self) -> None:
+        entries = _read_snapshot(self.snapshot_path)
+        _replay_journal(self._frozen_journal_path, entries)
+
+        with open(self.snapshot_path + ".tmp", "wb") as f:
+            pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(self.snapshot_path + ".tmp", self.snapshot_path)
+        os.remove(self._frozen_journal_path)
+
+    async def _compact(self) -> None:
+        try:
+            # A previous compaction might have been interrupted, then its journal is
+            # merged first
+            if os.path.exists(self._frozen_journal_path):
+                await asyncio.to_thread(self._merge)
+
+            async with self._journal_lock:
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+
+                if not os.path.exists(self.journal_path):
+                    return
+
+                os.replace(self.journal_path, self._frozen_journal_path)
+
+            await asyncio.to_thread(self._merge)
+        except Exception:
+            log.exception(t().pgettext("cli", "Failed to compact the journal."))
+        finally:
+            self._compaction = None
+
+    async def get_user_data(self) -> dict[int, dict]:
+        # The entries stored before UserData was introduced are plain dicts
+        return {
+            user_id: value if isinstance(value, UserData) else UserData(value)
+            for user_id, value in self._pop("user_data").items()
+        }
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return self._pop("chat_data")
+
+    async def get_bot_data(self) -> dict:
+        return self._pop("bot_data").get("", {})
+
+    async def get_callback_data(self) -> CDCData | None:
+        return self._pop("callback_data").get("")
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        return self._pop("conversation", name)
+
+    async def update_conversation(
+        self, name: str, key: ConversationKey, new_state: object | None
+    ) -> None:
+        await self._update(("conversation", name, key), new_state)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await self._update(("user_data", "", user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        await self._update(("chat_data", "", chat_id), data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        await self._update(("bot_data", "", ""), data)
+
+    async def update_callback_data(self, data: CDCData) -> None:
+        await self._update(("callback_data", "", ""), data)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await self._update(("user_data", "", user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await self._update(("chat_data", "", chat_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._pending_write is not None:
+            await self._pending_write
+
+        await self._write_dirty()
+
+        if self._compaction is not None:
+            await self._compaction
+
+        # Leave a compacted snapshot for the next start
+        await self._compact()
@@ -0,0 +1,37 @@
+from typing import Callable, Hashable
+
+from telegram import InlineKeyboardMarkup
+
+KeyboardBuilder = Callable[[str], InlineKeyboardMarkup]
+
+
+class KeyboardRegistry:
+    """
+    Keeps the keyboards which depend on nothing but the interface language, so
+    they're built once per language instead of on every render.
+
+    The markup is frozen once built, so the same object is shared by all the
+    updates. The handlers register their keyboards on startup for every enabled
+    language; the rest are built on the first use.
+    """
+
+    def __init__(self, languages: list[str]):
+        self.languages = languages
+        self._keyboards: dict[tuple[Hashable, str], InlineKeyboardMarkup] = {}
+
+    def __len__(self) -> int:
+        return len(self._keyboards)
+
+    def register(self, key: Hashable, builder: KeyboardBuilder) -> None:
+        for language in self.languages:
+            self.get(key, language, builder)
+
+    def get(
+        self, key: Hashable, language: str, builder: KeyboardBuilder
+    ) -> InlineKeyboardMarkup:
+        keyboard = self._keyboards.get((key, language))
+
+        if keyboard is None:
+            keyboard = self._keyboards[key, language] = builder(language)
+
+        return keyboard
@@ -1,9 +1,11 @@
-from babel import Locale
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
 
 from tour_guide_bot import t
-from tour_guide_bot.helpers.language_selector import SelectLanguageHandler
+from tour_guide_bot.helpers.language_selector import (
+    SelectLanguageHandler,
+    get_language_name,
+)
 
 
 class LanguageHandler(SelectLanguageHandler):
@@ -27,12 +29,13 @@ class LanguageHandler(SelectLanguageHandler):
         user.language = language
         self.db_session.add(user)
         await self.db_session.commit()
+        context.application.user_identity_cache.invalidate(user.id)
 
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
             t(language)
             .pgettext("bot-generic", "The language has been changed to {0}.")
-            .format(Locale.parse(language).get_language_name(language))
+            .format(get_language_name(language, language))
         )
 
     def get_language_selection_message(self, user_language: str) -> str:
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from functools import cache, partial
 from typing import ClassVar
 
 from babel import Locale
@@ -10,9 +11,15 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.keyboards import KeyboardRegistry
 from tour_guide_bot.helpers.telegram import BaseHandlerCallback
 
 
+@cache
+def get_language_name(locale_name: str, display_language: str) -> str:
+    return Locale.parse(locale_name).get_language_name(display_language)
+
+
 class SelectLanguageHandler(BaseHandlerCallback, ABC):
     STATE_LANGUAGE_SELECTION: ClassVar[int] = -11
     SKIP_LANGUAGE_SELECTION_IF_SINGLE: ClassVar[bool] = True
@@ -32,45 +39,39 @@ class SelectLanguageHandler(BaseHandlerCallback, ABC):
     def get_language_selection_message(self, user_language: str) -> str:
         pass
 
-    async def get_languages(
-        self,
-        current_language: str,
-        context: ContextTypes.DEFAULT_TYPE,
+    @classmethod
+    def get_languages(
+        cls, current_language: str, languages: list[str]
     ) -> list[tuple[str, str]]:
         ret = []
-        for locale_name in context.application.enabled_languages:
-            locale = Locale.parse(locale_name)
-
+        for locale_name in languages:
             if (
                 locale_name != current_language
-                and self.LANGUAGE_SELECTION_LANGUAGE_FRIENDLY
+                and cls.LANGUAGE_SELECTION_LANGUAGE_FRIENDLY
             ):
                 locale_text = "%s (%s)" % (
-                    locale.get_language_name(current_language),
-                    locale.get_language_name(locale_name),
+                    get_language_name(locale_name, current_language),
+                    get_language_name(locale_name, locale_name),
                 )
             else:
-                locale_text = locale.get_language_name(current_language)
+                locale_text = get_language_name(locale_name, current_language)
 
             ret.append((locale_name, locale_text))
 
         return ret
 
-    async def get_language_select_inline_keyboard(
-        self,
-        current_language: str,
-        context: ContextTypes.DEFAULT_TYPE,
+    @classmethod
+    def build_language_select_inline_keyboard(
+        cls, current_language: str, languages: list[str]
     ) -> InlineKeyboardMarkup:
         keyboard = []
 
-        for locale_name, locale_text in await self.get_languages(
-            current_language, context
-        ):
+        for locale_name, locale_text in cls.get_languages(current_language, languages):
             keyboard.append(
                 [
                     InlineKeyboardButton(
                         locale_text.title(),
-                        callback_data=self.get_callback_data("language", locale_name),
+                        callback_data=cls.get_callback_data("language", locale_name),
                     )
                 ]
             )
@@ -79,13 +80,38 @@ class SelectLanguageHandler(BaseHandlerCallback, ABC):
             [
                 InlineKeyboardButton(
                     t(current_language).pgettext("bot-generic", "Abort"),
-                    callback_data=self.get_callback_data("cancel_language_selection"),
+                    callback_data=cls.get_callback_data("cancel_language_selection"),
                 )
             ]
         )
 
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+    @classmethod
+    def register_keyboards(cls, keyboards: KeyboardRegistry) -> None:
+        super().register_keyboards(keyboards)
+        keyboards.register(
+            (cls, "language"),
+            partial(
+                cls.build_language_select_inline_keyboard,
+                languages=keyboards.languages,
+            ),
+        )
+
+    def get_language_select_inline_keyboard(
+        self,
+        current_language: str,
+        context: ContextTypes.DEFAULT_TYPE,
+    ) -> InlineKeyboardMarkup:
+        return context.application.keyboards.get(
+            (self.__class__, "language"),
+            current_language,
+            partial(
+                self.build_language_select_inline_keyboard,
+                languages=context.application.enabled_languages,
+            ),
+        )
+
     async def send_language_selector(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -106,7 +132,7 @@ class SelectLanguageHandler(BaseHandlerCallback, ABC):
             update,
             context,
             self.get_language_selection_message(user_language),
-            reply_markup=await self.get_language_select_inline_keyboard(
+            reply_markup=self.get_language_select_inline_keyboard(
                 user_language,
                 context,
             ),
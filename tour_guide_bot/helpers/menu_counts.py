@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tour_guide_bot.models.guide import Product, Tour
+from tour_guide_bot.models.settings import PaymentProvider
+
+
+@dataclass(frozen=True, slots=True)
+class MenuCounts:
+    """
+    Everything the admin menus need to know to decide which of their items are
+    available, loaded with a single query.
+    """
+
+    tours: int
+    payment_providers: int
+    products: int
+
+    @classmethod
+    async def load(cls, db_session: AsyncSession) -> "MenuCounts":
+        row = (
+            await db_session.execute(
+                select(
+                    select(func.count(Tour.id)).scalar_subquery(),
+                    select(func.count(PaymentProvider.id))
+                    .where(PaymentProvider.enabled == True)  # noqa
+                    .scalar_subquery(),
+                    select(func.count(Product.id))
+                    .where(Product.available == True)  # noqa
+                    .scalar_subquery(),
+                )
+            )
+        ).one()
+
+        return cls(*row)
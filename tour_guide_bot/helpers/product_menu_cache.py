@@ -0,0 +1,45 @@
+from time import monotonic
+from typing import Awaitable, Callable, Hashable, NamedTuple
+
+from telegram import InlineKeyboardMarkup
+
+DEFAULT_TTL = 60
+
+
+class ProductMenu(NamedTuple):
+    product_ids: tuple[int, ...]
+    message: str
+    keyboard: InlineKeyboardMarkup | None
+
+
+ProductMenuBuilder = Callable[[], Awaitable[ProductMenu]]
+
+
+class ProductMenuCache:
+    """
+    Keeps the rendered product menus, i.e. the message and the keyboard with the
+    formatted prices, keyed by (handler, tour id, products language, interface
+    language), so showing the menu costs neither queries nor formatting.
+
+    The handlers changing the tours or their products must call `invalidate`;
+    the TTL bounds the staleness of the changes made by the other instances of
+    the bot, as well as of the currency formatting.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries: dict[Hashable, tuple[ProductMenu, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Hashable, builder: ProductMenuBuilder) -> ProductMenu:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[1] < monotonic():
+            entry = self._entries[key] = (await builder(), monotonic() + self.ttl)
+
+        return entry[0]
+
+    def invalidate(self) -> None:
+        self._entries.clear()
@@ -10,6 +10,7 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.product_menu_cache import ProductMenu
 from tour_guide_bot.helpers.telegram import BaseHandlerCallback
 from tour_guide_bot.models.guide import Product
 
@@ -71,30 +72,20 @@ class SelectProductHandler(BaseHandlerCallback, ABC):
 
         return ConversationHandler.END if self.STATE_SELECT_PRODUCT else None
 
-    async def send_product_selector(
+    async def build_product_menu(
         self,
         tour_id: int,
+        products_language: str,
         language: str,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
-    ):
+    ) -> ProductMenu:
         products: Sequence[Product] = await self.get_acceptable_products(
-            tour_id, language, update, context
+            tour_id, products_language, update, context
         )
 
-        if len(products) == 1 and self.SKIP_PRODUCT_SELECTION_IF_SINGLE:
-            if update.callback_query:
-                await update.callback_query.answer()
-
-            return await self.after_product_selected(products[0], update, context, True)
-
-        language = await self.get_language(update, context)
-
         if len(products) == 0:
-            if update.callback_query:
-                await update.callback_query.answer()
-
-            return await self.handle_no_products_found(update, context)
+            return ProductMenu((), "", None)
 
         keyboard = []
 
@@ -119,14 +110,44 @@ class SelectProductHandler(BaseHandlerCallback, ABC):
             ]
         )
 
+        return ProductMenu(
+            tuple(product.id for product in products),
+            await self.get_product_selection_message(tour_id, language, context),
+            InlineKeyboardMarkup(keyboard),
+        )
+
+    async def send_product_selector(
+        self,
+        tour_id: int,
+        products_language: str,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ):
+        language = await self.get_language(update, context)
+        menu = await context.application.product_menu_cache.get(
+            (type(self), tour_id, products_language, language),
+            lambda: self.build_product_menu(
+                tour_id, products_language, language, update, context
+            ),
+        )
+
+        product: Product | None = None
+        if len(menu.product_ids) == 1 and self.SKIP_PRODUCT_SELECTION_IF_SINGLE:
+            product = await self.db_session.scalar(
+                select(Product).where(Product.id == menu.product_ids[0])
+            )
+
         if update.callback_query:
             await update.callback_query.answer()
 
+        if product is not None:
+            return await self.after_product_selected(product, update, context, True)
+
+        if menu.keyboard is None:
+            return await self.handle_no_products_found(update, context)
+
         await self.edit_or_reply_text(
-            update,
-            context,
-            await self.get_product_selection_message(tour_id, language, context),
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            update, context, menu.message, reply_markup=menu.keyboard
         )
 
         return self.STATE_SELECT_PRODUCT
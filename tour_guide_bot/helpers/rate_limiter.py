@@ -0,0 +1,326 @@
+import asyncio
+import contextlib
+from collections import OrderedDict, deque
+from datetime import timedelta
+from enum import IntEnum
+from time import monotonic
+from typing import Any, Callable, Coroutine
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from tour_guide_bot import log, t
+
+
+class Priority(IntEnum):
+    # ExtBot drops falsy rate_limit_args, so the values start from 1
+    HIGH = 1
+    NORMAL = 2
+    BULK = 3
+
+
+HIGH_PRIORITY_ENDPOINTS = frozenset(
+    {"answerCallbackQuery", "answerPreCheckoutQuery", "answerShippingQuery"}
+)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, max_rate: float, time_period: float):
+        self.rate = max_rate / time_period
+        self.capacity = max_rate
+        self.tokens = float(max_rate)
+        self.updated = monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+    def wait_time(self, now: float) -> float:
+        if self.blocked_until > now:
+            return self.blocked_until - now
+
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class OutboundRateLimiter(BaseRateLimiter[Priority]):
+    """
+    Schedules all the outgoing Bot API requests to stay within Telegram's limits.
+
+    Every request must get a token from the global bucket, and the requests
+    addressed to a chat must also get one from the chat's own bucket (group chats
+    have a stricter one). The waiting requests are put into priority lanes; within
+    a lane, chats are served round-robin, so a long tour being sent to one chat
+    doesn't delay the others. Payment and callback query answers are treated as
+    high-priority; the callers can pass `rate_limit_args=Priority.BULK` for the
+    messages that may wait, like the tours' content.
+    """
+
+    MAX_TRACKED_CHATS = 10000
+
+    def __init__(
+        self,
+        overall_max_rate: float = 30,
+        overall_time_period: float = 1,
+        private_chat_max_rate: float = 3,
+        private_chat_time_period: float = 3,
+        group_max_rate: float = 20,
+        group_time_period: float = 60,
+        max_retries: int = 3,
+    ):
+        self._overall = (overall_max_rate, overall_time_period)
+        self._private_chat = (private_chat_max_rate, private_chat_time_period)
+        self._group = (group_max_rate, group_time_period)
+        self.max_retries = max_retries
+
+        self._global_bucket = TokenBucket(*self._overall)
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._lanes: dict[Priority, OrderedDict[int | str | None, deque]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.queued_requests = 0
+        self.retries = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "queued_requests": self.queued_requests,
+            "retries": self.retries,
+            "average_wait_time": (
+                self.total_wait_time / self.queued_requests
+                if self.queued_requests
+                else 0.0
+            ),
+            "max_wait_time": self.max_wait_time,
+        }
+
+    async def initialize(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is None:
+            return
+
+        self._dispatcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._dispatcher
+
+        self._dispatcher = None
+
+        for lane in self._lanes.values():
+            for waiters in lane.values():
+                for waiter in waiters:
+                    waiter[0].cancel()
+
+            lane.clear()
+
+        self.queue_depth = 0
+
+    def _get_chat_bucket(self, chat_id: int | str | None) -> TokenBucket | None:
+        if chat_id is None:
+            return None
+
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.MAX_TRACKED_CHATS:
+                self._prune_chat_buckets()
+
+            if isinstance(chat_id, str) or chat_id < 0:
+                bucket = TokenBucket(*self._group)
+            else:
+                bucket = TokenBucket(*self._private_chat)
+
+            self._chat_buckets[chat_id] = bucket
+
+        return bucket
+
+    def _prune_chat_buckets(self) -> None:
+        now = monotonic()
+        waiting = {chat_id for lane in self._lanes.values() for chat_id in lane}
+
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if chat_id not in waiting and bucket.is_idle(now):
+                del self._chat_buckets[chat_id]
+
+    def _try_acquire(self, chat_id: int | str | None, now: float) -> float:
+        """
+        Takes the tokens required for a request to the chat if they are available.
+        Otherwise, returns the time to wait until they might be.
+        """
+        wait_time = self._global_bucket.wait_time(now)
+
+        chat_bucket = self._get_chat_bucket(chat_id)
+        if chat_bucket:
+            wait_time = max(wait_time, chat_bucket.wait_time(now))
+
+        if wait_time > 0:
+            return wait_time
+
+        self._global_bucket.consume(now)
+        if chat_bucket:
+            chat_bucket.consume(now)
+
+        return 0
+
+    def _grant(self) -> float | None:
+        """
+        Lets through as many of the waiting requests as the limits allow. Returns
+        the time after which the next one might be let through, or None when there
+        is nothing left to wait for.
+        """
+        while True:
+            now = monotonic()
+            next_check = None
+            served = None
+
+            global_wait_time = self._global_bucket.wait_time(now)
+            if global_wait_time > 0:
+                return global_wait_time if self.queue_depth else None
+
+            for lane in self._lanes.values():
+                for chat_id, waiters in lane.items():
+                    while waiters and waiters[0][0].done():
+                        # The request was cancelled while waiting
+                        waiters.popleft()
+                        self.queue_depth -= 1
+
+                    if not waiters:
+                        continue
+
+                    wait_time = self._try_acquire(chat_id, now)
+                    if wait_time > 0:
+                        if next_check is None or wait_time < next_check:
+                            next_check = wait_time
+
+                        continue
+
+                    future, enqueued = waiters.popleft()
+                    self.queue_depth -= 1
+
+                    wait = now - enqueued
+                    self.total_wait_time += wait
+                    self.max_wait_time = max(self.max_wait_time, wait)
+
+                    future.set_result(None)
+                    served = (lane, chat_id)
+                    break
+
+                if served:
+                    break
+
+            for lane in self._lanes.values():
+                for chat_id in [chat_id for chat_id, w in lane.items() if not w]:
+                    del lane[chat_id]
+
+            if served is None:
+                return next_check
+
+            lane, chat_id = served
+            if chat_id in lane:
+                # The chat has just been served, so it goes to the end of the line
+                lane.move_to_end(chat_id)
+
+    async def _dispatch(self) -> None:
+        while True:
+            next_check = self._grant()
+            self._wakeup.clear()
+
+            if next_check is None:
+                await self._wakeup.wait()
+            else:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), next_check)
+
+    async def _acquire(self, chat_id: int | str | None, priority: Priority) -> None:
+        self.requests += 1
+
+        if self.queue_depth == 0 and self._try_acquire(chat_id, monotonic()) == 0:
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].setdefault(chat_id, deque()).append((future, monotonic()))
+
+        self.queued_requests += 1
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        self._wakeup.set()
+        await future
+
+    async def process_request(
+        self,
+        callback: Callable[
+            ..., Coroutine[Any, Any, bool | dict[str, Any] | list[dict[str, Any]]]
+        ],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: Priority | None,
+    ) -> bool | dict[str, Any] | list[dict[str, Any]]:
+        if rate_limit_args is not None:
+            priority = Priority(rate_limit_args)
+        elif endpoint in HIGH_PRIORITY_ENDPOINTS:
+            priority = Priority.HIGH
+        else:
+            priority = Priority.NORMAL
+
+        chat_id = data.get("chat_id")
+        with contextlib.suppress(ValueError, TypeError):
+            chat_id = int(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+
+                log.info(
+                    t()
+                    .pgettext(
+                        "cli",
+                        "Rate limit hit on {0} for chat {1}, retrying after {2} seconds.",
+                    )
+                    .format(endpoint, chat_id, retry_after)
+                )
+
+                # Hold back all the following requests to the same chat, or all of
+                # them when the limit is not bound to a chat.
+                bucket = self._get_chat_bucket(chat_id) or self._global_bucket
+                bucket.blocked_until = max(
+                    bucket.blocked_until, monotonic() + retry_after + 0.1
+                )
+                self.retries += 1
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class RecentUpdates:
+    """
+    Remembers the ids of the latest updates, so the ones delivered again, e.g.
+    by a retried webhook, are dropped before any handler sees them.
+
+    The ids are kept in memory only; the updates redelivered after a restart
+    must be idempotent by themselves.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._ids: OrderedDict[int, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def is_replayed(self, update_id: int) -> bool:
+        """
+        Returns whether the update was seen already, remembering it otherwise.
+        """
+        if update_id in self._ids:
+            return True
+
+        self._ids[update_id] = None
+
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+        return False
@@ -0,0 +1,282 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+from telegram import Bot, InlineKeyboardMarkup
+from telegram.constants import ChatAction, ParseMode
+from telegram.ext import CallbackContext, Job, JobQueue
+
+from tour_guide_bot.helpers.rate_limiter import Priority
+from tour_guide_bot.helpers.tour_content_cache import DeliveryItem
+from tour_guide_bot.models.guide import MessageType
+
+
+async def send_item(bot: Bot, chat_id: int, item: DeliveryItem) -> None:
+    match item.message_type:
+        case MessageType.text:
+            await bot.send_message(
+                chat_id,
+                item.text,
+                ParseMode.MARKDOWN_V2,
+                disable_web_page_preview=True,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.location:
+            await bot.send_location(
+                chat_id,
+                item.latitude,
+                item.longitude,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.voice:
+            await bot.send_voice(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.video_note:
+            await bot.send_video_note(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.audio:
+            await bot.send_audio(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.video:
+            await bot.send_video(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.photo:
+            await bot.send_photo(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.animation:
+            await bot.send_animation(
+                chat_id,
+                item.file_id,
+                caption=item.caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+        case MessageType.media_group:
+            await bot.send_media_group(
+                chat_id,
+                item.media,
+                disable_notification=True,
+                protect_content=True,
+                rate_limit_args=Priority.BULK,
+            )
+
+
+@dataclass(frozen=True, slots=True)
+class DeliveryPrompt:
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
+
+@dataclass(slots=True)
+class SectionDelivery:
+    """
+    A plan for sending a tour section to a chat.
+
+    The plan is executed by the application's job queue: every step that must be
+    followed by a pause schedules the next job instead of sleeping, so neither
+    the update handler nor a DB session is held while the section is being sent.
+    """
+
+    chat_id: int
+    items: tuple[DeliveryItem, ...]
+    delay: float = 0
+    prompt: DeliveryPrompt | None = None
+    translation_id: int | None = None
+    position: int | None = None
+    step: int = 0
+    is_cancelled: bool = False
+    job: Job | None = field(default=None, repr=False)
+    on_finish: Callable[["SectionDelivery"], None] | None = field(
+        default=None, repr=False
+    )
+    steps: list[tuple[ChatAction | DeliveryItem | DeliveryPrompt, float]] = field(
+        init=False, repr=False
+    )
+
+    def __post_init__(self):
+        # The flat list of the delivery steps, each with the pause to be made after it
+        self.steps = []
+
+        for item in self.items:
+            if item.chat_action and self.delay > 0:
+                self.steps.append((item.chat_action, self.delay))
+
+            self.steps.append((item, 0))
+
+        if self.prompt:
+            if self.delay > 0:
+                self.steps.append((ChatAction.TYPING, self.delay))
+
+            self.steps.append((self.prompt, 0))
+
+    @property
+    def is_finished(self) -> bool:
+        return self.is_cancelled or self.step >= len(self.steps)
+
+    def cancel(self) -> None:
+        self.is_cancelled = True
+
+        if self.job:
+            self.job.schedule_removal()
+            self.job = None
+
+    def schedule(self, job_queue: JobQueue, when: float = 0) -> Job:
+        self.job = job_queue.run_once(
+            self.run,
+            when,
+            data=self,
+            name="section-delivery:%d" % self.chat_id,
+            chat_id=self.chat_id,
+        )
+
+        return self.job
+
+    async def run(self, context: CallbackContext) -> None:
+        # The job is being executed, so there is nothing to remove from the queue
+        self.job = None
+
+        try:
+            while not self.is_finished:
+                action, pause = self.steps[self.step]
+                self.step += 1
+
+                match action:
+                    case DeliveryItem():
+                        await send_item(context.bot, self.chat_id, action)
+                    case DeliveryPrompt():
+                        await context.bot.send_message(
+                            self.chat_id,
+                            action.text,
+                            reply_markup=action.reply_markup,
+                            rate_limit_args=Priority.BULK,
+                        )
+                    case _:
+                        await context.bot.send_chat_action(
+                            chat_id=self.chat_id,
+                            action=action,
+                            rate_limit_args=Priority.BULK,
+                        )
+
+                if pause > 0 and not self.is_finished:
+                    self.schedule(context.job_queue, pause)
+                    return
+        except Exception:
+            # Don't try to send the rest of the section to a chat that is failing
+            self.is_cancelled = True
+            raise
+        finally:
+            if self.is_finished:
+                if self.on_finish:
+                    self.on_finish(self)
+
+
+class SectionDeliveryRegistry:
+    """
+    Keeps track of the in-flight section deliveries, at most one per chat.
+    """
+
+    def __init__(self):
+        self.cancelled = 0
+        self.deduplicated = 0
+        self._deliveries: dict[int, SectionDelivery] = {}
+
+    def __len__(self) -> int:
+        return len(self._deliveries)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._deliveries),
+            "cancelled": self.cancelled,
+            "deduplicated": self.deduplicated,
+        }
+
+    def is_in_progress(self, chat_id: int, translation_id: int, position: int) -> bool:
+        """
+        Checks whether the given section is already being sent to the chat, and
+        counts the check as a deduplicated delivery if so.
+        """
+        delivery = self._deliveries.get(chat_id)
+
+        if (
+            delivery is None
+            or delivery.is_finished
+            or delivery.translation_id != translation_id
+            or delivery.position != position
+        ):
+            return False
+
+        self.deduplicated += 1
+        return True
+
+    def start(self, job_queue: JobQueue, delivery: SectionDelivery) -> Job:
+        # A chat can follow only one section at a time, the newer one wins
+        self.cancel(delivery.chat_id)
+
+        delivery.on_finish = self._finish
+        self._deliveries[delivery.chat_id] = delivery
+
+        return delivery.schedule(job_queue)
+
+    def cancel(self, chat_id: int) -> bool:
+        delivery = self._deliveries.pop(chat_id, None)
+
+        if delivery is None or delivery.is_finished:
+            return False
+
+        delivery.cancel()
+        self.cancelled += 1
+
+        return True
+
+    def _finish(self, delivery: SectionDelivery) -> None:
+        if self._deliveries.get(delivery.chat_id) is delivery:
+            del self._deliveries[delivery.chat_id]
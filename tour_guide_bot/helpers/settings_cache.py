@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime
+from time import monotonic
+from typing import Any, Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tour_guide_bot.models.settings import Settings, SettingsKey
+
+DEFAULT_CHECK_INTERVAL = 5
+
+# (number of rows, the latest update)
+SettingsVersion = tuple[int, datetime | None]
+
+PARSERS: dict[SettingsKey, Callable[[str], Any]] = {
+    SettingsKey.audio_to_voice: lambda value: value == "yes",
+    SettingsKey.delay_between_messages: float,
+}
+
+
+def parse_value(key: SettingsKey, value: str | None) -> Any:
+    if value is None:
+        return None
+
+    return PARSERS.get(key, str)(value)
+
+
+class SettingsCache:
+    """
+    Process-wide cache of the parsed settings, keyed by (key, language). The
+    settings table is tiny, so it's loaded as a whole, which makes the missing
+    settings cached as well.
+
+    The handlers changing the settings must call `invalidate`. To notice the
+    changes made by the other instances of the bot, the table's row count and
+    the latest `updated_ts` are compared with the loaded ones at most once per
+    `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.loads = 0
+        self._values: dict[tuple[SettingsKey, str | None], Any] | None = None
+        self._version: SettingsVersion | None = None
+        self._next_check = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(
+        self,
+        db_session: AsyncSession,
+        key: SettingsKey,
+        language: str | None = None,
+        default: bool = False,
+    ) -> Any:
+        """
+        Returns the parsed value of the setting, or None if it's missing. With
+        `default` the missing settings fall back to `Settings.DEFAULT_VALUES`.
+        """
+        values = await self._get_values(db_session)
+
+        if (key, language) in values:
+            return values[key, language]
+
+        if default:
+            return parse_value(key, Settings.DEFAULT_VALUES.get(key))
+
+        return None
+
+    async def exists(
+        self,
+        db_session: AsyncSession,
+        keys: list[SettingsKey],
+        language: str | None = None,
+    ) -> bool:
+        """
+        Checks whether all the settings are set for the language. Without the
+        language, a setting set for any language counts, as with
+        `Settings.exists`.
+        """
+        values = await self._get_values(db_session)
+
+        if language:
+            return all((key, language) in values for key in keys)
+
+        existing_keys = {key for key, _ in values}
+
+        return all(key in existing_keys for key in keys)
+
+    def invalidate(self) -> None:
+        self._values = None
+
+    async def _get_values(
+        self, db_session: AsyncSession
+    ) -> dict[tuple[SettingsKey, str | None], Any]:
+        if self._values is not None and monotonic() < self._next_check:
+            return self._values
+
+        async with self._lock:
+            # Somebody else might have refreshed the values while we were waiting
+            if self._values is None:
+                await self._load(db_session)
+            elif monotonic() >= self._next_check:
+                if await self._load_version(db_session) != self._version:
+                    await self._load(db_session)
+                else:
+                    self._next_check = monotonic() + self.check_interval
+
+            return self._values
+
+    async def _load_version(self, db_session: AsyncSession) -> SettingsVersion:
+        row = (
+            await db_session.execute(
+                select(func.count(Settings.id), func.max(Settings.updated_ts))
+            )
+        ).one()
+
+        return row[0], row[1]
+
+    async def _load(self, db_session: AsyncSession) -> None:
+        settings = (await db_session.scalars(select(Settings))).all()
+
+        self.loads += 1
+        self._values = {
+            (setting.key, setting.language): parse_value(setting.key, setting.value)
+            for setting in settings
+        }
+        # The version is derived from the loaded rows, so a change made in the
+        # meantime is noticed by the next check
+        self._version = (
+            len(settings),
+            max((setting.updated_ts for setting in settings), default=None),
+        )
+        self._next_check = monotonic() + self.check_interval
@@ -0,0 +1,21 @@
+from typing import Callable
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+
+
+def dialect_insert(dialect_name: str) -> Callable[..., Insert]:
+    """
+    Returns the dialect-specific insert() construct, which supports the upserts:
+    on_conflict_do_*() for SQLite and PostgreSQL, on_duplicate_key_update() for
+    MySQL.
+    """
+    match dialect_name:
+        case "postgresql":
+            return postgresql.insert
+        case "sqlite":
+            return sqlite.insert
+        case "mysql":
+            return mysql.insert
+        case _:
+            raise RuntimeError("Unsupported database dialect %s" % dialect_name)
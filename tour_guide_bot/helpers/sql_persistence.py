@@ -0,0 +1,267 @@
+import asyncio
+import json
+import pickle
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+from telegram.ext._utils.types import CDCData, ConversationDict, ConversationKey
+
+from tour_guide_bot import log, t
+from tour_guide_bot.helpers.sql import dialect_insert
+from tour_guide_bot.helpers.user_data import UserData
+from tour_guide_bot.models.persistence import PersistenceEntry, PersistenceKind
+
+EntryKey = tuple[PersistenceKind, str, str]
+
+
+def _digest(value: bytes) -> bytes:
+    return blake2b(value, digest_size=16).digest()
+
+
+def _encode_conversation_key(key: ConversationKey) -> str:
+    return json.dumps(list(key))
+
+
+def _decode_conversation_key(key: str) -> ConversationKey:
+    return tuple(json.loads(key))
+
+
+class SqlPersistence(BasePersistence[dict, dict, dict]):
+    """
+    Keeps the bot's user_data, chat_data, bot_data and conversation states in the
+    database, one row per entry.
+
+    Application calls the update_* methods only for the entries accessed since the
+    previous run; the values which didn't change since they were last stored are
+    skipped, and the rest is written with a single upsert transaction. The
+    conversations are loaded only when the corresponding handler asks for them.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        store_data: PersistenceInput | None = None,
+        update_interval: float = 5,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.engine = engine
+
+        # Digests of the values as they are stored in the database
+        self._stored: dict[EntryKey, bytes] = {}
+        # The values to be written on the next run, None means deletion
+        self._dirty: dict[EntryKey, bytes | None] = {}
+        self._pending_write: asyncio.Task | None = None
+        # Keeps the writes in order when a new one starts before the previous ends
+        self._write_lock = asyncio.Lock()
+
+    async def _load(self, kind: PersistenceKind, namespace: str = "") -> dict[str, Any]:
+        stmt = select(PersistenceEntry.key, PersistenceEntry.value).where(
+            (PersistenceEntry.kind == kind) & (PersistenceEntry.namespace == namespace)
+        )
+
+        result = {}
+        async with self.engine.connect() as connection:
+            for key, value in await connection.execute(stmt):
+                self._stored[(kind, namespace, key)] = _digest(value)
+                result[key] = pickle.loads(value)
+
+        return result
+
+    async def _update(self, entry_key: EntryKey, data: Any) -> None:
+        if data is None:
+            if entry_key not in self._stored and entry_key not in self._dirty:
+                return
+
+            self._dirty[entry_key] = None
+        else:
+            value = pickle.dumps(data)
+            if self._stored.get(entry_key) == _digest(value):
+                self._dirty.pop(entry_key, None)
+                return
+
+            self._dirty[entry_key] = value
+
+        # Application runs all the updates concurrently, so they are collected and
+        # written by a single task
+        if self._pending_write is None:
+            self._pending_write = asyncio.ensure_future(self._write_dirty())
+
+        await asyncio.shield(self._pending_write)
+
+    async def _write_dirty(self) -> None:
+        # Let the rest of the concurrent updates add their entries
+        await asyncio.sleep(0)
+
+        dirty, self._dirty = self._dirty, {}
+        self._pending_write = None
+
+        try:
+            async with self._write_lock:
+                if not dirty:
+                    return
+
+                async with self.engine.begin() as connection:
+                    await self._write(connection, dirty)
+        except Exception:
+            log.exception(
+                t()
+                .pgettext("cli", "Failed to store {0} persistence entries.")
+                .format(len(dirty))
+            )
+
+            # Try again on the next run, unless there are newer values
+            for entry_key, value in dirty.items():
+                self._dirty.setdefault(entry_key, value)
+
+            return
+
+        for entry_key, value in dirty.items():
+            if value is None:
+                self._stored.pop(entry_key, None)
+            else:
+                self._stored[entry_key] = _digest(value)
+
+    async def _write(
+        self, connection: AsyncConnection, entries: dict[EntryKey, bytes | None]
+    ) -> None:
+        deleted = defaultdict(list)
+        for (kind, namespace, key), value in entries.items():
+            if value is None:
+                deleted[(kind, namespace)].append(key)
+
+        for (kind, namespace), keys in deleted.items():
+            await connection.execute(
+                delete(PersistenceEntry).where(
+                    (PersistenceEntry.kind == kind)
+                    & (PersistenceEntry.namespace == namespace)
+                    & PersistenceEntry.key.in_(keys)
+                )
+            )
+
+        rows = [
+            {"kind": kind, "namespace": namespace, "key": key, "value": value}
+            for (kind, namespace, key), value in entries.items()
+            if value is not None
+        ]
+        if rows:
+            await connection.execute(self._upsert_statement(connection), rows)
+
+    @staticmethod
+    def _upsert_statement(connection: AsyncConnection):
+        stmt = dialect_insert(connection.dialect.name)(PersistenceEntry)
+
+        if connection.dialect.name == "mysql":
+            return stmt.on_duplicate_key_update(
+                value=stmt.inserted.value, updated_ts=func.now()
+            )
+
+        return stmt.on_conflict_do_update(
+            index_elements=["kind", "namespace", "key"],
+            set_={"value": stmt.excluded.value, "updated_ts": func.now()},
+        )
+
+    async def get_user_data(self) -> dict[int, dict]:
+        data = await self._load(PersistenceKind.user_data)
+        # The entries stored before UserData was introduced are plain dicts
+        return {
+            int(user_id): value if isinstance(value, UserData) else UserData(value)
+            for user_id, value in data.items()
+        }
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        data = await self._load(PersistenceKind.chat_data)
+        return {int(chat_id): value for chat_id, value in data.items()}
+
+    async def get_bot_data(self) -> dict:
+        return (await self._load(PersistenceKind.bot_data)).get("", {})
+
+    async def get_callback_data(self) -> CDCData | None:
+        return (await self._load(PersistenceKind.callback_data)).get("")
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        data = await self._load(PersistenceKind.conversation, name)
+        return {_decode_conversation_key(key): state for key, state in data.items()}
+
+    async def update_conversation(
+        self, name: str, key: ConversationKey, new_state: object | None
+    ) -> None:
+        await self._update(
+            (PersistenceKind.conversation, name, _encode_conversation_key(key)),
+            new_state,
+        )
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await self._update((PersistenceKind.user_data, "", str(user_id)), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        await self._update((PersistenceKind.chat_data, "", str(chat_id)), data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        await self._update((PersistenceKind.bot_data, "", ""), data)
+
+    async def update_callback_data(self, data: CDCData) -> None:
+        await self._update((PersistenceKind.callback_data, "", ""), data)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await self._update((PersistenceKind.user_data, "", str(user_id)), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await self._update((PersistenceKind.chat_data, "", str(chat_id)), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._pending_write is not None:
+            await self._pending_write
+
+        # Also waits for the write which might be in progress
+        await self._write_dirty()
+
+    async def import_pickle(self, path: str) -> int:
+        """
+        Copies everything stored by PicklePersistence in the given file into the
+        database, overwriting the existing entries. Returns the number of entries.
+        """
+        source = PicklePersistence(path)
+        entries: dict[EntryKey, bytes | None] = {}
+
+        for user_id, data in (await source.get_user_data()).items():
+            entries[(PersistenceKind.user_data, "", str(user_id))] = pickle.dumps(data)
+
+        for chat_id, data in (await source.get_chat_data()).items():
+            entries[(PersistenceKind.chat_data, "", str(chat_id))] = pickle.dumps(data)
+
+        bot_data = await source.get_bot_data()
+        if bot_data:
+            entries[(PersistenceKind.bot_data, "", "")] = pickle.dumps(bot_data)
+
+        callback_data = await source.get_callback_data()
+        if callback_data:
+            entries[(PersistenceKind.callback_data, "", "")] = pickle.dumps(
+                callback_data
+            )
+
+        for name, conversations in (source.conversations or {}).items():
+            for key, state in conversations.items():
+                entries[
+                    (PersistenceKind.conversation, name, _encode_conversation_key(key))
+                ] = pickle.dumps(state)
+
+        async with self.engine.begin() as connection:
+            await self._write(connection, entries)
+
+        for entry_key, value in entries.items():
+            self._stored[entry_key] = _digest(value)
+
+        return len(entries)
@@ -2,19 +2,26 @@ import abc
 from binascii import crc32
 from functools import partial
 from inspect import isawaitable
+from typing import ClassVar
 
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
 from telegram.ext import (
     BaseHandler,
     CallbackQueryHandler,
     ContextTypes,
     ConversationHandler,
+    TypeHandler,
 )
 
 from tour_guide_bot import t
+from tour_guide_bot.helpers.keyboards import KeyboardRegistry
+from tour_guide_bot.helpers.menu_counts import MenuCounts
+from tour_guide_bot.helpers.sql import dialect_insert
+from tour_guide_bot.helpers.user_identity_cache import UserIdentity
 from tour_guide_bot.models import log
 from tour_guide_bot.models.guide import Tour, TourTranslation
 from tour_guide_bot.models.telegram import TelegramUser
@@ -23,15 +30,63 @@ from tour_guide_bot.models.telegram import TelegramUser
 class BaseHandlerCallback:
     __metaclass__ = abc.ABCMeta
 
-    def __init__(self, db_session: AsyncSession):
-        self.db_session: AsyncSession = db_session
+    # An abandoned conversation is ended after this many seconds, and the keys
+    # it keeps in the user's data are dropped
+    CONVERSATION_TIMEOUT: ClassVar[int] = 24 * 60 * 60
+    CONTEXT_KEYS: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, db_engine: AsyncEngine, read_only: bool = False):
+        self.db_engine: AsyncEngine = db_engine
+        self.read_only: bool = read_only
         self.user: TelegramUser | None = None
+        self._db_session: AsyncSession | None = None
+
+    @property
+    def db_session(self) -> AsyncSession:
+        # Many updates are handled without touching the database, so the session
+        # is only created when needed
+        if self._db_session is None:
+            self._db_session = AsyncSession(self.db_engine, expire_on_commit=False)
+
+        return self._db_session
+
+    async def close(self) -> None:
+        if self._db_session is not None:
+            await self._db_session.close()
+            self._db_session = None
 
     @classmethod
     @abc.abstractmethod
     def get_handlers(cls) -> list[BaseHandler]:
         pass
 
+    @classmethod
+    def get_timeout_handlers(
+        cls, context_keys: tuple[str, ...] | None = None
+    ) -> list[BaseHandler]:
+        """
+        The handlers for the ConversationHandler.TIMEOUT state, which drop the
+        conversation's keys (`CONTEXT_KEYS` by default) from the user's data.
+        """
+        return [
+            TypeHandler(
+                Update,
+                partial(
+                    cls.drop_context,
+                    cls.CONTEXT_KEYS if context_keys is None else context_keys,
+                ),
+            )
+        ]
+
+    @staticmethod
+    async def drop_context(
+        context_keys: tuple[str, ...],
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ):
+        for key in context_keys:
+            context.user_data.pop(key, None)
+
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await self.cancel_without_conversation(update, context)
         return ConversationHandler.END
@@ -39,7 +94,7 @@ class BaseHandlerCallback:
     async def cancel_without_conversation(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        user = await self.get_user(update, context)
+        user = await self.get_identity(update, context)
 
         if hasattr(self, "cleanup_context"):
             cleanup_result = self.cleanup_context(context)
@@ -102,24 +157,59 @@ class BaseHandlerCallback:
             )
         )
 
+    @classmethod
+    def build(
+        cls, context: ContextTypes.DEFAULT_TYPE, read_only: bool = False
+    ) -> "BaseHandlerCallback":
+        if read_only:
+            return cls(context.application.db_read_engine, read_only=True)
+
+        return cls(context.application.db_engine)
+
     @classmethod
     async def build_and_run(
-        cls, callback, update: Update, context: ContextTypes.DEFAULT_TYPE
+        cls,
+        callback,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        read_only: bool = False,
     ):
-        async with AsyncSession(
-            context.application.db_engine, expire_on_commit=False
-        ) as session:
-            handler = cls(session)
+        handler = cls.build(context, read_only)
+        try:
             return await callback(handler, update, context)
+        finally:
+            await handler.close()
 
     @classmethod
-    def partial(cls, callback) -> callable:
-        return partial(cls.build_and_run, callback)
+    def register_keyboards(cls, keyboards: KeyboardRegistry) -> None:
+        """
+        Pre-renders the keyboards which depend on nothing but the language.
+        """
+
+    @classmethod
+    def partial(cls, callback, read_only: bool = False) -> callable:
+        """
+        Wraps the callback into a handler instance. The read-only callbacks get a
+        session without a transaction, which might be connected to a replica.
+        """
+        return partial(cls.build_and_run, callback, read_only=read_only)
 
     async def get_language(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> str:
-        return (await self.get_user(update, context)).language
+        return (await self.get_identity(update, context)).language
+
+    async def get_identity(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> UserIdentity:
+        if self.user:
+            return UserIdentity.from_user(self.user)
+
+        identity = context.application.user_identity_cache.get(update.effective_user.id)
+        if identity is None:
+            identity = UserIdentity.from_user(await self.get_user(update, context))
+
+        return identity
 
     async def get_user(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -134,23 +224,60 @@ class BaseHandlerCallback:
         )
         user: TelegramUser | None = await self.db_session.scalar(stmt)
 
-        if not user:
-            user = TelegramUser(id=update.effective_user.id)
+        if not user and self.read_only:
+            # The read-only session might be connected to a replica
+            async with AsyncSession(
+                context.application.db_engine, expire_on_commit=False
+            ) as session:
+                user = await self.create_user(
+                    session, update, context
+                ) or await session.scalar(stmt)
+        elif not user:
+            user = await self.create_user(
+                self.db_session, update, context
+            ) or await self.db_session.scalar(stmt)
+
+        context.application.user_identity_cache.put(user)
+        self.user = user
 
-            if (
-                update.effective_user.language_code
-                in context.application.enabled_languages
-            ):
-                user.language = update.effective_user.language_code
-            else:
-                user.language = context.application.default_language
+        return self.user
 
-            self.db_session.add(user)
-            await self.db_session.commit()
+    @staticmethod
+    async def create_user(
+        db_session: AsyncSession, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> TelegramUser | None:
+        """
+        Creates the user unless it already exists, with a single statement. Returns
+        None when the user was created by somebody else in the meantime, e.g. by a
+        concurrent update from the same user.
+        """
+        if update.effective_user.language_code in context.application.enabled_languages:
+            language = update.effective_user.language_code
+        else:
+            language = context.application.default_language
 
-        self.user = user
+        dialect_name = db_session.bind.dialect.name
+        stmt = dialect_insert(dialect_name)(TelegramUser).values(
+            id=update.effective_user.id, language=language
+        )
 
-        return self.user
+        if dialect_name == "mysql":
+            # MySQL has neither ON CONFLICT nor RETURNING
+            await db_session.execute(stmt.prefix_with("IGNORE"))
+            await db_session.commit()
+            return None
+
+        user: TelegramUser | None = await db_session.scalar(
+            stmt.on_conflict_do_nothing(index_elements=["id"]).returning(TelegramUser)
+        )
+        await db_session.commit()
+
+        if user:
+            # A new user is linked to nothing, there is no need to load that
+            set_committed_value(user, "admin", None)
+            set_committed_value(user, "guest", None)
+
+        return user
 
     @classmethod
     def get_callback_data(cls, *args) -> str:
@@ -173,23 +300,32 @@ class AdminProtectedBaseHandlerCallback(BaseHandlerCallback):
         callback,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
+        read_only: bool = False,
     ):
-        async with AsyncSession(
-            context.application.db_engine, expire_on_commit=False
-        ) as session:
-            handler = cls(session)
+        handler = cls.build(context, read_only)
+        try:
+            identity = await handler.get_identity(update, context)
 
-            user = await handler.get_user(update, context)
-
-            if not user.admin:
+            if not identity.is_admin:
                 await cls.edit_or_reply_text(
                     update,
                     context,
-                    t(user.language).pgettext("admin-bot", "Access denied."),
+                    t(identity.language).pgettext("admin-bot", "Access denied."),
                 )
                 return ConversationHandler.END
 
             return await callback(handler, update, context)
+        finally:
+            await handler.close()
+
+    _menu_counts: MenuCounts | None = None
+
+    async def get_menu_counts(self) -> MenuCounts:
+        # All the menus rendered for an update share the same counts
+        if self._menu_counts is None:
+            self._menu_counts = await MenuCounts.load(self.db_session)
+
+        return self._menu_counts
 
 
 class SubcommandHandler(AdminProtectedBaseHandlerCallback):
@@ -201,7 +337,7 @@ class SubcommandHandler(AdminProtectedBaseHandlerCallback):
         pass
 
     @classmethod
-    async def is_available(cls, db_session: AsyncSession) -> bool:
+    def is_available(cls, counts: MenuCounts) -> bool:
         return True
 
 
@@ -226,30 +362,32 @@ class MenuCommandHandler(AdminProtectedBaseHandlerCallback):
     async def handle_menu_unavailable(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        msg = self.get_main_menu_unavailable_text(
-            await self.get_language(update, context)
-        )
-
-        keyboard = await self.get_extra_buttons(update, context)
+        language = await self.get_language(update, context)
 
         await self.edit_or_reply_text(
             update,
             context,
-            msg,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
+            self.get_main_menu_unavailable_text(language),
+            reply_markup=self.get_menu_keyboard(
+                language, (False,) * len(self.MENU_ITEMS), context
+            ),
         )
 
     async def handle_menu_available(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        keyboard = await self.get_menu(update, context) + await self.get_extra_buttons(
-            update, context
-        )
+        language = await self.get_language(update, context)
+        counts = await self.get_menu_counts()
+
         await self.edit_or_reply_text(
             update,
             context,
-            self.get_main_menu_text(await self.get_language(update, context)),
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
+            self.get_main_menu_text(language),
+            reply_markup=self.get_menu_keyboard(
+                language,
+                tuple(item.is_available(counts) for item in self.MENU_ITEMS),
+                context,
+            ),
         )
 
     async def is_menu_available(
@@ -279,41 +417,65 @@ class MenuCommandHandler(AdminProtectedBaseHandlerCallback):
 
         return ret
 
-    async def get_extra_buttons(
-        self,
-        update: Update,
-        context: ContextTypes.DEFAULT_TYPE,
-    ) -> list[list[InlineKeyboardButton]]:
+    @classmethod
+    def get_extra_buttons(cls, language: str) -> list[list[InlineKeyboardButton]]:
         return [
             [
                 InlineKeyboardButton(
-                    t(await self.get_language(update, context)).pgettext(
-                        "bot-generic", "Abort"
-                    ),
-                    callback_data=self.get_callback_data("cancel"),
+                    t(language).pgettext("bot-generic", "Abort"),
+                    callback_data=cls.get_callback_data("cancel"),
                 )
             ],
         ]
 
-    async def get_menu(
-        self, update: Update, context: ContextTypes.DEFAULT_TYPE
-    ) -> list[list[InlineKeyboardButton]]:
+    @classmethod
+    def build_menu_keyboard(
+        cls, language: str, available: tuple[bool, ...]
+    ) -> InlineKeyboardMarkup:
         keyboard = []
 
-        for item in self.MENU_ITEMS:
-            if not await item.is_available(self.db_session):
+        for item, is_available in zip(cls.MENU_ITEMS, available):
+            if not is_available:
                 continue
 
             keyboard.append(
                 [
                     InlineKeyboardButton(
-                        item.get_name(await self.get_language(update, context)),
+                        item.get_name(language),
                         callback_data=item.get_callback_data(),
                     )
                 ]
             )
 
-        return keyboard
+        return InlineKeyboardMarkup(
+            inline_keyboard=keyboard + cls.get_extra_buttons(language)
+        )
+
+    @classmethod
+    def register_keyboards(cls, keyboards: KeyboardRegistry) -> None:
+        super().register_keyboards(keyboards)
+
+        if not cls.MENU_ITEMS:
+            return
+
+        # The menus with all the items and with none of them are the most common
+        for available in (True, False):
+            mask = (available,) * len(cls.MENU_ITEMS)
+            keyboards.register(
+                (cls, "menu", mask), partial(cls.build_menu_keyboard, available=mask)
+            )
+
+    def get_menu_keyboard(
+        self,
+        language: str,
+        available: tuple[bool, ...],
+        context: ContextTypes.DEFAULT_TYPE,
+    ) -> InlineKeyboardMarkup:
+        return context.application.keyboards.get(
+            (self.__class__, "menu", available),
+            language,
+            partial(self.build_menu_keyboard, available=available),
+        )
 
     async def main_entrypoint(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -0,0 +1,297 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import Update, func, select
+from sqlalchemy import update as sql_update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from telegram import InputMedia, InputMediaAudio, InputMediaPhoto, InputMediaVideo
+from telegram.constants import ChatAction, ParseMode
+
+from tour_guide_bot.models.guide import (
+    MessageType,
+    TourSection,
+    TourSectionContent,
+    TourTranslation,
+)
+
+# Rough per-object overhead used when estimating the memory footprint of an entry.
+ITEM_OVERHEAD = 256
+
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class DeliveryItem:
+    message_type: MessageType
+    chat_action: ChatAction
+    text: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    file_id: str | None = None
+    caption: str | None = None
+    media: tuple[InputMedia, ...] = ()
+
+    @property
+    def size(self) -> int:
+        ret = ITEM_OVERHEAD
+        for value in (self.text, self.file_id, self.caption):
+            if value:
+                ret += len(value)
+
+        for media in self.media:
+            ret += ITEM_OVERHEAD + len(media.media) + len(media.caption or "")
+
+        return ret
+
+    @classmethod
+    def from_content(cls, content: TourSectionContent) -> "DeliveryItem":
+        data = content.content
+
+        match content.message_type:
+            case MessageType.text:
+                return cls(content.message_type, ChatAction.TYPING, text=data["text"])
+
+            case MessageType.location:
+                return cls(
+                    content.message_type,
+                    ChatAction.TYPING,  # todo change to ChatAction.FIND_LOCATION
+                    latitude=data["latitude"],
+                    longitude=data["longitude"],
+                )
+
+            case MessageType.media_group:
+                media = []
+                chat_action = ChatAction.TYPING
+
+                for f in data["files"]:
+                    match MessageType[f["type"]]:
+                        case MessageType.audio:
+                            media_class = InputMediaAudio
+                            chat_action = ChatAction.UPLOAD_VOICE
+                        case MessageType.video:
+                            media_class = InputMediaVideo
+                            chat_action = ChatAction.UPLOAD_VIDEO
+                        case MessageType.photo:
+                            media_class = InputMediaPhoto
+                            chat_action = ChatAction.UPLOAD_PHOTO
+                        case _:
+                            continue
+
+                    media.append(
+                        media_class(
+                            f["file_id"],
+                            caption=f.get("caption"),
+                            parse_mode=ParseMode.MARKDOWN_V2,
+                        )
+                    )
+
+                return cls(content.message_type, chat_action, media=tuple(media))
+
+        match content.message_type:
+            case MessageType.voice | MessageType.audio:
+                chat_action = ChatAction.UPLOAD_VOICE
+            case MessageType.video_note:
+                chat_action = ChatAction.UPLOAD_VIDEO_NOTE
+            case MessageType.video:
+                chat_action = ChatAction.UPLOAD_VIDEO
+            case MessageType.photo:
+                chat_action = ChatAction.UPLOAD_PHOTO
+            case _:
+                chat_action = ChatAction.TYPING
+
+        return cls(
+            content.message_type,
+            chat_action,
+            file_id=data["files"][0]["file_id"],
+            caption=data["files"][0].get("caption"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CachedSection:
+    id: int
+    title: str
+    position: int
+    translation_id: int
+    tour_id: int
+    content_version: int
+    sections_count: int
+    items: tuple[DeliveryItem, ...]
+
+    @property
+    def is_last(self) -> bool:
+        return self.position >= self.sections_count - 1
+
+    @property
+    def size(self) -> int:
+        return ITEM_OVERHEAD + len(self.title) + sum(i.size for i in self.items)
+
+
+def bump_content_version(translation_id) -> Update:
+    """
+    Returns the statement incrementing the translation's content version, which
+    makes every instance of the bot rebuild the cached sections of it.
+    """
+    return (
+        sql_update(TourTranslation)
+        .where(TourTranslation.id == translation_id)
+        .values(content_version=TourTranslation.content_version + 1)
+    )
+
+
+class TourContentCache:
+    """
+    Read-through LRU cache of the tour sections' content, ready for delivery.
+
+    Sections are keyed by the translation id and their position. An entry is
+    considered fresh as long as the caller either doesn't know the translation's
+    `content_version`, or it matches the one the entry was built from. Admin
+    handlers changing the content must bump the version with
+    `bump_content_version` and call one of the `invalidate*` methods.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[int, int], tuple[CachedSection, int]] = (
+            OrderedDict()
+        )
+        self._positions: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def get(
+        self,
+        db_session: AsyncSession,
+        translation_id: int,
+        position: int,
+        content_version: int | None = None,
+    ) -> CachedSection | None:
+        entry = self._entries.get((translation_id, position))
+
+        if entry is not None and (
+            content_version is None or entry[0].content_version == content_version
+        ):
+            self._entries.move_to_end((translation_id, position))
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+
+        if entry is not None:
+            # The translation has changed, so all of its sections are outdated
+            self.invalidate(translation_id)
+
+        section = await self.load(db_session, translation_id, position)
+        if section is not None:
+            self.put(section)
+
+        return section
+
+    @staticmethod
+    async def load(
+        db_session: AsyncSession, translation_id: int, position: int
+    ) -> CachedSection | None:
+        sections_count = (
+            select(func.count(TourSection.id))
+            .where(TourSection.tour_translation_id == translation_id)
+            .scalar_subquery()
+        )
+
+        row = (
+            await db_session.execute(
+                select(
+                    TourSection,
+                    TourTranslation.tour_id,
+                    TourTranslation.content_version,
+                    sections_count,
+                )
+                .join(
+                    TourTranslation,
+                    TourTranslation.id == TourSection.tour_translation_id,
+                )
+                .options(selectinload(TourSection.content))
+                .where(
+                    (TourSection.tour_translation_id == translation_id)
+                    & (TourSection.position == position)
+                )
+            )
+        ).first()
+
+        if row is None:
+            return None
+
+        section, tour_id, content_version, count = row
+
+        return CachedSection(
+            id=section.id,
+            title=section.title,
+            position=section.position,
+            translation_id=translation_id,
+            tour_id=tour_id,
+            content_version=content_version,
+            sections_count=count,
+            items=tuple(DeliveryItem.from_content(c) for c in section.content),
+        )
+
+    def put(self, section: CachedSection) -> None:
+        key = (section.translation_id, section.position)
+        self._remove(key)
+
+        size = section.size
+        if size > self.max_size:
+            return
+
+        self._entries[key] = (section, size)
+        self._positions.setdefault(section.translation_id, set()).add(section.position)
+        self.size += size
+
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple[int, int]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.size -= entry[1]
+
+        positions = self._positions[key[0]]
+        positions.discard(key[1])
+        if not positions:
+            del self._positions[key[0]]
+
+    def invalidate(self, translation_id: int | None) -> None:
+        for position in list(self._positions.get(translation_id, ())):
+            self._remove((translation_id, position))
+
+    def invalidate_tour(self, tour_id: int) -> None:
+        for section, _ in list(self._entries.values()):
+            if section.tour_id == tour_id:
+                self.invalidate(section.translation_id)
+
+    def invalidate_section(self, section_id: int) -> None:
+        for section, _ in list(self._entries.values()):
+            if section.id == section_id:
+                self.invalidate(section.translation_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._positions.clear()
+        self.size = 0
@@ -0,0 +1,77 @@
+from time import monotonic
+from typing import Hashable, NamedTuple
+
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tour_guide_bot.models.guide import Tour, TourTranslation
+
+DEFAULT_TTL = 60
+
+
+class TourTitle(NamedTuple):
+    id: int
+    title: str
+
+
+def _translation_title(language: str | None = None) -> ColumnElement:
+    stmt = select(TourTranslation.title).where(TourTranslation.tour_id == Tour.id)
+
+    if language is not None:
+        stmt = stmt.where(TourTranslation.language == language)
+
+    return stmt.order_by(TourTranslation.id).limit(1).scalar_subquery()
+
+
+def select_tour_titles(language: str, default_language: str) -> Select:
+    """
+    Selects (tour id, title) of the tours, with the title in the given language.
+    The fallback to the default language, and then to any other one, is resolved
+    by the database, so no translations are loaded.
+    """
+    return select(
+        Tour.id,
+        func.coalesce(
+            _translation_title(language),
+            _translation_title(default_language),
+            _translation_title(),
+        ),
+    ).order_by(Tour.id)
+
+
+async def load_tour_titles(db_session: AsyncSession, stmt: Select) -> list[TourTitle]:
+    return [
+        TourTitle(tour_id, title if title is not None else "Unnamed tour #%d" % tour_id)
+        for tour_id, title in await db_session.execute(stmt)
+    ]
+
+
+class TourTitlesCache:
+    """
+    Keeps the lists of tours which are the same for everybody speaking the
+    language, e.g. the tours available for purchase.
+
+    The handlers changing the tours, their titles or products must call
+    `invalidate`; the TTL bounds the staleness of the changes made by the other
+    instances of the bot.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries: dict[tuple[Hashable, str], tuple[list[TourTitle], float]] = {}
+
+    async def get(
+        self, db_session: AsyncSession, key: Hashable, language: str, stmt: Select
+    ) -> list[TourTitle]:
+        entry = self._entries.get((key, language))
+
+        if entry is None or entry[1] < monotonic():
+            entry = self._entries[key, language] = (
+                await load_tour_titles(db_session, stmt),
+                monotonic() + self.ttl,
+            )
+
+        return entry[0]
+
+    def invalidate(self) -> None:
+        self._entries.clear()
@@ -11,7 +11,8 @@ from telegram.ext import (
 )
 
 from tour_guide_bot import t
-from tour_guide_bot.helpers.telegram import BaseHandlerCallback, get_tour_title
+from tour_guide_bot.helpers.telegram import BaseHandlerCallback
+from tour_guide_bot.helpers.tour_titles import TourTitle, select_tour_titles
 from tour_guide_bot.models.guide import Tour
 
 
@@ -36,12 +37,22 @@ class SelectTourHandler(BaseHandlerCallback, ABC):
 
     async def get_acceptable_tours(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
-    ) -> Sequence[Tour]:
-        return (
-            await self.db_session.scalars(
-                select(Tour).options(selectinload(Tour.translations))
-            )
-        ).all()
+    ) -> Sequence[TourTitle]:
+        language = await self.get_language(update, context)
+
+        return await context.application.tour_titles_cache.get(
+            self.db_session,
+            "all",
+            language,
+            select_tour_titles(language, context.application.default_language),
+        )
+
+    async def load_tour(self, tour_id: int) -> Tour | None:
+        return await self.db_session.scalar(
+            select(Tour)
+            .options(selectinload(Tour.translations))
+            .where(Tour.id == tour_id)
+        )
 
     async def handle_no_tours_found(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -55,13 +66,19 @@ class SelectTourHandler(BaseHandlerCallback, ABC):
     async def send_tour_selector(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        tours: Sequence[Tour] = await self.get_acceptable_tours(update, context)
+        tours: Sequence[TourTitle] = await self.get_acceptable_tours(update, context)
 
         if len(tours) == 1 and self.SKIP_TOUR_SELECTION_IF_SINGLE:
+            tour = await self.load_tour(tours[0].id)
+
             if update.callback_query:
                 await update.callback_query.answer()
 
-            return await self.after_tour_selected(tours[0], update, context, True)
+            if tour is None:
+                # The tour was deleted after the list had been cached
+                return await self.handle_no_tours_found(update, context)
+
+            return await self.after_tour_selected(tour, update, context, True)
 
         language = await self.get_language(update, context)
 
@@ -74,11 +91,10 @@ class SelectTourHandler(BaseHandlerCallback, ABC):
         keyboard = []
 
         for tour in tours:
-            title = get_tour_title(tour, language, context)
             keyboard.append(
                 [
                     InlineKeyboardButton(
-                        title,
+                        tour.title,
                         callback_data=self.get_callback_data("select_tour", tour.id),
                     )
                 ]
@@ -108,11 +124,7 @@ class SelectTourHandler(BaseHandlerCallback, ABC):
     async def handle_selected_tour(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
-        tour: Tour | None = await self.db_session.scalar(
-            select(Tour)
-            .options(selectinload(Tour.translations))
-            .where(Tour.id == int(context.matches[0].group(1)))
-        )
+        tour = await self.load_tour(int(context.matches[0].group(1)))
 
         if update.callback_query:
             await update.callback_query.answer()
@@ -0,0 +1,79 @@
+from itertools import chain
+from time import time
+from typing import Iterable
+
+from telegram.ext import BaseHandler, ConversationHandler
+
+
+class UserData(dict):
+    """
+    context.user_data which remembers when the user was last active, and which
+    conversations they are in, so the data of the abandoned users could be
+    dropped without breaking a conversation which is still going on.
+
+    The activity time is kept with an hour's resolution, so it doesn't make the
+    persistence store the data after every update.
+    """
+
+    ACTIVITY_RESOLUTION = 60 * 60
+
+    def __init__(
+        self,
+        data: Iterable | None = None,
+        last_activity: float | None = None,
+        conversations: Iterable[str] | None = None,
+    ):
+        super().__init__(data or ())
+        self.last_activity = last_activity or time()
+        self.conversations: set[str] = set(conversations or ())
+
+    def __reduce__(self):
+        return self.__class__, (dict(self), self.last_activity, self.conversations)
+
+    def touch(self) -> None:
+        now = time()
+        if now - self.last_activity >= self.ACTIVITY_RESOLUTION:
+            self.last_activity = now
+
+    def is_idle(self, idle_since: float) -> bool:
+        return self.last_activity < idle_since and not self.conversations
+
+
+def track_conversation(handler: ConversationHandler) -> None:
+    """
+    Wraps the callbacks of the conversation, so the users' data records whether
+    they are in the conversation, judging by the states the callbacks return.
+    The nested conversations are tracked on their own.
+    """
+    for callback_handler in chain(
+        handler.entry_points, *handler.states.values(), handler.fallbacks
+    ):
+        if isinstance(callback_handler, ConversationHandler):
+            track_conversation(callback_handler)
+        else:
+            callback_handler.callback = _track_state(
+                handler,
+                callback_handler,
+                callback_handler in handler.states.get(ConversationHandler.TIMEOUT, ()),
+            )
+
+
+def _track_state(
+    handler: ConversationHandler, callback_handler: BaseHandler, is_timeout: bool
+):
+    callback = callback_handler.callback
+    # The states mapped to the parent conversation end the nested one
+    end_states = {ConversationHandler.END, *(handler.map_to_parent or {})}
+
+    async def tracked(update, context):
+        state = await callback(update, context)
+
+        if isinstance(context.user_data, UserData):
+            if is_timeout or state in end_states:
+                context.user_data.conversations.discard(handler.name)
+            elif state is not None:
+                context.user_data.conversations.add(handler.name)
+
+        return state
+
+    return tracked
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+
+from tour_guide_bot.models.telegram import TelegramUser
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+@dataclass(frozen=True, slots=True)
+class UserIdentity:
+    id: int
+    language: str
+    guest_id: int | None
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: TelegramUser) -> "UserIdentity":
+        return cls(
+            id=user.id,
+            language=user.language,
+            guest_id=user.guest_id,
+            is_admin=user.admin_id is not None,
+        )
+
+
+class UserIdentityCache:
+    """
+    Short-living cache of what most of the updates need to know about the user:
+    the language, the linked guest and whether they're an admin.
+
+    The handlers changing any of these must call `invalidate`; the TTL bounds
+    the staleness of the changes made by the other instances of the bot.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[UserIdentity, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def get(self, user_id: int) -> UserIdentity | None:
+        entry = self._entries.get(user_id)
+
+        if entry is None or entry[1] < monotonic():
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user: TelegramUser) -> UserIdentity:
+        identity = UserIdentity.from_user(user)
+
+        self._entries[identity.id] = (identity, monotonic() + self.ttl)
+        self._entries.move_to_end(identity.id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return identity
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
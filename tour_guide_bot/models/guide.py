@@ -13,7 +13,9 @@ from sqlalchemy import (
     SmallInteger,
     String,
     func,
+    select,
 )
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import Mapped, object_session, relationship
 
@@ -74,6 +76,11 @@ class TourTranslation(Base):
     sections: Mapped[list["TourSection"]] = relationship(
         "TourSection", cascade="all, delete-orphan", order_by="TourSection.position"
     )
+    # Incremented on every change of the sections, so the cached content of the
+    # translation gets rebuilt
+    content_version: Mapped[int] = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
     created_ts = Column(DateTime, nullable=False, server_default=func.now())
     updated_ts = Column(
         DateTime, nullable=False, default=func.now(), onupdate=func.now()
@@ -235,6 +242,10 @@ class Invoice(Base):
     duration_days: Mapped[int] = Column(Integer, nullable=False)
     guests: Mapped[int] = Column(Integer, nullable=False, default=1)
     paid: Mapped[bool] = Column(Boolean, nullable=False, default=False)
+    # Every charge is applied once: the redelivered payments are told apart by it
+    telegram_payment_charge_id: Mapped[Optional[str]] = Column(
+        String, index=True, unique=True
+    )
     subscription: Mapped[Optional["Subscription"]] = relationship(
         "Subscription", back_populates="invoice"
     )
@@ -279,3 +290,45 @@ class Guest(Base):
     updated_ts = Column(
         DateTime, nullable=False, default=func.now(), onupdate=func.now()
     )
+
+
+class AudioConversion(Base):
+    __tablename__ = "audio_conversion"
+    __mapper_args__ = {"eager_defaults": True}
+
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    source_file_unique_id: Mapped[str] = Column(String, nullable=False)
+    profile: Mapped[str] = Column(String, nullable=False)
+    voice_file_id: Mapped[str] = Column(String, nullable=False)
+    created_ts = Column(DateTime, nullable=False, server_default=func.now())
+    updated_ts = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_audio_conversion_source_profile",
+            "source_file_unique_id",
+            "profile",
+            unique=True,
+        ),
+    )
+
+    @staticmethod
+    async def load(
+        db_session: AsyncSession,
+        source_file_unique_id: str,
+        profile: str,
+        create: bool = False,
+    ) -> Optional["AudioConversion"]:
+        stmt = select(AudioConversion).where(
+            (AudioConversion.source_file_unique_id == source_file_unique_id)
+            & (AudioConversion.profile == profile)
+        )
+        conversion: AudioConversion | None = await db_session.scalar(stmt)
+        if not conversion and create:
+            conversion = AudioConversion(
+                source_file_unique_id=source_file_unique_id, profile=profile
+            )
+
+        return conversion
@@ -0,0 +1,38 @@
+import enum
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, LargeBinary, String, func
+from sqlalchemy.orm import Mapped
+
+from tour_guide_bot.models import Base
+
+
+class PersistenceKind(enum.Enum):
+    user_data = 1
+    chat_data = 2
+    bot_data = 3
+    callback_data = 4
+    conversation = 5
+
+
+class PersistenceEntry(Base):
+    __tablename__ = "persistence_entry"
+
+    id: Mapped[int] = Column(Integer, primary_key=True)
+    kind: Mapped[PersistenceKind] = Column(Enum(PersistenceKind), nullable=False)
+    # The conversation's name, empty for everything else
+    namespace: Mapped[str] = Column(String, nullable=False, default="")
+    key: Mapped[str] = Column(String, nullable=False)
+    value: Mapped[bytes] = Column(LargeBinary, nullable=False)
+    updated_ts = Column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_persistence_entry_kind_namespace_key",
+            "kind",
+            "namespace",
+            "key",
+            unique=True,
+        ),
+    )
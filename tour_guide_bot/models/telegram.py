@@ -15,7 +15,9 @@ class TelegramUser(Base):
     id: Mapped[int] = Column(BigInteger, primary_key=True, autoincrement=False)
     phone: Mapped[Optional[str]] = Column(String)
     language: Mapped[Optional[str]] = Column(String)
-    guest_id: Mapped[Optional[int]] = Column(Integer, ForeignKey("guest.id"))
+    guest_id: Mapped[Optional[int]] = Column(
+        Integer, ForeignKey("guest.id"), index=True
+    )
     guest: Mapped[Optional[Guest]] = relationship("Guest")
     admin_id: Mapped[Optional[int]] = Column(Integer, ForeignKey("admin.id"))
     admin: Mapped[Optional[Admin]] = relationship("Admin")